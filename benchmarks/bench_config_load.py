@@ -0,0 +1,54 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+"""
+Config load benchmark - measures ConfigManager start-up time by registered player count. A config file saved by mobstiq
+matches its checksum file and is loaded without schema validation. A config file without a checksum file (e.g. edited by
+hand) is fully validated.
+
+Usage: PYTHONPATH=src python3 benchmarks/bench_config_load.py
+"""
+
+import argparse
+import os
+from tempfile import TemporaryDirectory
+import time
+
+from mobstiq.app import ConfigManager
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench_config_load')
+    parser.add_argument('-n', dest='counts', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='registered player counts')
+    parser.add_argument('-r', dest='repeat', type=int, default=5, help='loads per measurement (default is 5)')
+    args = parser.parse_args()
+
+    print(f'{"players":>8} {"trusted (ms)":>13} {"validated (ms)":>15}')
+    for count in args.counts:
+        with TemporaryDirectory() as temp_dir:
+            # Save a config with the registered players
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path)
+            with config_manager(save=True) as config:
+                for ix in range(count):
+                    config['players'][f'p{ix}'] = {'id': f'p{ix}', 'name': f'Player {ix}'}
+
+            # Measure the trusted load
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                ConfigManager(config_path).close()
+            trusted_ms = (time.perf_counter() - start) * 1e3 / args.repeat
+
+            # Measure the validated load
+            os.remove(f'{config_path}.sha256')
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                ConfigManager(config_path).close()
+            validated_ms = (time.perf_counter() - start) * 1e3 / args.repeat
+
+            print(f'{count:>8} {trusted_ms:>13.1f} {validated_ms:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+"""
+Config lock contention benchmark - compares read throughput of the reader/writer config lock to an exclusive lock as
+the number of reader threads grows. Read contexts hold the lock for a GIL-releasing delay that stands in for blocking
+work (or any work on a free-threaded Python build).
+
+Usage: PYTHONPATH=src python3 benchmarks/bench_config_lock.py
+"""
+
+import argparse
+from contextlib import contextmanager
+import os
+from tempfile import TemporaryDirectory
+import threading
+import time
+
+from mobstiq.app import ConfigManager
+
+
+# An exclusive lock with the reader/writer lock interface - the baseline
+class ExclusiveLock:
+    __slots__ = ('lock', 'writer')
+
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.writer = None
+
+
+    def acquire(self):
+        self.lock.acquire()
+        self.writer = threading.get_ident()
+
+
+    def release(self):
+        self.writer = None
+        self.lock.release()
+
+
+    # Does the current thread hold the write lock?
+    def owned(self):
+        return self.writer == threading.get_ident()
+
+
+    @contextmanager
+    def read(self):
+        with self.lock:
+            yield
+
+
+def bench_reads(config_manager, thread_count, duration, hold):
+    reads = [0] * thread_count
+    stop = threading.Event()
+
+    def reader(ix_thread):
+        count = 0
+        while not stop.is_set():
+            with config_manager() as config:
+                _ = config['players'].get('p1')
+                if hold:
+                    time.sleep(hold)
+            count += 1
+        reads[ix_thread] = count
+
+    threads = [threading.Thread(target=reader, args=(ix_thread,)) for ix_thread in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(reads) / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench_config_lock')
+    parser.add_argument('-d', dest='duration', type=float, default=1.0, help='seconds per measurement (default is 1)')
+    parser.add_argument('-m', dest='hold', type=float, default=0.5, help='read lock hold time, in milliseconds (default is 0.5)')
+    parser.add_argument('-t', dest='threads', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='reader thread counts')
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp_dir:
+        config_manager = ConfigManager(os.path.join(temp_dir, 'mobstiq.json'))
+        rw_lock = config_manager.config_lock
+        with config_manager(save=True) as config:
+            config['players']['p1'] = {'id': 'p1', 'name': 'Player 1'}
+
+        print(f'Read throughput (reads/sec), {args.hold} ms hold')
+        print(f'{"threads":>8} {"exclusive":>12} {"read/write":>12} {"speedup":>8}')
+        for thread_count in args.threads:
+            config_manager.config_lock = ExclusiveLock()
+            exclusive_rate = bench_reads(config_manager, thread_count, args.duration, args.hold / 1000)
+            config_manager.config_lock = rw_lock
+            rw_rate = bench_reads(config_manager, thread_count, args.duration, args.hold / 1000)
+            print(f'{thread_count:>8} {exclusive_rate:>12.0f} {rw_rate:>12.0f} {rw_rate / exclusive_rate:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+"""
+Config durability benchmark - measures config saves per second at each durability level and for each storage back-end.
+Each save registers one player. The "batch" level coalesces saves on the flusher thread, so its time includes the final
+flush on close.
+
+Usage: PYTHONPATH=src python3 benchmarks/bench_durability.py
+"""
+
+import argparse
+import os
+from tempfile import TemporaryDirectory
+import time
+
+from mobstiq.app import ConfigManager
+
+
+# The benchmark storage back-ends - config file name and ConfigManager arguments
+STORAGES = (
+    ('json', 'mobstiq.json', {}),
+    ('journal', 'mobstiq.json', {'journal': True}),
+    ('sqlite', 'mobstiq.sqlite', {})
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench_durability')
+    parser.add_argument('-s', dest='saves', type=int, default=200, help='saves per measurement (default is 200)')
+    parser.add_argument('-p', dest='players', type=int, default=100, help='initial registered players (default is 100)')
+    args = parser.parse_args()
+
+    print(f'{"storage":>8} ' + ' '.join(f'{level + " (saves/s)":>17}' for level in ConfigManager.DURABILITY_LEVELS))
+    for storage_name, config_filename, config_args in STORAGES:
+        saves_per_sec = []
+        for durability in ConfigManager.DURABILITY_LEVELS:
+            with TemporaryDirectory() as temp_dir:
+                config_manager = ConfigManager(os.path.join(temp_dir, config_filename), durability=durability, **config_args)
+
+                # Register the initial players
+                with config_manager(save=True) as config:
+                    for ix in range(args.players):
+                        config['players'][f'p{ix}'] = {'id': f'p{ix}', 'name': f'Player {ix}'}
+                        config_manager.changed('players', f'p{ix}')
+
+                # Measure the saves
+                start = time.perf_counter()
+                for ix in range(args.saves):
+                    with config_manager(save=True) as config:
+                        config['players'][f'n{ix}'] = {'id': f'n{ix}', 'name': f'New Player {ix}'}
+                        config_manager.changed('players', f'n{ix}')
+                config_manager.close()
+                saves_per_sec.append(args.saves / (time.perf_counter() - start))
+
+        print(f'{storage_name:>8} ' + ' '.join(f'{value:>17.0f}' for value in saves_per_sec))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+"""
+Player registration benchmark - measures playerRegister latency by registered player count. Registration checks the
+player name index, so latency stays flat as the player count grows. The linear name scan that the index replaced is
+measured for comparison. Config saves are disabled ("noSave") to isolate the in-memory cost.
+
+Usage: PYTHONPATH=src python3 benchmarks/bench_player_register.py
+"""
+
+import argparse
+import json
+import os
+from tempfile import TemporaryDirectory
+import time
+
+from mobstiq.app import Mobstiq
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench_player_register')
+    parser.add_argument('-n', dest='counts', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='registered player counts')
+    parser.add_argument('-r', dest='registrations', type=int, default=1000, help='registrations per measurement (default is 1000)')
+    args = parser.parse_args()
+
+    print(f'{"players":>8} {"register (us)":>14} {"linear scan (us)":>17}')
+    for count in args.counts:
+        with TemporaryDirectory() as temp_dir:
+            # Create a config with the registered players
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            with open(config_path, 'w', encoding='utf-8') as fh_config:
+                fh_config.write(json.dumps({
+                    'players': {f'p{ix}': {'id': f'p{ix}', 'name': f'Player {ix}'} for ix in range(count)}
+                }))
+            app = Mobstiq(config_path)
+            with app.config(save=True) as config:
+                config['noSave'] = True
+
+            # Measure registration
+            start = time.perf_counter()
+            for ix in range(args.registrations):
+                status, _, _ = app.request('POST', '/playerRegister', wsgi_input=f'{{"name": "New Player {ix}"}}'.encode('utf-8'))
+                assert status == '200 OK'
+            register_us = (time.perf_counter() - start) * 1e6 / args.registrations
+
+            # Measure the linear name scan (fewer iterations - it's slow)
+            scan_count = max(1, args.registrations // 100)
+            players = app.config.config['players']
+            start = time.perf_counter()
+            for ix in range(scan_count):
+                name = f'Other Player {ix}'
+                assert not any(player for player in players.values() if name == player['name'])
+            scan_us = (time.perf_counter() - start) * 1e6 / scan_count
+
+            print(f'{count:>8} {register_us:>14.1f} {scan_us:>17.1f}')
+
+
+if __name__ == '__main__':
+    main()
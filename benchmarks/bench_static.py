@@ -0,0 +1,54 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+"""
+Static asset benchmark - measures the bytes transferred per page load for each of the mobstiq front-end statics by
+content encoding. A revalidated page load (If-None-Match) transfers no content.
+
+Usage: PYTHONPATH=src python3 benchmarks/bench_static.py
+"""
+
+import argparse
+import os
+from tempfile import TemporaryDirectory
+
+from mobstiq.app import Mobstiq
+
+
+# The page load static URLs
+STATIC_URLS = ('/', '/mobstiq.bundle.bare')
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench_static')
+    parser.add_argument('-e', dest='encodings', nargs='+', default=['identity', 'gzip', 'br'],
+                        help='the Accept-Encoding values (default is "identity gzip br")')
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp_dir:
+        app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'))
+        try:
+            print(f'{"static":<22} ' + ' '.join(f'{encoding:>9}' for encoding in args.encodings) + f' {"revalidated":>12}')
+            totals = [0] * len(args.encodings)
+            for url in STATIC_URLS:
+                sizes = []
+                for ix_encoding, encoding in enumerate(args.encodings):
+                    _, headers, content = app.request('GET', url, environ={'HTTP_ACCEPT_ENCODING': encoding})
+                    sizes.append(len(content))
+                    totals[ix_encoding] += len(content)
+
+                # Revalidated load of the last encoding
+                environ = {'HTTP_ACCEPT_ENCODING': args.encodings[-1], 'HTTP_IF_NONE_MATCH': dict(headers)['ETag']}
+                status, _, content = app.request('GET', url, environ=environ)
+                assert status == '304 Not Modified'
+                print(f'{url:<22} ' + ' '.join(f'{size:>9}' for size in sizes) + f' {len(content):>12}')
+
+            # Report the page load total and the bytes saved
+            print(f'{"total":<22} ' + ' '.join(f'{total:>9}' for total in totals) + f' {0:>12}')
+            print(f'{"saved":<22} ' + ' '.join(f'{totals[0] - total:>9}' for total in totals) + f' {totals[0]:>12}')
+        finally:
+            app.config.close()
+
+
+if __name__ == '__main__':
+    main()
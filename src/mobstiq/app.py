@@ -5,99 +5,748 @@
 The mobstiq back-end application
 """
 
-from contextlib import contextmanager
-import json
-import os
+from contextlib import contextmanager, nullcontext
+from http import HTTPStatus
+import functools
 import importlib.resources
+import logging
 import socket
 import threading
+import time
 import uuid
 
 import chisel
 import schema_markdown
 
+from .assets import CompressedStaticRequest, LazyStaticRequest, etag_matches, strong_etag
+from .events import EventHub, format_event
+from .flight import SingleFlight
+from .games import GameRegistry
+from .patch import PatchError, apply_patch
+from .storage import STORAGE_ERRORS, create_storage
+
 
 # The mobstiq back-end API WSGI application class
 class Mobstiq(chisel.Application):
-    __slots__ = ('config',)
+    __slots__ = ('config', 'games')
+
 
+    # The hosted markdown-up site URL
+    MARKDOWN_UP_URL = 'https://craigahobbs.github.io/markdown-up/'
 
-    def __init__(self, config_path):
+
+    # The config_args are the ConfigManager keyword arguments. If local_markdown_up is True, the index page loads the
+    # markdown-up front-end runtime bundled with chisel (served at "/markdown-up/") rather than the hosted markdown-up site.
+    # If games is None, the game registry has the built-in games and the installed game plugins.
+    def __init__(self, config_path, local_markdown_up=False, games=None, **config_args):
         super().__init__()
-        self.config = ConfigManager(config_path)
+        self.config = ConfigManager(config_path, **config_args)
+        self.games = games if games is not None else create_game_registry()
 
-        # Back-end documentation
-        self.add_requests(chisel.create_doc_requests())
+        # Back-end documentation - the markdown-up runtime statics are compressed
+        for request in chisel.create_doc_requests():
+            if isinstance(request, chisel.StaticRequest) and request.doc_group == 'MarkdownUp Statics':
+                request = CompressedStaticRequest(
+                    request.name, request.content, content_type=request.content_type, urls=request.urls, doc_group=request.doc_group
+                )
+            self.add_request(request)
 
         # Back-end APIs
+        self.add_request(batch)
         self.add_request(game_add_player)
+        self.add_request(game_events)
         self.add_request(game_include)
         self.add_request(game_remove_player)
         self.add_request(game_setup)
         self.add_request(game_start)
         self.add_request(game_state)
+        self.add_request(game_state_wait)
         self.add_request(game_stop)
         self.add_request(game_update)
+        self.add_request(game_view)
         self.add_request(get_game_list)
+        self.add_request(get_stats)
         self.add_request(get_service_url)
         self.add_request(player_register)
         self.add_request(player_validate)
-
-        # Front-end statics
-        self.add_static('index.html', urls=(('GET', None), ('GET', '/')))
+        self.add_request(player_validate_batch)
+
+        # Front-end statics - the index page loads the script bundle by its versioned URL, so the bundle is cached until
+        # it changes
+        index_content = _read_static('index.html')
+        if local_markdown_up:
+            index_content = index_content.replace(self.MARKDOWN_UP_URL.encode('utf-8'), b'./markdown-up/')
+        bundle = LazyStaticRequest(BUNDLE_INCLUDE, lambda: _bundle_scripts(self.games), doc_group='mobstiq Statics')
+        self.add_request(LazyStaticRequest(
+            'index.html', lambda: _version_bundle_url(index_content, bundle), urls=(('GET', None), ('GET', '/')),
+            doc_group='mobstiq Statics'
+        ))
         self.add_static('mobstiq.bare')
-        self.add_static('games/checkers.bare')
-        self.add_static('games/ticTacToe.bare')
+        self.add_request(bundle)
+        for game_info in BUILTIN_GAMES:
+            self.add_static(game_info['include'])
+
+
+    # If content is None, the static's content is read from the package's statics
+    def add_static(
+        self, filename, urls=(('GET', None),), doc_group='mobstiq Statics', cache_control=CompressedStaticRequest.CACHE_CONTROL,
+        content=None
+    ):
+        if content is None:
+            content = _read_static(filename)
+        self.add_request(CompressedStaticRequest(filename, content, cache_control=cache_control, urls=urls, doc_group=doc_group))
+
 
+# Read a package static's content
+def _read_static(filename):
+    with importlib.resources.files('mobstiq.static').joinpath(filename).open('rb') as fh:
+        return fh.read()
 
-    def add_static(self, filename, urls=(('GET', None),), doc_group='mobstiq Statics'):
-        with importlib.resources.files('mobstiq.static').joinpath(filename).open('rb') as fh:
-            self.add_request(chisel.StaticRequest(filename, fh.read(), urls=urls, doc_group=doc_group))
+
+# Concatenate mobstiq.bare and the game scripts into a single script, so the front-end loads the application and all
+# games with one request. Game scripts must only include system includes, which are loaded once regardless of repetition.
+# Games that fail to load are not bundled.
+def _bundle_scripts(games):
+    scripts = [b'# Bundled "mobstiq.bare"\n\n' + _read_static('mobstiq.bare')]
+    for name in games.names():
+        script = games.get_script(name)
+        if script is not None:
+            scripts.append(f'# Bundled game "{name}"\n\n'.encode('utf-8') + script)
+    return b'\n\n'.join(scripts)
+
+
+# Replace the script bundle's URLs in the index page's content with the bundle's versioned URL
+def _version_bundle_url(index_content, bundle):
+    return index_content.replace(
+        BUNDLE_INCLUDE.encode('utf-8'), f'{BUNDLE_INCLUDE}?v={bundle.get_static().version}'.encode('utf-8')
+    )
 
 
 # The mobstiq configuration context manager
 class ConfigManager:
-    __slots__ = ('config_path', 'config_lock', 'config')
+    __slots__ = (
+        'config_path', 'durability', 'storage', 'config_lock', 'config', 'changes', 'snapshot', 'room_locks',
+        'version', 'version_condition', 'game_deltas', 'events', 'responses', 'ignore_case', 'player_names',
+        'player_ttl', 'player_seen', 'player_seen_days', 'seen_lock', 'seen_pending', 'reaper_stop', 'reaper_thread',
+        'save_window', 'save_lock', 'flush_condition', 'flush_changes', 'flush_stop', 'flush_thread', 'max_waiters', 'waiter_count'
+    )
 
 
-    def __init__(self, config_path):
-        self.config_path = config_path
-        self.config_lock = threading.Lock()
+    # The config durability levels:
+    #
+    # - none: config changes are not saved
+    # - write: config changes are written atomically, but not flushed to disk (the default)
+    # - batch: config changes are written on the flusher thread - each coalesced write is flushed to disk (group commit)
+    # - sync: each config change is written and flushed to disk before the saving context exits
+    DURABILITY_LEVELS = ('none', 'write', 'batch', 'sync')
 
-        # Ensure the config file exists with default config if it doesn't exist
-        if os.path.isfile(self.config_path):
-            with open(self.config_path, 'r', encoding='utf-8') as fh_config:
-                self.config = schema_markdown.validate_type(MOBSTIQ_TYPES, 'MobstiqConfig', json.loads(fh_config.read()))
-        else:
-            self.config = {'players': {}}
+
+    # The default "batch" durability save window, in seconds
+    BATCH_SAVE_WINDOW = 0.1
 
 
+    # The maximum number of seconds between inactive player evictions
+    PLAYER_REAP_INTERVAL = 60
+
+
+    # The number of seconds in a player last-seen day
+    PLAYER_SEEN_DAY = 86400
+
+
+    # The maximum number of players evicted per config save
+    PLAYER_REAP_BATCH_SIZE = 100
+
+
+    # The max_waiters is the maximum number of concurrent game state waiters and max_subscribers is the maximum number of
+    # game state event streams (None is unlimited). Each waiter and event stream holds a request thread, so the limits
+    # should leave request threads for other requests.
+    def __init__(
+        self, config_path, *, journal=False, split=False, durability='write', save_window=None, ignore_case=False, player_ttl=None,
+        max_waiters=None, max_subscribers=None
+    ):
+        if durability not in self.DURABILITY_LEVELS:
+            raise ValueError(f'Invalid durability level "{durability}"')
+        if durability in ('none', 'sync') and save_window is not None:
+            raise ValueError(f'The "{durability}" durability level does not support a save window')
+        if durability == 'batch' and save_window is None:
+            save_window = self.BATCH_SAVE_WINDOW
+        self.config_path = config_path
+        self.durability = durability
+        self.ignore_case = ignore_case
+        self.player_ttl = player_ttl
+        self.reaper_stop = threading.Event()
+        self.reaper_thread = None
+        self.storage = create_storage(config_path, journal=journal, split=split, sync=durability in ('batch', 'sync'))
+        self.config_lock = ReadWriteLock()
+        self.changes = threading.local()
+        self.version_condition = threading.Condition()
+        self.game_deltas = {}
+        self.events = EventHub(max_subscribers=max_subscribers)
+        self.responses = ResponseCache()
+        self.save_window = save_window
+        self.max_waiters = max_waiters
+        self.waiter_count = 0
+        self.save_lock = threading.Lock()
+        self.flush_condition = threading.Condition()
+        self.flush_changes = None
+        self.flush_stop = False
+        self.flush_thread = None
+
+        # Load the config - untrusted configs (e.g. edited by hand) are validated
+        config, trusted = self.storage.load()
+        self.config = config if trusted else schema_markdown.validate_type(MOBSTIQ_TYPES, 'MobstiqConfig', config)
+        self.storage.loaded(self.config)
+
+        # Index the player names
+        self.player_names = {self._player_name_key(player['name']): player['id'] for player in self.config['players'].values()}
+
+        # Create the room locks
+        self.room_locks = {room_id: threading.Lock() for room_id in (None, *self.config.get('rooms', {}))}
+
+        # Continue the game state version counter from the loaded games
+        self.version = max((game.get('version', 0) for game in self._games(self.config)), default=0)
+
+        # Version and save any unversioned games (e.g. from an older config file)
+        changes = self.changes.paths = []
+        for room_id in list(self.room_locks):
+            game = self.get_game(self.config, room_id)
+            if game is not None and 'version' not in game:
+                self.set_game(room_id, game)
+        if changes:
+            self._save(changes)
+
+        # Load the player last-seen times
+        self.player_seen = {}
+        self.player_seen_days = {}
+        self.seen_lock = threading.Lock()
+        self.seen_pending = {}
+        self._load_seen()
+
+        # Publish the initial config snapshot
+        self.snapshot = dict(self.config)
+
+        # Start the background threads
+        self._start_threads()
+
+
+    # Start the write-behind flusher thread and the inactive player reaper thread, if necessary
+    def _start_threads(self):
+        if self.save_window is not None:
+            self.flush_thread = threading.Thread(target=self._flusher)
+            self.flush_thread.daemon = True
+            self.flush_thread.start()
+        if self.player_ttl is not None:
+            self.reaper_thread = threading.Thread(target=self._reaper)
+            self.reaper_thread.daemon = True
+            self.reaper_thread.start()
+
+
+    # Config contexts that don't save share read access to the config and must not modify it. Saving config contexts
+    # have exclusive access and publish a new config snapshot on exit.
+    #
+    # Config snapshots are read without locking. Saving contexts must replace (not modify) the game and player records so
+    # that published snapshots never change. The players and rooms maps are shared by snapshots - lookups are atomic.
+    #
+    # Config contexts entered within a saving config context (e.g. by the batch action) are nested - the outer saving
+    # config context publishes and saves their changes.
     @contextmanager
     def __call__(self, save=False):
-        # Acquire the config lock
+        # Nested config context?
+        if self.config_lock.owned():
+            yield self.config
+            return
+
+        # Read-only config context?
+        if not save:
+            with self.config_lock.read():
+                yield self.config
+            return
+
+        # Acquire the config write lock
         self.config_lock.acquire()
 
         try:
             # Yield the config on context entry
+            changes = self.changes.paths = []
             yield self.config
 
-            # Save the config file on context exit, if requested
-            if save and not self.config.get('noSave'):
-                with open(self.config_path, 'w', encoding='utf-8') as fh_config:
-                    config_json = schema_markdown.JSONEncoder(indent=4).encode(self.config)
-                    fh_config.write(config_json)
+            # Publish the new config snapshot
+            self.snapshot = dict(self.config)
+            self._publish_games(changes)
+
+            # Save the config on context exit
+            self._save(changes)
         finally:
             # Release the config lock
             self.config_lock.release()
 
 
+    # Room config contexts share read access to the config and have exclusive access to the room's game, so games in
+    # different rooms are updated in parallel. Room config contexts may only replace the room's existing game (see
+    # "set_game") - games are added and deleted in saving config contexts. The default room's ID is None.
+    @contextmanager
+    def room(self, room_id):
+        # Nested config context?
+        if self.config_lock.owned():
+            yield self.config
+            return
+
+        # Rooms are added and deleted with exclusive access, so the room lock is looked up with the read lock held. An
+        # unknown room has no lock - its game is None.
+        with self.config_lock.read(), self.room_locks.get(room_id, nullcontext()):
+            # Yield the config on context entry
+            changes = self.changes.paths = []
+            yield self.config
+
+            # Publish the new config snapshot - room games are shared by snapshots
+            if room_id is None:
+                self.snapshot = dict(self.config)
+            self._publish_games(changes)
+
+            # Save the config on context exit
+            self._save(changes)
+
+
+    # Invalidate the cached game state responses, wake the game state waiters, and publish the game state events of
+    # changed rooms
+    def _publish_games(self, changes):
+        room_ids = list(dict.fromkeys(path[1] if path[0] == 'rooms' else None for path in changes if path[0] in ('game', 'rooms')))
+        if room_ids:
+            for room_id in room_ids:
+                self.responses.invalidate(('gameState', room_id))
+                self.responses.invalidate(('gameView', room_id))
+            with self.version_condition:
+                self.version_condition.notify_all()
+
+            # Publish the game state events - room changes are serialized by the room lock, so events are in order. A
+            # deleted room's event streams end.
+            for room_id in room_ids:
+                if self.events.has_subscribers(room_id):
+                    game = self.get_game(self.config, room_id)
+                    self.events.publish(room_id, self.game_event(game, self.get_game_version(game)))
+                    if game is None and room_id is not None:
+                        self.events.end_topic(room_id)
+
+
+    # Format a game state server-sent event - the event data is the gameStateWait response
+    @staticmethod
+    def game_event(game, version):
+        event_data = {'game': game, 'version': version} if game is not None else {'version': version}
+        return format_event(version, GAME_EVENT_ENCODER.encode(event_data))
+
+
+    # Wait for a room's game state version to differ from the version (or not wait if the version is None) - returns
+    # the room's game (or None) and its game state version
+    def wait_game(self, room_id, version, timeout):
+        with self.version_condition:
+            if version is not None:
+                self.version_condition.wait_for(lambda: self.get_game_version(self.get_game(self.snapshot, room_id)) != version, timeout)
+            game = self.get_game(self.snapshot, room_id)
+            return game, self.get_game_version(game)
+
+
+    # Wait for a room's game state version to differ from the version, limited to the maximum number of concurrent
+    # waiters - returns the room's game (or None), its game state version, and True if the waiter limit was reached. If
+    # the waiter limit is reached, returns immediately.
+    def wait_game_limited(self, room_id, version, timeout):
+        if self.max_waiters is None or version is None or timeout <= 0:
+            return (*self.wait_game(room_id, version, timeout), False)
+
+        # Too many waiters?
+        with self.version_condition:
+            busy = self.waiter_count >= self.max_waiters
+            if not busy:
+                self.waiter_count += 1
+        if busy:
+            return (*self.wait_game(room_id, version, 0), True)
+        try:
+            return (*self.wait_game(room_id, version, timeout), False)
+        finally:
+            with self.version_condition:
+                self.waiter_count -= 1
+
+
+    # Get a room's game delta patch from a base game state version to a game state version - returns None if the delta
+    # is not available (e.g. the base version is not the game's previous version)
+    def get_game_delta(self, room_id, base_version, version):
+        game_delta = self.game_deltas.get(room_id)
+        if game_delta is not None and game_delta[0] == base_version and game_delta[1] == version:
+            return game_delta[2]
+        return None
+
+
+    # Save config changes from a saving or room config context
+    def _save(self, changes):
+        if self.durability == 'none' or self.config.get('noSave'):
+            return
+
+        if self.save_window is None:
+            # Room config contexts save concurrently, so serialize the writes
+            with self.save_lock:
+                self.storage.write(self.storage.encode(self.config, changes))
+                self.storage.compact(self.config)
+        else:
+            # Mark the config dirty - the flusher thread saves it. The flusher is only woken by the first save of the
+            # window so that the window's later saves are coalesced.
+            with self.flush_condition:
+                if self.flush_changes is None:
+                    self.flush_changes = []
+                    self.flush_condition.notify()
+                self.flush_changes.extend(changes)
+
+
+    # Get a room's game from the config or a config snapshot - returns None if there is no game
+    @staticmethod
+    def get_game(config, room_id):
+        if room_id is None:
+            return config.get('game')
+        return config.get('rooms', {}).get(room_id)
+
+
+    # Get a game's state version - no game's version is zero
+    @staticmethod
+    def get_game_version(game):
+        return game.get('version', 0) if game is not None else 0
+
+
+    # Set a room's game and advance its game state version - a game of None deletes the room's game. Game state versions
+    # are unique across rooms, so a recreated game's versions are new. Adding or deleting a room's game requires a saving
+    # config context. Replacing a room's game requires a saving config context or the room's config context.
+    #
+    # The delta is the JSON Patch from the game's previous version (the game's version member) to the game, excluding the
+    # version. Only the latest delta of each room is kept.
+    def set_game(self, room_id, game, delta=None):
+        if game is not None:
+            with self.version_condition:
+                self.version += 1
+                base_version = game.get('version')
+                game = {**game, 'version': self.version}
+                if delta is not None and base_version is not None:
+                    delta = [*delta, {'op': 'replace', 'path': '/version', 'value': self.version}]
+                    self.game_deltas[room_id] = (base_version, self.version, delta)
+                else:
+                    self.game_deltas.pop(room_id, None)
+        else:
+            self.game_deltas.pop(room_id, None)
+
+        if room_id is None:
+            if game is not None:
+                self.config['game'] = game
+            else:
+                del self.config['game']
+            self.changed('game')
+        else:
+            if game is not None:
+                self.config.setdefault('rooms', {})[room_id] = game
+                self.room_locks.setdefault(room_id, threading.Lock())
+            else:
+                del self.config['rooms'][room_id]
+                if not self.config['rooms']:
+                    del self.config['rooms']
+                self.room_locks.pop(room_id, None)
+            self.changed('rooms', room_id)
+
+
+    # Record a config change path (e.g. "('players', player_id)") within a saving or room config context. Storage
+    # back-ends that support it write only the changed values.
+    def changed(self, *path):
+        self.changes.paths.append(path)
+
+        # Index a new player's name
+        if len(path) == 2 and path[0] == 'players':
+            player = self.config['players'].get(path[1])
+            if player is not None:
+                self.player_names[self._player_name_key(player['name'])] = player['id']
+
+
+    # Find a player by name - returns None if not found. The player name index is maintained for added players. Removed
+    # players' index entries are not removed, so the index entry is verified against the player.
+    def find_player_name(self, name):
+        name_key = self._player_name_key(name)
+        player_id = self.player_names.get(name_key)
+        if player_id is not None:
+            player = self.config['players'].get(player_id)
+            if player is not None and self._player_name_key(player['name']) == name_key:
+                return player
+        return None
+
+
+    # Mark a player as active - may be called without a config context. If inactive players are evicted, a changed
+    # last-seen day is saved on the next reaper interval.
+    def seen(self, player_id):
+        self.player_seen[player_id] = time.monotonic()
+        if self.player_ttl is not None:
+            seen_day = self.seen_day()
+            if self.player_seen_days.get(player_id) != seen_day:
+                with self.seen_lock:
+                    self.player_seen_days[player_id] = seen_day
+                    self.seen_pending[player_id] = seen_day
+
+
+    # Load the player last-seen times - if inactive players are evicted, a player's last-seen day ("lastSeen") is saved so
+    # that inactivity spans restarts. A player is last seen at the end of their last-seen day, so players are never evicted
+    # early. Loaded players without a last-seen day are last seen now.
+    def _load_seen(self):
+        load_time = time.monotonic()
+        load_time_wall = time.time()
+        for player in self.config['players'].values():
+            seen_day = player.get('lastSeen')
+            if self.player_ttl is None or seen_day is None:
+                self.seen(player['id'])
+            else:
+                self.player_seen_days[player['id']] = seen_day
+                self.player_seen[player['id']] = load_time - max(0, load_time_wall - (seen_day + 1) * self.PLAYER_SEEN_DAY)
+
+
+    # Save the changed player last-seen days
+    def save_seen(self):
+        with self.seen_lock:
+            seen_days, self.seen_pending = self.seen_pending, {}
+        if seen_days:
+            with self(save=True) as config:
+                for player_id, seen_day in seen_days.items():
+                    player = config['players'].get(player_id)
+                    if player is not None and player.get('lastSeen') != seen_day:
+                        config['players'][player_id] = {**player, 'lastSeen': seen_day}
+                        self.changed('players', player_id)
+
+
+    # Get the current player last-seen day - days since the Unix epoch
+    @classmethod
+    def seen_day(cls):
+        return int(time.time() // cls.PLAYER_SEEN_DAY)
+
+
+    # Evict players inactive for longer than the player TTL that are not in a game - returns the number of
+    # players evicted. Players are evicted in batches to bound the time the config lock is held.
+    def evict_players(self):
+        # Find the inactive players
+        expire_time = time.monotonic() - self.player_ttl
+        evict_ids = [player_id for player_id, seen_time in list(self.player_seen.items()) if seen_time < expire_time]
+
+        # Evict the inactive players in batches
+        evict_count = 0
+        for batch_index in range(0, len(evict_ids), self.PLAYER_REAP_BATCH_SIZE):
+            with self(save=True) as config:
+                game_players = set(self._game_players(config))
+                for player_id in evict_ids[batch_index:batch_index + self.PLAYER_REAP_BATCH_SIZE]:
+                    # Player seen since or in a room game?
+                    if self.player_seen.get(player_id, expire_time) >= expire_time or player_id in game_players:
+                        continue
+
+                    # Remove the player and its name index entry
+                    player = config['players'].pop(player_id, None)
+                    del self.player_seen[player_id]
+                    self.player_seen_days.pop(player_id, None)
+                    if player is not None:
+                        name_key = self._player_name_key(player['name'])
+                        if self.player_names.get(name_key) == player_id:
+                            del self.player_names[name_key]
+                        self.changed('players', player_id)
+                        evict_count += 1
+
+        return evict_count
+
+
+    # Generate all room games
+    @staticmethod
+    def _games(config):
+        game = config.get('game')
+        if game is not None:
+            yield game
+        yield from config.get('rooms', {}).values()
+
+
+    # Generate the player IDs of all room games
+    @staticmethod
+    def _game_players(config):
+        for game in ConfigManager._games(config):
+            yield from game['players']
+
+
+    # Get a player name's index key
+    def _player_name_key(self, name):
+        return name.casefold() if self.ignore_case else name
+
+
+    # Save any unsaved (write-behind) config changes
+    def flush(self):
+        with self.save_lock:
+            # Encode the unsaved changes
+            with self.config_lock.read():
+                with self.flush_condition:
+                    changes, self.flush_changes = self.flush_changes, None
+                if changes is None:
+                    return
+                save_data = self.storage.encode(self.config, changes)
+
+            # Write the changes outside of the config lock - a failed write's changes are restored to be retried by the
+            # next flush
+            try:
+                self.storage.write(save_data)
+            except STORAGE_ERRORS:
+                with self.flush_condition:
+                    self.flush_changes = changes + (self.flush_changes or [])
+                raise
+            with self.config_lock.read():
+                self.storage.compact(self.config)
+
+
+    # Stop the background threads, end the event streams, save any unsaved config changes, and close the storage back-end
+    def close(self):
+        self.events.close()
+        if self.reaper_thread is not None:
+            self.reaper_stop.set()
+            self.reaper_thread.join()
+            self.save_seen()
+        if self.flush_thread is not None:
+            with self.flush_condition:
+                self.flush_stop = True
+                self.flush_condition.notify()
+            self.flush_thread.join()
+            self.flush()
+        self.storage.close()
+
+
+    # The write-behind flusher thread function
+    def _flusher(self):
+        while True:
+            with self.flush_condition:
+                # Wait for a save
+                while self.flush_changes is None and not self.flush_stop:
+                    self.flush_condition.wait()
+
+                # Coalesce saves until the save window's deadline (unless stopping)
+                deadline = time.monotonic() + self.save_window
+                self.flush_condition.wait_for(lambda: self.flush_stop, max(0, deadline - time.monotonic()))
+                flush_stop = self.flush_stop
+
+            # Save the config - failed saves are logged and retried after the next save window
+            try:
+                self.flush()
+            except STORAGE_ERRORS:
+                logging.getLogger(__name__).exception('Failed to save the config')
+            if flush_stop:
+                break
+
+
+    # The inactive player reaper thread function
+    def _reaper(self):
+        while not self.reaper_stop.wait(min(self.player_ttl, self.PLAYER_REAP_INTERVAL)):
+            self.save_seen()
+            self.evict_players()
+
+
+# A reader/writer lock - readers share access and writers have exclusive access. Waiting writers take precedence
+# over new readers so that a steady stream of readers can't starve writers.
+class ReadWriteLock:
+    __slots__ = ('condition', 'readers', 'writer', 'writers_waiting')
+
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = None
+        self.writers_waiting = 0
+
+
+    # Acquire the write lock
+    def acquire(self):
+        with self.condition:
+            self.writers_waiting += 1
+            while self.writer is not None or self.readers:
+                self.condition.wait()
+            self.writers_waiting -= 1
+            self.writer = threading.get_ident()
+
+
+    # Release the write lock
+    def release(self):
+        with self.condition:
+            self.writer = None
+            self.condition.notify_all()
+
+
+    # Does the current thread hold the write lock?
+    def owned(self):
+        return self.writer == threading.get_ident()
+
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+    # Read lock context manager
+    @contextmanager
+    def read(self):
+        with self.condition:
+            while self.writer is not None or self.writers_waiting:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+
+# A cache of encoded JSON responses - a cached response is re-encoded when its version changes. Concurrent requests for
+# the same uncached response version share a single encoding.
+class ResponseCache:
+    __slots__ = ('responses', 'flights')
+
+
+    def __init__(self):
+        self.responses = {}
+        self.flights = SingleFlight()
+
+
+    # Get a cached response's content bytes - the response function is called only if the response version changed
+    def get(self, key, version, response_fn):
+        cached = self.responses.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        return self.flights.do((key, version), lambda: self._encode(key, version, response_fn))
+
+
+    # Encode and cache a response
+    def _encode(self, key, version, response_fn):
+        content = RESPONSE_ENCODER.encode(response_fn()).encode('utf-8')
+        self.responses[key] = (version, content)
+        return content
+
+
+    # Invalidate a cached response
+    def invalidate(self, key):
+        self.responses.pop(key, None)
+
+
 # The mobstiq API type model
 with importlib.resources.files('mobstiq.static').joinpath('mobstiq.smd').open('r') as cm_smd:
     MOBSTIQ_TYPES = schema_markdown.parse_schema_markdown(cm_smd.read())
 
 
-# The game list
-GAMES = schema_markdown.validate_type(MOBSTIQ_TYPES, 'GameInfos', [
+# The game state event JSON encoder
+GAME_EVENT_ENCODER = schema_markdown.JSONEncoder(separators=(',', ':'))
+
+
+# The cached response JSON encoder - matches chisel's action response encoding
+RESPONSE_ENCODER = schema_markdown.JSONEncoder(allow_nan=False, sort_keys=True, separators=(',', ':'))
+
+
+# The script bundle static - the front-end includes the application and all game scripts from the bundle
+BUNDLE_INCLUDE = 'mobstiq.bundle.bare'
+
+
+# The built-in games
+BUILTIN_GAMES = schema_markdown.validate_type(MOBSTIQ_TYPES, 'GameInfos', [
     {
         'name': 'Checkers',
         'include': 'games/checkers.bare',
@@ -115,6 +764,23 @@ GAMES = schema_markdown.validate_type(MOBSTIQ_TYPES, 'GameInfos', [
 ])
 
 
+# Create the game registry - the built-in games and the installed game plugins
+def create_game_registry():
+    games = GameRegistry(MOBSTIQ_TYPES)
+    for game_info in BUILTIN_GAMES:
+        games.add_package_game(game_info)
+    games.add_entry_points(BUNDLE_INCLUDE)
+    return games
+
+
+# Compute a game's gameInclude response content and ETag - the response depends only on the game's function, so it is
+# computed once per game
+@functools.lru_cache(maxsize=None)
+def _game_include_response(game_function):
+    content = f"mobstiqGameIncludeFunction = '{game_function}'\n".encode('utf-8')
+    return content, strong_etag(content)
+
+
 @chisel.action(name='getServiceURL', types=MOBSTIQ_TYPES)
 def get_service_url(unused_ctx, unused_req):
     # Create a UDP socket and connect to a public IP (no actual connection is made)
@@ -127,10 +793,19 @@ def get_service_url(unused_ctx, unused_req):
     }
 
 
-@chisel.action(name='getGameList', types=MOBSTIQ_TYPES)
-def get_game_list(unused_ctx, unused_req):
+@chisel.action(name='getGameList', types=MOBSTIQ_TYPES, wsgi_response=True)
+def get_game_list(ctx, unused_req):
+    return _cached_response(ctx, 'getGameList', 'getGameList', 0, lambda: {
+        'games': ctx.app.games.get_all()
+    })
+
+
+@chisel.action(name='getStats', types=MOBSTIQ_TYPES)
+def get_stats(ctx, unused_req):
+    flights = ctx.app.config.responses.flights
     return {
-        'games': GAMES
+        'responsesEncoded': flights.executed,
+        'responsesCoalesced': flights.coalesced
     }
 
 
@@ -139,36 +814,156 @@ def player_register(ctx, req):
     with ctx.app.config(save=True) as config:
         # Name in use?
         name = req['name']
-        players = config['players']
-        if any(player for player in players.values() if name == player['name']):
+        if ctx.app.config.find_player_name(name) is not None:
             raise chisel.ActionError('NameInUse')
 
         # Add the new player
         player_id = str(uuid.uuid4())
         player = {'id': player_id, 'name': name}
-        players[player_id] = player
+        config['players'][player_id] = player
+        ctx.app.config.changed('players', player_id)
+        ctx.app.config.seen(player_id)
         return player
 
 
 @chisel.action(name='playerValidate', types=MOBSTIQ_TYPES)
 def player_validate(ctx, req):
-    with ctx.app.config() as config:
-        # Unknown ID?
-        id_ = req['id']
-        players = config['players']
-        if id_ not in players:
-            raise chisel.ActionError('InvalidPlayer')
-
-        # Return the player
-        return players[id_]
-
-
-@chisel.action(name='gameState', types=MOBSTIQ_TYPES)
-def game_state(ctx, unused_req):
-    with ctx.app.config() as config:
-        if 'game' in config:
-            return {'game': config['game']}
-        return {}
+    # Unknown ID?
+    player = ctx.app.config.snapshot['players'].get(req['id'])
+    if player is None:
+        raise chisel.ActionError('InvalidPlayer')
+
+    # Mark the player active and return the player
+    ctx.app.config.seen(player['id'])
+    return player
+
+
+@chisel.action(name='playerValidateBatch', types=MOBSTIQ_TYPES)
+def player_validate_batch(ctx, req):
+    # Unknown IDs? All players are read from the same config snapshot.
+    snapshot_players = ctx.app.config.snapshot['players']
+    players = [snapshot_players.get(player_id) for player_id in req['ids']]
+    if None in players:
+        raise chisel.ActionError('InvalidPlayer')
+
+    # Mark the players active and return the players
+    for player in players:
+        ctx.app.config.seen(player['id'])
+    return {'players': players}
+
+
+@chisel.action(name='batch', types=MOBSTIQ_TYPES)
+def batch(ctx, req):
+    results = []
+    with ctx.app.config(save=True):
+        for batch_request in req['requests']:
+            action = ctx.app.requests[batch_request['name']]
+            action_model = action.model
+            try:
+                # Validate the action's input - all batch actions have input
+                try:
+                    action_input = schema_markdown.validate_type(action.types, action_model['input'], batch_request['input'])
+                except schema_markdown.ValidationError as exc:
+                    raise chisel.ActionError('InvalidInput', message=str(exc))
+
+                # Call the action - its config contexts are nested in the batch's saving config context
+                output = action.action_callback(ctx, action_input)
+                if output is None:
+                    output = {}
+                if ctx.app.validate_output and 'output' in action_model:
+                    schema_markdown.validate_type(action.types, action_model['output'], output)
+                results.append({'output': output})
+            except chisel.ActionError as exc:
+                result = {'error': exc.error}
+                if exc.message is not None:
+                    result['message'] = exc.message
+                results.append(result)
+                break
+
+    return {'results': results}
+
+
+@chisel.action(name='gameState', types=MOBSTIQ_TYPES, wsgi_response=True)
+def game_state(ctx, req):
+    room_id = req.get('room')
+    game = ConfigManager.get_game(ctx.app.config.snapshot, room_id)
+    version = ConfigManager.get_game_version(game)
+
+    # Game state version unchanged?
+    if_version = req.get('ifVersion')
+    if if_version is not None and version == if_version:
+        return _cached_response(ctx, 'gameState', 'gameStateUnchanged', 0, lambda: {'unchanged': True})
+
+    # No game? Unknown rooms are not cached.
+    if game is None:
+        return _cached_response(ctx, 'gameState', 'gameStateNoGame', 0, dict)
+
+    # Return the game state response - encoded once per game state version
+    return _cached_response(ctx, 'gameState', ('gameState', room_id), version, lambda: {'game': game})
+
+
+@chisel.action(name='gameView', types=MOBSTIQ_TYPES, wsgi_response=True)
+def game_view(ctx, req):
+    room_id = req.get('room')
+    snapshot = ctx.app.config.snapshot
+    game = ConfigManager.get_game(snapshot, room_id)
+
+    # No game? Unknown rooms are not cached.
+    if game is None:
+        return _cached_response(ctx, 'gameView', 'gameViewNoGame', 0, dict)
+
+    # Return the game view response - game players are not removed, so the response is encoded once per game state version
+    def game_view_response():
+        players = [snapshot['players'][player_id] for player_id in game['players'] if player_id in snapshot['players']]
+        response = {'game': game, 'players': players}
+        game_info = ctx.app.games.get(game['name'])
+        if game_info is not None:
+            response['gameInfo'] = game_info
+        return response
+    return _cached_response(ctx, 'gameView', ('gameView', room_id), ConfigManager.get_game_version(game), game_view_response)
+
+
+@chisel.action(name='gameStateWait', types=MOBSTIQ_TYPES)
+def game_state_wait(ctx, req):
+    room_id = req.get('room')
+    client_version = req.get('version')
+    game, version, busy = ctx.app.config.wait_game_limited(room_id, client_version, req.get('timeout', 5000) / 1000)
+    response = {'version': version}
+    if busy:
+        response['busy'] = True
+
+    # Return the delta patch, if requested and available
+    if req.get('delta') and client_version is not None:
+        patch = ctx.app.config.get_game_delta(room_id, client_version, version)
+        if patch is not None:
+            response['patch'] = patch
+            return response
+
+    if game is not None:
+        response['game'] = game
+    return response
+
+
+@chisel.action(name='gameEvents', types=MOBSTIQ_TYPES, wsgi_response=True)
+def game_events(ctx, req):
+    # Queue the room's current game state - called as the subscriber subscribes, so no change is missed or queued first
+    room_id = req.get('room')
+    def queue_game_state(subscriber):
+        game, version = ctx.app.config.wait_game(room_id, None, 0)
+        subscriber.put(ctx.app.config.game_event(game, version))
+
+        # Unknown room? If so, end the event stream after the current game state.
+        if game is None and room_id is not None:
+            subscriber.end()
+
+    # Subscribe to the room's game state events
+    subscriber = ctx.app.config.events.subscribe(room_id, queue_game_state)
+    if subscriber is None:
+        raise chisel.ActionError('TooManyStreams', status=HTTPStatus.SERVICE_UNAVAILABLE)
+
+    # Return the event stream
+    ctx.start_response('200 OK', [('Content-Type', 'text/event-stream'), ('Cache-Control', 'no-cache')])
+    return subscriber
 
 
 @chisel.action(name='gameSetup', types=MOBSTIQ_TYPES)
@@ -179,32 +974,40 @@ def game_setup(ctx, req):
         if id_ not in config['players']:
             raise chisel.ActionError('InvalidPlayer')
 
-        # Unknown function?
+        # Unknown game? The game is loaded on first use.
         game_name = req['name']
-        if not any(game_info for game_info in GAMES if game_info['name'] == game_name):
+        if ctx.app.games.get(game_name) is None:
             raise chisel.ActionError('InvalidName')
 
-        # Game in play?
-        if 'game' in config:
+        # New room? Otherwise, is a game in play in the default room?
+        room_id = None
+        if req.get('newRoom'):
+            room_id = str(uuid.uuid4())
+        elif 'game' in config:
             raise chisel.ActionError('InUse')
 
+        # Mark the player active
+        ctx.app.config.seen(id_)
+
         # Create new game
-        config['game'] = {
+        ctx.app.config.set_game(room_id, {
             'name': game_name,
             'players': [id_]
-        }
+        })
+        return {'room': room_id} if room_id is not None else {}
 
 
 @chisel.action(name='gameAddPlayer', types=MOBSTIQ_TYPES)
 def game_add_player(ctx, req):
-    with ctx.app.config(save=True) as config:
+    room_id = req.get('room')
+    with ctx.app.config.room(room_id) as config:
         # Unknown ID?
         id_ = req['id']
         if id_ not in config['players']:
             raise chisel.ActionError('InvalidPlayer')
 
         # No game?
-        game = config.get('game')
+        game = _get_room_game(config, room_id)
         if game is None or 'current' in game:
             raise chisel.ActionError('NotInSetup')
 
@@ -212,21 +1015,28 @@ def game_add_player(ctx, req):
         if id_ in game['players']:
             raise chisel.ActionError('InvalidPlayer')
 
+        # Game unavailable?
+        game_info = ctx.app.games.get(game['name'])
+        if game_info is None:
+            raise chisel.ActionError('InvalidName')
+
         # Too many players?
-        game_name = game['name']
-        game_info = next(game_info for game_info in GAMES if game_info['name'] == game_name)
         if len(game['players']) >= game_info['maxPlayers']:
             raise chisel.ActionError('TooManyPlayers')
 
+        # Mark the player active
+        ctx.app.config.seen(id_)
+
         # Add the player
-        game['players'].append(id_)
+        ctx.app.config.set_game(room_id, {**game, 'players': [*game['players'], id_]})
 
 
 @chisel.action(name='gameRemovePlayer', types=MOBSTIQ_TYPES)
 def game_remove_player(ctx, req):
-    with ctx.app.config(save=True) as config:
+    room_id = req.get('room')
+    with ctx.app.config.room(room_id) as config:
         # No game in setup?
-        game = config.get('game')
+        game = _get_room_game(config, room_id)
         if game is None or 'current' in game:
             raise chisel.ActionError('NotInSetup')
 
@@ -236,14 +1046,15 @@ def game_remove_player(ctx, req):
             raise chisel.ActionError('InvalidPlayer')
 
         # Remove the player
-        game['players'].remove(id_)
+        ctx.app.config.set_game(room_id, {**game, 'players': [player_id for player_id in game['players'] if player_id != id_]})
 
 
 @chisel.action(name='gameStart', types=MOBSTIQ_TYPES)
 def game_start(ctx, req):
-    with ctx.app.config(save=True) as config:
+    room_id = req.get('room')
+    with ctx.app.config.room(room_id) as config:
         # No game in setup?
-        game = config.get('game')
+        game = _get_room_game(config, room_id)
         if game is None or 'current' in game:
             raise chisel.ActionError('NotInSetup')
 
@@ -252,21 +1063,28 @@ def game_start(ctx, req):
         if id_ not in game['players']:
             raise chisel.ActionError('InvalidPlayer')
 
+        # Game unavailable?
+        game_info = ctx.app.games.get(game['name'])
+        if game_info is None:
+            raise chisel.ActionError('InvalidName')
+
         # Too few players?
-        game_name = game['name']
-        game_info = next(game_info for game_info in GAMES if game_info['name'] == game_name)
         if len(game['players']) < game_info['minPlayers']:
             raise chisel.ActionError('TooFewPlayers')
 
+        # Mark the player active
+        ctx.app.config.seen(id_)
+
         # Start the game
-        game['current'] = game['players'][0]
+        ctx.app.config.set_game(room_id, {**game, 'current': game['players'][0]})
 
 
 @chisel.action(name='gameUpdate', types=MOBSTIQ_TYPES)
 def game_update(ctx, req):
-    with ctx.app.config(save=True) as config:
+    room_id = req.get('room')
+    with ctx.app.config.room(room_id) as config:
         # Check game in play
-        game = config.get('game')
+        game = _get_room_game(config, room_id)
         if game is None or 'current' not in game:
             raise chisel.ActionError('NotInPlay')
 
@@ -275,21 +1093,55 @@ def game_update(ctx, req):
         if game['current'] != id_:
             raise chisel.ActionError('InvalidPlayer')
 
-        # Update the game state
-        game['state'] = req['state']
+        # Mark the player active
+        ctx.app.config.seen(id_)
+
+        # Stale base game state version?
+        base_version = req.get('version')
+        if base_version is not None and base_version != ConfigManager.get_game_version(game):
+            raise chisel.ActionError('StaleVersion')
+
+        # Compute the updated game state - the game state delta patch is relative to the game
+        state = req.get('state')
+        patch = req.get('patch')
+        if (state is None) == (patch is None):
+            raise chisel.ActionError('InvalidPatch', message='Exactly one of "state" and "patch" is required')
+        if patch is not None:
+            if base_version is None:
+                raise chisel.ActionError('InvalidPatch', message='A patch requires the base game state "version"')
+            try:
+                state = apply_patch(game.get('state', {}), patch)
+            except PatchError as exc:
+                raise chisel.ActionError('InvalidPatch', message=str(exc))
+            if not isinstance(state, dict):
+                raise chisel.ActionError('InvalidPatch', message='The patched game state is not an object')
+        if patch is not None and 'state' in game:
+            delta = [_prefix_patch_operation(operation) for operation in patch]
+        else:
+            delta = [{'op': 'add', 'path': '/state', 'value': state}]
 
-        # Advance to the next player
+        # Update the game state and advance to the next player
         players = game['players']
         current_index = players.index(id_)
-        next_index = (current_index + 1) % len(players)
-        game['current'] = players[next_index]
+        next_player = players[(current_index + 1) % len(players)]
+        delta.append({'op': 'replace', 'path': '/current', 'value': next_player})
+        ctx.app.config.set_game(room_id, {**game, 'state': state, 'current': next_player}, delta)
+
+
+# Helper to prefix a game state patch operation's paths with the game's state member
+def _prefix_patch_operation(operation):
+    operation = {**operation, 'path': f'/state{operation["path"]}'}
+    if 'from' in operation:
+        operation['from'] = f'/state{operation["from"]}'
+    return operation
 
 
 @chisel.action(name='gameStop', types=MOBSTIQ_TYPES)
 def game_stop(ctx, req):
+    room_id = req.get('room')
     with ctx.app.config(save=True) as config:
         # Check game in play
-        game = config.get('game')
+        game = _get_room_game(config, room_id)
         if game is None:
             raise chisel.ActionError('NotInPlay')
 
@@ -298,30 +1150,57 @@ def game_stop(ctx, req):
         if id_ not in game['players']:
             raise chisel.ActionError('InvalidPlayer')
 
-        # Stop the game
-        del config['game']
+        # Mark the player active
+        ctx.app.config.seen(id_)
 
+        # Stop the game - a room is deleted with its game
+        ctx.app.config.set_game(room_id, None)
 
-@chisel.action(name='gameInclude', types=MOBSTIQ_TYPES, wsgi_response=True)
-def game_include(ctx, unused_req):
-    with ctx.app.config() as config:
-        # Check game in play
-        game = config.get('game')
-        if game is None:
-            raise chisel.ActionError('NotInPlay')
 
-        # Get the game info
-        game_name = game['name']
-        game_info = next(game_info for game_info in GAMES if game_info['name'] == game_name)
-        game_info_include = game_info['include']
-        game_info_function = game_info['function']
-
-        # Return the BareScript with the game include
-        ctx.start_response('200 OK', [('Content-Type', 'text/plain; charset=utf-8')])
-        return [
-            f"""\
-include '{game_info_include}'
-
-mobstiqGameIncludeFunction = '{game_info_function}'
-""".encode('utf-8')
-        ]
+@chisel.action(name='gameInclude', types=MOBSTIQ_TYPES, wsgi_response=True)
+def game_include(ctx, req):
+    # Check game in play
+    game = ConfigManager.get_game(ctx.app.config.snapshot, req.get('room'))
+    game_info = ctx.app.games.get(game['name']) if game is not None else None
+    if game_info is None:
+        raise chisel.ActionError('NotInPlay')
+
+    # Get the precomputed response - the game's include is bundled in "mobstiq.bundle.bare"
+    content, etag = _game_include_response(game_info['function'])
+    headers = [('Cache-Control', 'no-cache'), ('ETag', etag)]
+
+    # Is the response modified?
+    if_none_match = ctx.environ.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        ctx.start_response('304 Not Modified', headers)
+        return []
+
+    # Return the BareScript with the game function name
+    headers.append(('Content-Type', 'text/plain; charset=utf-8'))
+    ctx.start_response('200 OK', headers)
+    return [content]
+
+
+# Helper to return a cached action response. The response is validated (if enabled) and encoded once per version.
+def _cached_response(ctx, action_name, key, version, response_fn):
+    # Pretty output is not cached
+    if ctx.app.pretty_output:
+        return ctx.response_json(HTTPStatus.OK, response_fn())
+
+    # Validate the uncached response
+    def validated_response_fn():
+        response = response_fn()
+        if ctx.app.validate_output:
+            schema_markdown.validate_type(MOBSTIQ_TYPES, f'{action_name}_output', response)
+        return response
+
+    content = ctx.app.config.responses.get(key, version, validated_response_fn)
+    return ctx.response(HTTPStatus.OK, 'application/json', [content])
+
+
+# Helper to get a room's game within a config context - raises InvalidRoom for an unknown room
+def _get_room_game(config, room_id):
+    game = ConfigManager.get_game(config, room_id)
+    if game is None and room_id is not None:
+        raise chisel.ActionError('InvalidRoom')
+    return game
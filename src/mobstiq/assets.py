@@ -0,0 +1,149 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+"""
+The mobstiq compressed static resource requests
+"""
+
+import functools
+import gzip
+import hashlib
+import threading
+
+import chisel
+
+try:
+    import brotli
+except ImportError: # pragma: no cover
+    brotli = None
+
+
+# A static resource request with precompressed content variants. The variant is selected by the request's
+# "Accept-Encoding" header. Each variant has its own strong ETag and unmodified resources return 304 Not Modified.
+# By default, responses must be revalidated before each use - static URLs are not versioned, so a cached response would
+# otherwise hide updated content. Requests with the versioned URL query string, "v=<version>", are cached indefinitely.
+class CompressedStaticRequest(chisel.StaticRequest):
+    __slots__ = ('cache_control', 'variants', 'version')
+
+
+    # The default "Cache-Control" header value
+    CACHE_CONTROL = 'no-cache'
+
+
+    # The versioned URL "Cache-Control" header value
+    CACHE_CONTROL_VERSIONED = 'public, max-age=31536000, immutable'
+
+
+    def __init__(self, name, content, cache_control=CACHE_CONTROL, **kwargs):
+        super().__init__(name, content, **kwargs)
+        self.cache_control = cache_control
+        self.variants = _content_variants(content, brotli)
+        self.etag = self.variants[-1][2]
+        self.version = self.etag.strip('"')
+
+
+    def __call__(self, environ, start_response):
+        # Select the content variant
+        accepted_encodings = parse_accept_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding, content, etag = next(
+            variant for variant in self.variants if variant[0] is None or accepted_encodings.get(variant[0], 0) > 0
+        )
+        cache_control = self.CACHE_CONTROL_VERSIONED if environ.get('QUERY_STRING') == f'v={self.version}' else self.cache_control
+        headers = [('Cache-Control', cache_control), ('ETag', etag), ('Vary', 'Accept-Encoding')]
+
+        # Is the resource modified?
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            start_response(self.STATUS_NOT_MODIFIED, headers)
+            return []
+
+        headers.append(('Content-Type', self.content_type))
+        headers.append(('Content-Length', str(len(content))))
+        if encoding is not None:
+            headers.append(('Content-Encoding', encoding))
+        start_response(self.STATUS_OK, headers)
+        return [content]
+
+
+# A compressed static resource request whose content is computed on first request by content_fn. The static_args are
+# the CompressedStaticRequest keyword arguments.
+class LazyStaticRequest(chisel.Request):
+    __slots__ = ('content_fn', 'static_args', 'lock', 'static')
+
+
+    def __init__(self, name, content_fn, urls=None, doc_group='Statics', **static_args):
+        if urls is None:
+            urls = (('GET', f'/{name}'),)
+        super().__init__(name=name, urls=urls, doc=(f'The static resource "{name}"',), doc_group=doc_group)
+        self.content_fn = content_fn
+        self.static_args = static_args
+        self.lock = threading.Lock()
+        self.static = None
+
+
+    def __call__(self, environ, start_response):
+        return self.get_static()(environ, start_response)
+
+
+    # Get the compressed static request, computing its content on first use
+    def get_static(self):
+        if self.static is None:
+            with self.lock:
+                if self.static is None:
+                    self.static = CompressedStaticRequest(self.name, self.content_fn(), urls=self.urls, **self.static_args)
+        return self.static
+
+
+# Compute a content's variants, in preference order - a list of (encoding, content, ETag) tuples. Compressed variants are
+# used only if smaller. Variants are cached so that each unique static content is compressed once per process.
+@functools.lru_cache(maxsize=64)
+def _content_variants(content, brotli_module):
+    variants = {}
+    if brotli_module is not None:
+        variants['br'] = brotli_module.compress(content)
+    variants['gzip'] = gzip.compress(content, compresslevel=9, mtime=0)
+    content_variants = [
+        (encoding, variant_content, strong_etag(variant_content, encoding))
+        for encoding, variant_content in variants.items() if len(variant_content) < len(content)
+    ]
+    content_variants.append((None, content, strong_etag(content)))
+    return tuple(content_variants)
+
+
+# Compute a variant's strong ETag
+def strong_etag(content, encoding=None):
+    digest = hashlib.sha256(content).hexdigest()[:32]
+    return f'"{digest}-{encoding}"' if encoding is not None else f'"{digest}"'
+
+
+# Parse an "Accept-Encoding" header value - returns a dict of content-coding to quality value. The "*" content-coding
+# applies to all unlisted codings.
+def parse_accept_encoding(value):
+    qualities = {}
+    for item in value.split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, param_value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+
+    # Apply the wildcard quality to the unlisted encodings
+    wildcard = qualities.pop('*', None)
+    if wildcard is not None:
+        for coding in ('br', 'gzip'):
+            qualities.setdefault(coding, wildcard)
+    return qualities
+
+
+# Does an "If-None-Match" header value match the ETag? Uses the weak comparison function per RFC 9110.
+def etag_matches(if_none_match, etag):
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
@@ -0,0 +1,137 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+"""
+The mobstiq server-sent events hub
+"""
+
+from collections import deque
+import threading
+
+
+# Format a server-sent event
+def format_event(event_id, data):
+    return f'id: {event_id}\ndata: {data}\n\n'.encode('utf-8')
+
+
+# The server-sent events fan-out hub - subscribers subscribe to a topic (e.g. a room ID) and each published event is
+# formatted once and queued for all of the topic's subscribers. Each subscriber stream holds a request thread, so the
+# number of subscribers may be limited (max_subscribers).
+class EventHub:
+    __slots__ = ('lock', 'subscribers', 'subscriber_count', 'queue_size', 'keepalive', 'max_subscribers')
+
+
+    def __init__(self, queue_size=8, keepalive=15, max_subscribers=None):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.subscriber_count = 0
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self.max_subscribers = max_subscribers
+
+
+    # Create a topic subscriber - returns None if the maximum number of subscribers are subscribed. If on_subscribe is
+    # not None, it is called with the new subscriber (and the hub lock held) to queue the subscriber's initial events
+    # ahead of any published event.
+    def subscribe(self, topic, on_subscribe=None):
+        subscriber = EventSubscriber(self, topic)
+        with self.lock:
+            if self.max_subscribers is not None and self.subscriber_count >= self.max_subscribers:
+                return None
+            if on_subscribe is not None:
+                on_subscribe(subscriber)
+            self.subscribers.setdefault(topic, set()).add(subscriber)
+            self.subscriber_count += 1
+        return subscriber
+
+
+    # Remove a topic subscriber
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            topic_subscribers = self.subscribers.get(subscriber.topic)
+            if topic_subscribers is not None and subscriber in topic_subscribers:
+                topic_subscribers.remove(subscriber)
+                self.subscriber_count -= 1
+                if not topic_subscribers:
+                    del self.subscribers[subscriber.topic]
+
+
+    # Remove a topic's subscribers and end their streams (e.g. the topic's room is deleted)
+    def end_topic(self, topic):
+        with self.lock:
+            topic_subscribers = self.subscribers.pop(topic, set())
+            self.subscriber_count -= len(topic_subscribers)
+        for subscriber in topic_subscribers:
+            subscriber.end()
+
+
+    # Does the topic have subscribers? Use to avoid encoding events that no one receives.
+    def has_subscribers(self, topic):
+        return topic in self.subscribers
+
+
+    # Publish a formatted event to the topic's subscribers
+    def publish(self, topic, event):
+        with self.lock:
+            topic_subscribers = list(self.subscribers.get(topic, ()))
+        for subscriber in topic_subscribers:
+            subscriber.put(event)
+
+
+    # End all subscriber streams
+    def close(self):
+        with self.lock:
+            subscribers = [subscriber for topic_subscribers in self.subscribers.values() for subscriber in topic_subscribers]
+        for subscriber in subscribers:
+            subscriber.end()
+
+
+# An event hub subscriber - a WSGI response iterable of the subscriber's events. Each subscriber has a bounded queue.
+# When a slow subscriber's queue is full, its oldest event is dropped so that publishers never block.
+class EventSubscriber:
+    __slots__ = ('hub', 'topic', 'condition', 'events', 'dropped', 'ended')
+
+
+    def __init__(self, hub, topic):
+        self.hub = hub
+        self.topic = topic
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=hub.queue_size)
+        self.dropped = 0
+        self.ended = False
+
+
+    # Queue an event
+    def put(self, event):
+        with self.condition:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+            self.condition.notify()
+
+
+    # End the event stream
+    def end(self):
+        with self.condition:
+            self.ended = True
+            self.condition.notify()
+
+
+    def __iter__(self):
+        return self
+
+
+    # Get the next event - yields a keepalive comment if no event is published within the keepalive period
+    def __next__(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.events or self.ended, self.hub.keepalive)
+            if self.events:
+                return self.events.popleft()
+            if self.ended:
+                raise StopIteration
+        return b': keepalive\n\n'
+
+
+    # WSGI response close - called when the response completes or the client disconnects
+    def close(self):
+        self.hub.unsubscribe(self)
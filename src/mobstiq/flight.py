@@ -0,0 +1,63 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+"""
+The mobstiq single-flight call coalescing
+"""
+
+import threading
+
+
+# A single-flight call group - concurrent calls with the same key wait for and share the result of the in-flight call
+class SingleFlight:
+    __slots__ = ('lock', 'calls', 'executed', 'coalesced')
+
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+
+    # Call the function, or wait for the in-flight call with the same key and return its result. If the in-flight call
+    # raises, its exception is raised to all of its callers.
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            in_flight = call is not None
+            if in_flight:
+                self.coalesced += 1
+            else:
+                call = self.calls[key] = SingleFlightCall()
+                self.executed += 1
+
+        # Wait for the in-flight call
+        if in_flight:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        # Make the call
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+
+# A single-flight call
+class SingleFlightCall:
+    __slots__ = ('done', 'result', 'error')
+
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
@@ -0,0 +1,119 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+"""
+The mobstiq game registry
+"""
+
+import functools
+import importlib.metadata
+import importlib.resources
+import logging
+import threading
+
+import schema_markdown
+
+
+# The game plugin entry point group. Each entry point's name is the game name and its object is a function that returns
+# the game - a dict with the "function", "minPlayers", and "maxPlayers" GameInfo members and a "script" member with the
+# game's BareScript text. Game scripts may only include system includes.
+ENTRY_POINT_GROUP = 'mobstiq.games'
+
+
+# The mobstiq game registry - games are indexed by name. Games are added by name and loaded (and validated) the first time
+# they are used. Games that fail to load are logged and are thereafter unavailable.
+class GameRegistry:
+    __slots__ = ('types', 'lock', 'loaders', 'games', 'failed')
+
+
+    # The types are the type model with the "GameInfo" struct
+    def __init__(self, types):
+        self.types = types
+        self.lock = threading.Lock()
+        self.loaders = {}
+        self.games = {}
+        self.failed = set()
+
+
+    def __contains__(self, name):
+        return name in self.loaders
+
+
+    # Get the game names, in the order added
+    def names(self):
+        return list(self.loaders)
+
+
+    # Add a game - the loader is a function that returns the game's (game info, script bytes) tuple
+    def add_game(self, name, loader):
+        if name in self.loaders:
+            raise ValueError(f'Duplicate game "{name}"')
+        self.loaders[name] = loader
+
+
+    # Add a game whose script is a package static
+    def add_package_game(self, game_info, package='mobstiq.static'):
+        self.add_game(game_info['name'], functools.partial(_load_package_game, game_info, package))
+
+
+    # Add the installed game plugins - plugins with the name of an existing game are ignored. The include is the URL of the
+    # static that includes the plugin scripts.
+    def add_entry_points(self, include, group=ENTRY_POINT_GROUP):
+        for entry_point in importlib.metadata.entry_points(group=group):
+            if entry_point.name not in self.loaders:
+                self.add_game(entry_point.name, functools.partial(_load_entry_point_game, entry_point, include))
+
+
+    # Get a game's info - returns None if there is no such game or the game failed to load
+    def get(self, name):
+        game = self.load(name)
+        return game[0] if game is not None else None
+
+
+    # Get a game's script bytes - returns None if there is no such game or the game failed to load
+    def get_script(self, name):
+        game = self.load(name)
+        return game[1] if game is not None else None
+
+
+    # Get all available game infos, in the order added
+    def get_all(self):
+        return [game[0] for game in map(self.load, self.loaders) if game is not None]
+
+
+    # Load a game - returns the game's (game info, script bytes) tuple or None if there is no such game or the game failed
+    # to load
+    def load(self, name):
+        game = self.games.get(name)
+        if game is None and name in self.loaders and name not in self.failed:
+            with self.lock:
+                game = self.games.get(name)
+                if game is None and name not in self.failed:
+                    try:
+                        game_info, script = self.loaders[name]()
+                        game_info = schema_markdown.validate_type(self.types, 'GameInfo', game_info)
+                        game = self.games[name] = (game_info, script)
+                    except (ImportError, AttributeError, KeyError, TypeError, ValueError, RuntimeError, OSError,
+                            schema_markdown.ValidationError):
+                        logging.getLogger(__name__).exception('Failed to load game "%s"', name)
+                        self.failed.add(name)
+        return game
+
+
+# Load a game whose script is a package static
+def _load_package_game(game_info, package):
+    with importlib.resources.files(package).joinpath(game_info['include']).open('rb') as fh:
+        return game_info, fh.read()
+
+
+# Load a game plugin
+def _load_entry_point_game(entry_point, include):
+    game = entry_point.load()()
+    game_info = {
+        'name': entry_point.name,
+        'include': include,
+        'function': game['function'],
+        'minPlayers': game['minPlayers'],
+        'maxPlayers': game['maxPlayers']
+    }
+    return game_info, game['script'].encode('utf-8')
@@ -7,13 +7,14 @@ mobstiq command-line script main module
 
 import argparse
 import os
+import signal
 import sys
 import threading
 import webbrowser
 
 import waitress
 
-from .app import Mobstiq
+from .app import ConfigManager, Mobstiq
 
 
 # The default config file name
@@ -31,9 +32,27 @@ def main(argv=None):
         argument_parser_args['color'] = False
     parser = argparse.ArgumentParser(**argument_parser_args)
     parser.add_argument('-c', metavar='FILE', dest='config',
-                        help=f'the configuration file (default is "$HOME/{CONFIG_FILENAME}")')
+                        help=f'the configuration file - use a ".sqlite" file for SQLite storage (default is "$HOME/{CONFIG_FILENAME}")')
     parser.add_argument('-p', metavar='N', dest='port', type=int, default=8080,
                         help='the application port (default is 8080)')
+    parser.add_argument('-t', metavar='N', dest='threads', type=int, default=32,
+                        help='the number of request threads - fewer than half wait for game state changes and fewer than a ' +
+                        'quarter stream game state events (default is 32)')
+    parser.add_argument('-j', dest='journal', action='store_true',
+                        help='save config changes to an append-only journal')
+    parser.add_argument('-s', dest='split', action='store_true',
+                        help='save the current game to a separate file from the player registry')
+    parser.add_argument('-d', metavar='LEVEL', dest='durability', choices=ConfigManager.DURABILITY_LEVELS, default='write',
+                        help='the config durability level - "none", "write" (the default), "batch", or "sync"')
+    parser.add_argument('-w', metavar='MS', dest='save_window', type=int,
+                        help='save config changes on a background thread, coalescing saves within MS milliseconds ' +
+                        '(not allowed with the "none" and "sync" durability levels)')
+    parser.add_argument('-i', dest='ignore_case', action='store_true',
+                        help='player names are case-insensitive')
+    parser.add_argument('-e', metavar='HOURS', dest='player_ttl', type=float,
+                        help='remove players inactive for HOURS hours that are not in a game')
+    parser.add_argument('-l', dest='local_markdown_up', action='store_true',
+                        help='serve the markdown-up front-end runtime from the back-end (for venues without internet access)')
     parser.add_argument('-b', dest='backend', action='store_false', default=True,
                         help="don't start the back-end (use existing)")
     parser.add_argument('-n', dest='browser', action='store_false', default=True,
@@ -43,6 +62,8 @@ def main(argv=None):
     parser.add_argument('-v', dest='quiet', action='store_false',
                         help="show access logging")
     args = parser.parse_args(args=argv)
+    if args.durability in ('none', 'sync') and args.save_window is not None:
+        parser.error(f'argument -w: not allowed with durability level "{args.durability}"')
 
     # Starting a backend server? If so, create the backend application.
     if args.backend:
@@ -58,7 +79,13 @@ def main(argv=None):
             config_path = os.path.join(config_path, CONFIG_FILENAME)
 
         # Create the backend application
-        application = Mobstiq(config_path)
+        save_window = args.save_window / 1000 if args.save_window is not None else None
+        player_ttl = args.player_ttl * 3600 if args.player_ttl is not None else None
+        application = Mobstiq(
+            config_path, journal=args.journal, split=args.split, durability=args.durability, save_window=save_window,
+            ignore_case=args.ignore_case, player_ttl=player_ttl, max_waiters=max(0, args.threads - 1) // 2,
+            max_subscribers=max(0, args.threads - 1) // 4, local_markdown_up=args.local_markdown_up
+        )
 
     # Construct the URL
     host = '127.0.0.1'
@@ -85,8 +112,24 @@ def main(argv=None):
 
         # Start the backend application
         print(f'mobstiq: Serving at {url} ...')
-        waitress.serve(application_wrap, port=args.port)
+        _serve(application, application_wrap, args.port, args.threads)
 
     # Not starting a backend service, so we must wait on the web browser start
     elif args.browser:
         webbrowser_thread.join()
+
+
+# Serve the backend application - save any unsaved config changes on shutdown. SIGTERM (e.g. a service stop) shuts down
+# like Ctrl-C.
+def _serve(application, application_wrap, port, threads):
+    sigterm_handler = signal.signal(signal.SIGTERM, _sigterm_handler)
+    try:
+        waitress.serve(application_wrap, port=port, threads=threads)
+    finally:
+        signal.signal(signal.SIGTERM, sigterm_handler)
+        application.config.close()
+
+
+# SIGTERM handler - exit normally so that shutdown cleanup runs
+def _sigterm_handler(unused_signum, unused_frame):
+    raise SystemExit(0)
@@ -0,0 +1,169 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+"""
+The mobstiq JSON Patch (RFC 6902) implementation
+"""
+
+import copy
+
+
+# JSON Patch error - the patch is invalid or a "test" operation failed
+class PatchError(Exception):
+    pass
+
+
+# Apply a JSON Patch to a JSON document and return the patched document. The document is not modified - the containers
+# along each patched path are copied and all other values are shared with the original document.
+def apply_patch(document, patch):
+    root = [document]
+    copied = set()
+    for operation in patch:
+        op_name = operation['op']
+        path = _parse_pointer(operation['path'])
+        if op_name == 'add':
+            _add(root, path, _get_value(operation), copied)
+        elif op_name == 'remove':
+            _remove(root, path, copied)
+        elif op_name == 'replace':
+            value = _get_value(operation)
+            _get(root, path)
+            _set(root, path, value, copied)
+        elif op_name == 'move':
+            from_path = _parse_pointer(_get_from(operation))
+            if path[:len(from_path)] == from_path and path != from_path:
+                raise PatchError(f'Cannot move "{operation["from"]}" into itself')
+            value = _get(root, from_path)
+            _remove(root, from_path, copied)
+            _add(root, path, value, copied)
+        elif op_name == 'copy':
+            value = _get(root, _parse_pointer(_get_from(operation)))
+            _add(root, path, copy.deepcopy(value), copied)
+        else: # op_name == 'test'
+            if not _json_equal(_get(root, path), _get_value(operation)):
+                raise PatchError(f'Test failed for "{operation["path"]}"')
+    return root[0]
+
+
+# Parse a JSON Pointer (RFC 6901) into its reference tokens
+def _parse_pointer(pointer):
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise PatchError(f'Invalid JSON Pointer "{pointer}"')
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+# Get an operation's value
+def _get_value(operation):
+    if 'value' not in operation:
+        raise PatchError(f'Missing value for "{operation["op"]}" operation')
+    return operation['value']
+
+
+# Get an operation's from pointer
+def _get_from(operation):
+    if 'from' not in operation:
+        raise PatchError(f'Missing from for "{operation["op"]}" operation')
+    return operation['from']
+
+
+# Get a container's child key or index - if append is True, the array end index "-" is allowed
+def _child_key(container, token, append=False):
+    if isinstance(container, dict):
+        return token
+    if isinstance(container, list):
+        if append and token == '-':
+            return len(container)
+        if token.isdigit() and (token == '0' or not token.startswith('0')):
+            return int(token)
+    raise PatchError(f'Invalid path token "{token}"')
+
+
+# Get the value at a path
+def _get(root, path):
+    value = root[0]
+    for token in path:
+        key = _child_key(value, token)
+        if isinstance(value, dict) and key not in value or isinstance(value, list) and key >= len(value):
+            raise PatchError(f'Path token "{token}" not found')
+        value = value[key]
+    return value
+
+
+# Get the (copied) container at a path's parent
+def _get_parent(root, path, copied):
+    container = root
+    key = 0
+    for token in path[:-1]:
+        child = container[key]
+        if id(child) not in copied:
+            if isinstance(child, dict):
+                child = dict(child)
+            elif isinstance(child, list):
+                child = list(child)
+            else:
+                raise PatchError(f'Invalid path token "{token}"')
+            container[key] = child
+            copied.add(id(child))
+        key = _child_key(child, token)
+        if isinstance(child, dict) and key not in child or isinstance(child, list) and key >= len(child):
+            raise PatchError(f'Path token "{token}" not found')
+        container = child
+
+    # Copy the parent container
+    parent = container[key]
+    if id(parent) not in copied:
+        if isinstance(parent, dict):
+            parent = dict(parent)
+        elif isinstance(parent, list):
+            parent = list(parent)
+        else:
+            raise PatchError(f'Invalid path token "{path[-1]}"')
+        container[key] = parent
+        copied.add(id(parent))
+    return parent
+
+
+# Add a value at a path
+def _add(root, path, value, copied):
+    if not path:
+        root[0] = value
+        return
+    parent = _get_parent(root, path, copied)
+    key = _child_key(parent, path[-1], append=True)
+    if isinstance(parent, list):
+        if key > len(parent):
+            raise PatchError(f'Path token "{path[-1]}" not found')
+        parent.insert(key, value)
+    else:
+        parent[key] = value
+
+
+# Replace the existing value at a path
+def _set(root, path, value, copied):
+    if not path:
+        root[0] = value
+        return
+    parent = _get_parent(root, path, copied)
+    parent[_child_key(parent, path[-1])] = value
+
+
+# Remove the value at a path
+def _remove(root, path, copied):
+    if not path:
+        raise PatchError('Cannot remove the document root')
+    _get(root, path)
+    parent = _get_parent(root, path, copied)
+    del parent[_child_key(parent, path[-1])]
+
+
+# JSON value equality - booleans are not numbers
+def _json_equal(value, other):
+    if isinstance(value, dict):
+        return isinstance(other, dict) and value.keys() == other.keys() and all(_json_equal(value[key], other[key]) for key in value)
+    if isinstance(value, list):
+        return isinstance(other, list) and len(value) == len(other) and all(map(_json_equal, value, other))
+    if isinstance(value, bool) or isinstance(other, bool):
+        return type(value) is type(other) and value == other
+    return value == other
@@ -0,0 +1,468 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+"""
+The mobstiq config storage back-ends
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+import schema_markdown
+
+
+# Create the config storage back-end for a config path. If sync is True, writes are flushed to disk (fsync) before
+# returning.
+def create_storage(config_path, journal=False, split=False, sync=False):
+    if config_path.endswith('.sqlite'):
+        return SQLiteStorage(config_path, sync=sync)
+    if journal:
+        return JournalStorage(config_path, sync=sync)
+    if split:
+        return SplitStorage(config_path, sync=sync)
+    return JSONStorage(config_path, sync=sync)
+
+
+# The exceptions of a failed config storage write
+STORAGE_ERRORS = (OSError, sqlite3.Error)
+
+
+# The config storage back-end interface
+#
+# A config change is a path of config keys (e.g. "('players', player_id)"). A change whose path has no value is a delete.
+#
+# Configs are validated after load unless the back-end reports them trusted - that is, written by mobstiq and unmodified.
+#
+# Saves are two-phase. The "encode" method is called with the config lock held and returns the save data. The "write"
+# method writes the save data - writes are serialized but may occur outside of the config lock.
+class ConfigStorage:
+    __slots__ = ('sync',)
+
+
+    def __init__(self, sync=False):
+        self.sync = sync
+
+
+    # Load the config - returns the config and True if the config is trusted and need not be validated
+    def load(self):
+        raise NotImplementedError
+
+
+    # Called with the validated config after load
+    def loaded(self, config):
+        pass
+
+
+    # Encode the config changes for save
+    def encode(self, config, changes):
+        raise NotImplementedError
+
+
+    # Write the encoded config save data
+    def write(self, save_data):
+        raise NotImplementedError
+
+
+    # Called with the config lock held after a write
+    def compact(self, config):
+        pass
+
+
+    # Wait for background work and release resources
+    def close(self):
+        pass
+
+
+# The JSON config file storage back-end - each save rewrites the config file and its checksum file. A config file that
+# matches its checksum file is trusted - a config file edited by hand is not.
+class JSONStorage(ConfigStorage):
+    __slots__ = ('config_path', 'checksum_path')
+
+
+    def __init__(self, config_path, sync=False):
+        super().__init__(sync)
+        self.config_path = config_path
+        self.checksum_path = f'{config_path}.sha256'
+
+
+    def load(self):
+        if not os.path.isfile(self.config_path):
+            return {'players': {}}, False
+        config_text, trusted = _read_checksummed(self.config_path, self.checksum_path)
+        return json.loads(config_text), trusted
+
+
+    def encode(self, config, changes):
+        return schema_markdown.JSONEncoder(indent=4).encode(config)
+
+
+    def write(self, save_data):
+        _write_checksummed(self.config_path, self.checksum_path, save_data, self.sync)
+
+
+# The append-only journal storage back-end - each save appends one compact record per change to the journal. The journal
+# is replayed on load and periodically compacted into the config file on a background thread.
+class JournalStorage(JSONStorage):
+    __slots__ = ('journal_path', 'journal_size', 'journal_thread', 'replayed_paths')
+
+
+    # The number of journal records that triggers a background journal compaction
+    JOURNAL_COMPACT_SIZE = 1000
+
+
+    def __init__(self, config_path, sync=False):
+        super().__init__(config_path, sync)
+        self.journal_path = f'{config_path}.journal'
+        self.journal_size = 0
+        self.journal_thread = None
+        self.replayed_paths = []
+
+
+    # Replayed journal records are not checksummed, so a config with replayed journal records is not trusted
+    def load(self):
+        config, trusted = super().load()
+
+        # Replay the config journals, if any
+        journal_paths = [path for path in (f'{self.journal_path}.old', self.journal_path) if os.path.isfile(path)]
+        for journal_path in journal_paths:
+            with open(journal_path, 'r', encoding='utf-8') as fh_journal:
+                for record_line in fh_journal:
+                    # Ignore a partially-written final record
+                    try:
+                        record = json.loads(record_line)
+                    except ValueError:
+                        break
+                    _journal_apply(config, record)
+
+        # Compact the replayed journals into the config file after the config is validated
+        if journal_paths:
+            self.replayed_paths = journal_paths
+            trusted = False
+
+        return config, trusted
+
+
+    # Compact the replayed journals into the validated config file
+    def loaded(self, config):
+        if self.replayed_paths:
+            JSONStorage.write(self, JSONStorage.encode(self, config, None))
+            for journal_path in self.replayed_paths:
+                os.remove(journal_path)
+            self.replayed_paths = []
+
+
+    def encode(self, config, changes):
+        # Encode a compact journal record for each change - a missing value is a delete
+        encoder = schema_markdown.JSONEncoder(separators=(',', ':'))
+        record_lines = []
+        for path in dict.fromkeys(changes):
+            record = {'path': list(path)}
+            value = _config_get(config, path)
+            if value is not None:
+                record['value'] = value
+            record_lines.append(encoder.encode(record) + '\n')
+        return record_lines
+
+
+    def write(self, save_data):
+        if save_data:
+            with open(self.journal_path, 'a', encoding='utf-8') as fh_journal:
+                fh_journal.write(''.join(save_data))
+                if self.sync:
+                    fh_journal.flush()
+                    os.fsync(fh_journal.fileno())
+            self.journal_size += len(save_data)
+
+
+    def compact(self, config):
+        if self.journal_size < self.JOURNAL_COMPACT_SIZE:
+            return
+
+        # Compaction in progress or an interrupted compaction's journal remains?
+        journal_old_path = f'{self.journal_path}.old'
+        if (self.journal_thread is not None and self.journal_thread.is_alive()) or os.path.isfile(journal_old_path):
+            return
+
+        # Rotate the journal - new records are appended to a new journal while the snapshot is written
+        os.replace(self.journal_path, journal_old_path)
+        self.journal_size = 0
+
+        # Copy the config - player records and games are replaced, never modified in place
+        config = dict(config)
+        config['players'] = dict(config['players'])
+        if 'rooms' in config:
+            config['rooms'] = dict(config['rooms'])
+
+        # Write the config file snapshot and delete the rotated journal on a background thread. Journal records are
+        # idempotent, so an interrupted compaction is recovered by replaying the rotated journal on load.
+        def compact():
+            JSONStorage.write(self, JSONStorage.encode(self, config, None))
+            os.remove(journal_old_path)
+
+        self.journal_thread = threading.Thread(target=compact)
+        self.journal_thread.daemon = True
+        self.journal_thread.start()
+
+
+    def close(self):
+        if self.journal_thread is not None:
+            self.journal_thread.join()
+
+
+# The split JSON storage back-end - the player registry, the default room's game, and the rooms are saved to separate
+# files, and each save rewrites only the changed files. The game and rooms files are named for the config file (e.g.
+# "mobstiq.game.json" and "mobstiq.rooms.json") and are deleted when empty. A config file that contains games (i.e. not
+# split) is split on load.
+class SplitStorage(JSONStorage):
+    __slots__ = ('game_path', 'game_checksum_path', 'rooms_path', 'rooms_checksum_path', 'split_config')
+
+
+    def __init__(self, config_path, sync=False):
+        super().__init__(config_path, sync)
+        config_base = os.path.splitext(config_path)[0]
+        self.game_path = f'{config_base}.game.json'
+        self.game_checksum_path = f'{self.game_path}.sha256'
+        self.rooms_path = f'{config_base}.rooms.json'
+        self.rooms_checksum_path = f'{self.rooms_path}.sha256'
+        self.split_config = False
+
+
+    def load(self):
+        config, trusted = super().load()
+
+        # Config file not split? If so, split it after load.
+        if 'game' in config or 'rooms' in config:
+            self.split_config = True
+            trusted = False
+
+        # Load the game and rooms files, if any
+        for key, path, checksum_path in (
+            ('game', self.game_path, self.game_checksum_path),
+            ('rooms', self.rooms_path, self.rooms_checksum_path)
+        ):
+            if os.path.isfile(path):
+                value_text, value_trusted = _read_checksummed(path, checksum_path)
+                config[key] = json.loads(value_text)
+                trusted = trusted and value_trusted
+
+        return config, trusted
+
+
+    def loaded(self, config):
+        if self.split_config:
+            self.write(self.encode(config, None))
+            self.split_config = False
+
+
+    # Encode the changed files - no recorded changes saves all files
+    def encode(self, config, changes):
+        save_players = not changes or any(path[0] not in ('game', 'rooms') for path in changes)
+        save_game = not changes or ('game',) in changes
+        save_rooms = not changes or any(path[0] == 'rooms' for path in changes)
+        encoder = schema_markdown.JSONEncoder(indent=4)
+
+        # Encode the player registry file
+        players_text = None
+        if save_players:
+            players_text = encoder.encode({key: value for key, value in config.items() if key not in ('game', 'rooms')})
+
+        # Encode the game and rooms files - an empty string deletes the file
+        game_text = None
+        if save_game:
+            game = config.get('game')
+            game_text = encoder.encode(game) if game else ''
+        rooms_text = None
+        if save_rooms:
+            rooms = config.get('rooms')
+            rooms_text = encoder.encode(rooms) if rooms else ''
+
+        return players_text, game_text, rooms_text
+
+
+    def write(self, save_data):
+        players_text, game_text, rooms_text = save_data
+        if players_text is not None:
+            super().write(players_text)
+        for text, path, checksum_path in (
+            (game_text, self.game_path, self.game_checksum_path),
+            (rooms_text, self.rooms_path, self.rooms_checksum_path)
+        ):
+            if text:
+                _write_checksummed(path, checksum_path, text, self.sync)
+            elif text is not None:
+                for remove_path in (path, checksum_path):
+                    if os.path.isfile(remove_path):
+                        os.remove(remove_path)
+
+
+# The SQLite storage back-end - players and games are stored in indexed tables, and each save writes only the changed
+# rows in a single transaction. The default room's game is the games table row with an empty ID - other rows are the
+# rooms' games by room ID. A new database is migrated from the JSON config file of the same name, if it exists. The
+# database is marked initialized (its "user_version") in the migration's transaction, so a failed migration is retried.
+class SQLiteStorage(ConfigStorage):
+    __slots__ = ('database_path', 'connection', 'initialized', 'migrate_path')
+
+
+    # The initialized database "user_version"
+    USER_VERSION = 1
+
+
+    def __init__(self, database_path, sync=False):
+        super().__init__(sync)
+        self.database_path = database_path
+        self.connection = None
+        self.initialized = False
+        self.migrate_path = None
+
+
+    def load(self):
+        # Open the database - the connection is used by the flusher thread, but its use is serialized by the config manager
+        self.connection = sqlite3.connect(self.database_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute(f'PRAGMA synchronous = {"FULL" if self.sync else "OFF"}')
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS players (id TEXT PRIMARY KEY, name TEXT NOT NULL, player TEXT NOT NULL)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS players_name ON players (name)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS games (id TEXT PRIMARY KEY, game TEXT NOT NULL)')
+
+        # New database? If so, migrate the JSON config file, if any. Databases with rows that predate the initialized
+        # marker are not migrated.
+        self.initialized = self.connection.execute('PRAGMA user_version').fetchone()[0] >= self.USER_VERSION
+        if not self.initialized and self.connection.execute(
+            'SELECT NOT EXISTS (SELECT 1 FROM players) AND NOT EXISTS (SELECT 1 FROM games)'
+        ).fetchone()[0]:
+            json_path = f'{os.path.splitext(self.database_path)[0]}.json'
+            if os.path.isfile(json_path):
+                self.migrate_path = json_path
+                return JSONStorage(json_path).load()
+
+        # Load the config
+        config = {'players': {}}
+        for player_id, player_json in self.connection.execute('SELECT id, player FROM players'):
+            config['players'][player_id] = json.loads(player_json)
+        for room_id, game_json in self.connection.execute('SELECT id, game FROM games'):
+            if room_id == '':
+                config['game'] = json.loads(game_json)
+            else:
+                config.setdefault('rooms', {})[room_id] = json.loads(game_json)
+        return config, False
+
+
+    def loaded(self, config):
+        if self.initialized:
+            return
+
+        # Write the migrated config, if any, and mark the database initialized in the same transaction
+        with self.connection:
+            if self.migrate_path is not None:
+                changes = [('players', player_id) for player_id in config['players']] + [('game',)]
+                changes.extend(('rooms', room_id) for room_id in config.get('rooms', {}))
+                self._write_rows(self.encode(config, changes))
+            self.connection.execute(f'PRAGMA user_version = {self.USER_VERSION}')
+        self.initialized = True
+        self.migrate_path = None
+
+
+    def encode(self, config, changes):
+        encoder = schema_markdown.JSONEncoder(separators=(',', ':'))
+        rows = []
+        for path in dict.fromkeys(changes):
+            value = _config_get(config, path)
+            rows.append((path, value, encoder.encode(value) if value is not None else None))
+        return rows
+
+
+    def write(self, save_data):
+        with self.connection:
+            self._write_rows(save_data)
+
+
+    # Write the save data's rows within the current transaction
+    def _write_rows(self, save_data):
+        for path, value, value_json in save_data:
+            if path[0] == 'players':
+                if value is None:
+                    self.connection.execute('DELETE FROM players WHERE id = ?', (path[1],))
+                else:
+                    self.connection.execute(
+                        'INSERT OR REPLACE INTO players (id, name, player) VALUES (?, ?, ?)',
+                        (path[1], value['name'], value_json)
+                    )
+            else: # path == ('game',) or ('rooms', room_id)
+                game_id = path[1] if path[0] == 'rooms' else ''
+                if value is None:
+                    self.connection.execute('DELETE FROM games WHERE id = ?', (game_id,))
+                else:
+                    self.connection.execute('INSERT OR REPLACE INTO games (id, game) VALUES (?, ?)', (game_id, value_json))
+
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+# Helper to get a config value by path - returns None if the value does not exist
+def _config_get(config, path):
+    value = config
+    for key in path:
+        value = value.get(key)
+        if value is None:
+            break
+    return value
+
+
+# Helper to apply a config journal record
+def _journal_apply(config, record):
+    *parent_keys, key = record['path']
+    parent = config
+    for parent_key in parent_keys:
+        parent = parent.setdefault(parent_key, {})
+    if 'value' in record:
+        parent[key] = record['value']
+    else:
+        parent.pop(key, None)
+
+
+# Helper to compute a config file checksum
+def _checksum(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# Helper to read a config file and its checksum file - returns the file text and True if the checksum matches
+def _read_checksummed(path, checksum_path):
+    with open(path, 'r', encoding='utf-8') as fh_config:
+        text = fh_config.read()
+    try:
+        with open(checksum_path, 'r', encoding='utf-8') as fh_checksum:
+            checksum = fh_checksum.read().strip()
+    except FileNotFoundError:
+        checksum = None
+    return text, checksum == _checksum(text)
+
+
+# Helper to write a config file followed by its checksum file - if interrupted, the checksum doesn't match and the
+# config file is validated on load. The checksum file is not synced - a lost checksum file only costs a validation.
+def _write_checksummed(path, checksum_path, text, sync=False):
+    _write_atomic(path, text, sync)
+    _write_atomic(checksum_path, _checksum(text))
+
+
+# Helper to atomically replace a text file. If sync is True, the file and its directory entry are flushed to disk.
+def _write_atomic(path, text, sync=False):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as fh_temp:
+        fh_temp.write(text)
+        if sync:
+            fh_temp.flush()
+            os.fsync(fh_temp.fileno())
+    os.replace(temp_path, path)
+    if sync and hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
@@ -1,14 +1,21 @@
 # Licensed under the MIT License
 # https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
 
+import gzip
 import json
 import os
 import socket
+import threading
+import time
 import unittest
 import unittest.mock
 import uuid
 
-from mobstiq.app import Mobstiq
+import chisel
+import schema_markdown
+from mobstiq.app import BUILTIN_GAMES, RESPONSE_ENCODER, ConfigManager, Mobstiq, ReadWriteLock
+from mobstiq.assets import strong_etag
+from mobstiq.storage import JournalStorage, JSONStorage, _write_atomic
 
 from .util import create_test_files
 
@@ -28,22 +35,29 @@ class TestApp(unittest.TestCase):
             self.assertListEqual(
                 sorted(request.name for request in app.requests.values() if request.doc_group.startswith('mobstiq ')),
                 [
+                    'batch',
                     'gameAddPlayer',
+                    'gameEvents',
                     'gameInclude',
                     'gameRemovePlayer',
                     'gameSetup',
                     'gameStart',
                     'gameState',
+                    'gameStateWait',
                     'gameStop',
                     'gameUpdate',
+                    'gameView',
                     'games/checkers.bare',
                     'games/ticTacToe.bare',
                     'getGameList',
                     'getServiceURL',
+                    'getStats',
                     'index.html',
                     'mobstiq.bare',
+                    'mobstiq.bundle.bare',
                     'playerRegister',
-                    'playerValidate'
+                    'playerValidate',
+                    'playerValidateBatch'
                 ]
             )
 
@@ -58,26 +72,877 @@ class TestApp(unittest.TestCase):
             self.assertListEqual(
                 sorted(request.name for request in app.requests.values() if request.doc_group.startswith('mobstiq ')),
                 [
+                    'batch',
                     'gameAddPlayer',
+                    'gameEvents',
                     'gameInclude',
                     'gameRemovePlayer',
                     'gameSetup',
                     'gameStart',
                     'gameState',
+                    'gameStateWait',
                     'gameStop',
                     'gameUpdate',
+                    'gameView',
                     'games/checkers.bare',
                     'games/ticTacToe.bare',
                     'getGameList',
                     'getServiceURL',
+                    'getStats',
                     'index.html',
                     'mobstiq.bare',
+                    'mobstiq.bundle.bare',
                     'playerRegister',
-                    'playerValidate'
+                    'playerValidate',
+                    'playerValidateBatch'
                 ]
             )
 
 
+    def test_statics(self):
+        with create_test_files([]) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'))
+
+            # Statics are always revalidated
+            status, headers, content_bytes = app.request('GET', '/', environ={'HTTP_ACCEPT_ENCODING': 'gzip'})
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(dict(headers)['Cache-Control'], 'no-cache')
+            self.assertEqual(dict(headers)['Content-Encoding'], 'gzip')
+            self.assertTrue(gzip.decompress(content_bytes).startswith(b'<!DOCTYPE html>'))
+
+            # Scripts are revalidated by ETag
+            status, headers, content_bytes = app.request('GET', '/mobstiq.bare', environ={'HTTP_ACCEPT_ENCODING': 'gzip'})
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(dict(headers)['Cache-Control'], 'no-cache')
+            self.assertTrue(gzip.decompress(content_bytes).startswith(b'# Licensed under the MIT License'))
+            status, _, content_bytes = app.request(
+                'GET', '/mobstiq.bare',
+                environ={'HTTP_ACCEPT_ENCODING': 'gzip', 'HTTP_IF_NONE_MATCH': dict(headers)['ETag']}
+            )
+            self.assertEqual(status, '304 Not Modified')
+            self.assertEqual(content_bytes, b'')
+
+            # The script bundle includes the application and all games
+            status, headers, content_bytes = app.request('GET', '/mobstiq.bundle.bare', environ={'HTTP_ACCEPT_ENCODING': 'gzip'})
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(dict(headers)['Cache-Control'], 'no-cache')
+            bundle_etag = dict(headers)['ETag']
+            bundle = gzip.decompress(content_bytes).decode('utf-8')
+            self.assertTrue(bundle.startswith('# Bundled "mobstiq.bare"\n\n# Licensed under the MIT License'))
+            self.assertIn('async function mobstiqMain():', bundle)
+            for game_info in BUILTIN_GAMES:
+                self.assertIn(f'# Bundled game "{game_info["name"]}"', bundle)
+                self.assertIn(f'function {game_info["function"]}(gameObj):', bundle)
+
+            # The index page loads the hosted markdown-up runtime
+            status, _, content_bytes = app.request('GET', '/')
+            self.assertIn(b"from 'https://craigahobbs.github.io/markdown-up/lib/appImports.js'", content_bytes)
+
+            # The index page preloads and includes the script bundle by its versioned URL
+            version = strong_etag(bundle.encode('utf-8')).strip('"')
+            self.assertIn(f'<link rel="preload" href="mobstiq.bundle.bare?v={version}"'.encode('utf-8'), content_bytes)
+            self.assertIn(f"include 'mobstiq.bundle.bare?v={version}'".encode('utf-8'), content_bytes)
+            self.assertNotIn(b"include 'mobstiq.bundle.bare'", content_bytes)
+
+            # The versioned script bundle is cached indefinitely
+            status, headers, content_bytes = app.request(
+                'GET', '/mobstiq.bundle.bare', query_string=f'v={version}', environ={'HTTP_ACCEPT_ENCODING': 'gzip'}
+            )
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(dict(headers)['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(dict(headers)['ETag'], bundle_etag)
+            self.assertEqual(gzip.decompress(content_bytes).decode('utf-8'), bundle)
+
+            # Other script bundle versions are revalidated
+            status, headers, _ = app.request('GET', '/mobstiq.bundle.bare', query_string='v=0')
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(dict(headers)['Cache-Control'], 'no-cache')
+
+
+    def test_statics_local_markdown_up(self):
+        with create_test_files([]) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'), local_markdown_up=True)
+
+            # The index page loads the local markdown-up runtime
+            status, _, content_bytes = app.request('GET', '/')
+            self.assertEqual(status, '200 OK')
+            self.assertIn(b"from './markdown-up/lib/appImports.js'", content_bytes)
+            self.assertNotIn(b'https://', content_bytes)
+
+            # The markdown-up runtime statics are compressed and revalidated
+            for url in ('/markdown-up/lib/appImports.js', '/markdown-up/bare-script/static/markdown.css'):
+                status, headers, content_bytes = app.request('GET', url, environ={'HTTP_ACCEPT_ENCODING': 'gzip'})
+                self.assertEqual(status, '200 OK')
+                self.assertEqual(dict(headers)['Cache-Control'], 'no-cache')
+                self.assertEqual(dict(headers)['Content-Encoding'], 'gzip')
+                self.assertGreater(len(gzip.decompress(content_bytes)), len(content_bytes))
+
+
+class TestConfigManager(unittest.TestCase):
+
+    def test_journal(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('uuid.uuid4', return_value=uuid.UUID('123e4567e89b12d3a456426614174000')):
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            journal_path = os.path.join(temp_dir, 'mobstiq.json.journal')
+            app = Mobstiq(config_path, journal=True)
+            self.assertEqual(app.config.storage.journal_path, journal_path)
+
+            status, _, _ = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "Player 1"}')
+            self.assertEqual(status, '200 OK')
+            status, _, _ = app.request(
+                'POST', '/gameSetup',
+                wsgi_input=b'{"id": "123e4567-e89b-12d3-a456-426614174000", "name": "Tic Tac Toe"}'
+            )
+            self.assertEqual(status, '200 OK')
+            status, _, _ = app.request('POST', '/gameStop', wsgi_input=b'{"id": "123e4567-e89b-12d3-a456-426614174000"}')
+            self.assertEqual(status, '200 OK')
+
+            # Verify the journal file - the config file is not written
+            self.assertFalse(os.path.exists(config_path))
+            with open(journal_path, 'r', encoding='utf-8') as fh:
+                self.assertListEqual([json.loads(line) for line in fh], [
+                    {
+                        'path': ['players', '123e4567-e89b-12d3-a456-426614174000'],
+                        'value': {'id': '123e4567-e89b-12d3-a456-426614174000', 'name': 'Player 1'}
+                    },
+                    {
+                        'path': ['game'],
+                        'value': {'name': 'Tic Tac Toe', 'players': ['123e4567-e89b-12d3-a456-426614174000'], 'version': 1}
+                    },
+                    {
+                        'path': ['game']
+                    }
+                ])
+
+            # Verify the journal is replayed and compacted on load
+            expected_config = {
+                'players': {
+                    '123e4567-e89b-12d3-a456-426614174000': {
+                        'id': '123e4567-e89b-12d3-a456-426614174000',
+                        'name': 'Player 1'
+                    }
+                }
+            }
+            app2 = Mobstiq(config_path, journal=True)
+            with app2.config() as config:
+                self.assertDictEqual(config, expected_config)
+            self.assertFalse(os.path.exists(journal_path))
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertDictEqual(json.loads(fh.read()), expected_config)
+
+
+    def test_journal_partial_record(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({'players': {}})),
+            ('mobstiq.json.journal', '{"path":["players","p1"],"value":{"id":"p1","name":"Player 1"}}\n{"path":["players","p2"],"val')
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, journal=True)
+            with config_manager() as config:
+                self.assertDictEqual(config, {'players': {'p1': {'id': 'p1', 'name': 'Player 1'}}})
+
+
+    def test_journal_invalid_record(self):
+        test_files = [
+            ('mobstiq.json.journal', '{"path":["players","p1"],"value":{"id":"p1"}}\n')
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            with self.assertRaises(schema_markdown.ValidationError):
+                ConfigManager(config_path, journal=True)
+
+            # The invalid config is not compacted, so it fails validation again
+            self.assertListEqual(os.listdir(temp_dir), ['mobstiq.json.journal'])
+            with self.assertRaises(schema_markdown.ValidationError):
+                ConfigManager(config_path, journal=True)
+
+
+    def test_journal_compact(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch.object(JournalStorage, 'JOURNAL_COMPACT_SIZE', 2):
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            journal_path = os.path.join(temp_dir, 'mobstiq.json.journal')
+            app = Mobstiq(config_path, journal=True)
+
+            # The second record triggers compaction
+            status, _, _ = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "Player 1"}')
+            self.assertEqual(status, '200 OK')
+            self.assertIsNone(app.config.storage.journal_thread)
+            status, _, _ = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "Player 2"}')
+            self.assertEqual(status, '200 OK')
+            app.config.storage.journal_thread.join()
+            self.assertFalse(os.path.exists(journal_path))
+            self.assertFalse(os.path.exists(f'{journal_path}.old'))
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                saved_config = json.loads(fh.read())
+            self.assertListEqual(sorted(player['name'] for player in saved_config['players'].values()), ['Player 1', 'Player 2'])
+
+            # Subsequent records are appended to a new journal
+            status, _, _ = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "Player 3"}')
+            self.assertEqual(status, '200 OK')
+            with open(journal_path, 'r', encoding='utf-8') as fh:
+                self.assertEqual(len(fh.readlines()), 1)
+
+            # Verify the config is loaded from the snapshot and the journal
+            app2 = Mobstiq(config_path, journal=True)
+            with app2.config() as config:
+                self.assertListEqual(
+                    sorted(player['name'] for player in config['players'].values()),
+                    ['Player 1', 'Player 2', 'Player 3']
+                )
+
+
+    def test_journal_compact_interrupted(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({'players': {}})),
+            ('mobstiq.json.journal.old', '{"path":["players","p1"],"value":{"id":"p1","name":"Player 1"}}\n'),
+            ('mobstiq.json.journal', '{"path":["players","p2"],"value":{"id":"p2","name":"Player 2"}}\n')
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, journal=True)
+            expected_config = {
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'}
+                }
+            }
+            with config_manager() as config:
+                self.assertDictEqual(config, expected_config)
+            self.assertListEqual(sorted(os.listdir(temp_dir)), ['mobstiq.json', 'mobstiq.json.sha256'])
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertDictEqual(json.loads(fh.read()), expected_config)
+
+
+    def test_save_window(self):
+        with create_test_files([]) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, save_window=60)
+            try:
+                # Saves mark the config dirty but do not write the config file
+                for player_id in ('p1', 'p2'):
+                    with config_manager(save=True) as config:
+                        config['players'][player_id] = {'id': player_id, 'name': player_id}
+                        config_manager.changed('players', player_id)
+                self.assertFalse(os.path.exists(config_path))
+
+                # Flush writes the coalesced saves
+                config_manager.flush()
+                with open(config_path, 'r', encoding='utf-8') as fh:
+                    self.assertDictEqual(json.loads(fh.read()), {
+                        'players': {
+                            'p1': {'id': 'p1', 'name': 'p1'},
+                            'p2': {'id': 'p2', 'name': 'p2'}
+                        }
+                    })
+                self.assertListEqual(sorted(os.listdir(temp_dir)), ['mobstiq.json', 'mobstiq.json.sha256'])
+                self.assertIsNone(config_manager.flush_changes)
+
+                # Close flushes unsaved changes
+                with config_manager(save=True) as config:
+                    del config['players']['p1']
+                    config_manager.changed('players', 'p1')
+            finally:
+                config_manager.close()
+            self.assertFalse(config_manager.flush_thread.is_alive())
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertDictEqual(json.loads(fh.read()), {'players': {'p2': {'id': 'p2', 'name': 'p2'}}})
+
+
+    def test_save_window_flusher(self):
+        with create_test_files([]) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, save_window=0.01)
+            try:
+                with config_manager(save=True) as config:
+                    config['players']['p1'] = {'id': 'p1', 'name': 'p1'}
+                    config_manager.changed('players', 'p1')
+
+                # Wait for the flusher thread to save
+                for _ in range(500):
+                    if os.path.exists(config_path):
+                        break
+                    time.sleep(0.01)
+                with open(config_path, 'r', encoding='utf-8') as fh:
+                    self.assertDictEqual(json.loads(fh.read()), {'players': {'p1': {'id': 'p1', 'name': 'p1'}}})
+            finally:
+                config_manager.close()
+
+
+    def test_save_window_write_error(self):
+        json_write = JSONStorage.write
+        write_calls = []
+        def write_fail_once(storage, save_data):
+            write_calls.append(save_data)
+            if len(write_calls) == 1:
+                raise OSError('Disk full')
+            json_write(storage, save_data)
+
+        with create_test_files([]) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, save_window=0.01)
+            try:
+                with self.assertLogs('mobstiq.app', level='ERROR') as cm_logs, \
+                     unittest.mock.patch.object(JSONStorage, 'write', autospec=True, side_effect=write_fail_once):
+                    with config_manager(save=True) as config:
+                        config['players']['p1'] = {'id': 'p1', 'name': 'p1'}
+                        config_manager.changed('players', 'p1')
+
+                    # Wait for the flusher thread to retry the failed save
+                    for _ in range(500):
+                        if len(write_calls) >= 2:
+                            break
+                        time.sleep(0.01)
+                self.assertEqual(len(write_calls), 2)
+                self.assertEqual(cm_logs.records[0].getMessage(), 'Failed to save the config')
+                self.assertIsInstance(cm_logs.records[0].exc_info[1], OSError)
+                with open(config_path, 'r', encoding='utf-8') as fh:
+                    self.assertDictEqual(json.loads(fh.read()), {'players': {'p1': {'id': 'p1', 'name': 'p1'}}})
+
+                # The flusher thread continues to save
+                self.assertTrue(config_manager.flush_thread.is_alive())
+                with config_manager(save=True) as config:
+                    config['players']['p2'] = {'id': 'p2', 'name': 'p2'}
+                    config_manager.changed('players', 'p2')
+            finally:
+                config_manager.close()
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertListEqual(sorted(json.loads(fh.read())['players']), ['p1', 'p2'])
+
+
+    def test_save_window_flush_error(self):
+        with create_test_files([]) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, save_window=60)
+            try:
+                with config_manager(save=True) as config:
+                    config['players']['p1'] = {'id': 'p1', 'name': 'p1'}
+                    config_manager.changed('players', 'p1')
+
+                # A failed flush restores the unsaved changes
+                with unittest.mock.patch.object(JSONStorage, 'write', autospec=True, side_effect=OSError('Disk full')):
+                    with self.assertRaises(OSError):
+                        config_manager.flush()
+                self.assertListEqual(config_manager.flush_changes, [('players', 'p1')])
+                self.assertFalse(os.path.exists(config_path))
+            finally:
+                config_manager.close()
+
+            # Close saves the restored changes
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertDictEqual(json.loads(fh.read()), {'players': {'p1': {'id': 'p1', 'name': 'p1'}}})
+
+
+    def test_save_window_coalesce(self):
+        with create_test_files([]) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, save_window=0.5)
+            try:
+                with unittest.mock.patch.object(JSONStorage, 'write', autospec=True, side_effect=JSONStorage.write) as mock_write:
+                    # Saves within the save window are written once, at the window's deadline
+                    start = time.monotonic()
+                    for player_id in ('p1', 'p2', 'p3', 'p4', 'p5'):
+                        with config_manager(save=True) as config:
+                            config['players'][player_id] = {'id': player_id, 'name': player_id}
+                            config_manager.changed('players', player_id)
+                        time.sleep(0.02)
+                    for _ in range(500):
+                        if mock_write.call_count:
+                            break
+                        time.sleep(0.01)
+                    self.assertGreaterEqual(time.monotonic() - start, 0.5)
+                    time.sleep(0.05)
+                    self.assertEqual(mock_write.call_count, 1)
+                with open(config_path, 'r', encoding='utf-8') as fh:
+                    self.assertListEqual(sorted(json.loads(fh.read())['players']), ['p1', 'p2', 'p3', 'p4', 'p5'])
+            finally:
+                config_manager.close()
+
+
+    def test_save_window_journal(self):
+        with create_test_files([]) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            journal_path = os.path.join(temp_dir, 'mobstiq.json.journal')
+            config_manager = ConfigManager(config_path, journal=True, save_window=60)
+            try:
+                # Changes to the same path are coalesced into one journal record
+                for player_name in ('Player 1', 'Player 2'):
+                    with config_manager(save=True) as config:
+                        config['players']['p1'] = {'id': 'p1', 'name': player_name}
+                        config_manager.changed('players', 'p1')
+                self.assertFalse(os.path.exists(journal_path))
+            finally:
+                config_manager.close()
+            self.assertFalse(os.path.exists(config_path))
+            with open(journal_path, 'r', encoding='utf-8') as fh:
+                self.assertListEqual([json.loads(line) for line in fh], [
+                    {'path': ['players', 'p1'], 'value': {'id': 'p1', 'name': 'Player 2'}}
+                ])
+
+
+    def test_room(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {},
+                'rooms': {
+                    'r1': {'name': 'Tic Tac Toe', 'players': []},
+                    'r2': {'name': 'Checkers', 'players': []}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path)
+            self.assertListEqual(list(config_manager.room_locks), [None, 'r1', 'r2'])
+
+            # Hold room r1's config context on another thread
+            room_entered = threading.Event()
+            room_release = threading.Event()
+            def room_thread_fn():
+                with config_manager.room('r1'):
+                    room_entered.set()
+                    room_release.wait(5)
+            room_thread = threading.Thread(target=room_thread_fn)
+            room_thread.start()
+            self.assertTrue(room_entered.wait(5))
+
+            # Room r2's game may be updated while room r1's context is held
+            with config_manager.room('r2'):
+                config_manager.set_game('r2', {'name': 'Checkers', 'players': [], 'state': {'moves': 1}})
+            self.assertEqual(ConfigManager.get_game(config_manager.snapshot, 'r2')['state'], {'moves': 1})
+
+            # Saving contexts wait for room contexts
+            saved = threading.Event()
+            def save_thread_fn():
+                with config_manager(save=True):
+                    config_manager.set_game('r1', None)
+                saved.set()
+            save_thread = threading.Thread(target=save_thread_fn)
+            save_thread.start()
+            self.assertFalse(saved.wait(0.05))
+            room_release.set()
+            room_thread.join()
+            save_thread.join()
+            self.assertTrue(saved.is_set())
+            self.assertListEqual(list(config_manager.room_locks), [None, 'r2'])
+
+            # Verify the config file
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertDictEqual(json.loads(fh.read()), {
+                    'players': {},
+                    'rooms': {
+                        'r2': {'name': 'Checkers', 'players': [], 'state': {'moves': 1}, 'version': 3}
+                    }
+                })
+
+
+    def test_durability_none(self):
+        with create_test_files([]) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, durability='none')
+            try:
+                self.assertFalse(config_manager.storage.sync)
+                with config_manager(save=True) as config:
+                    config['players']['p1'] = {'id': 'p1', 'name': 'p1'}
+                    config_manager.changed('players', 'p1')
+                self.assertDictEqual(config_manager.snapshot['players'], {'p1': {'id': 'p1', 'name': 'p1'}})
+            finally:
+                config_manager.close()
+            self.assertListEqual(os.listdir(temp_dir), [])
+
+
+    def test_durability_batch(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('os.fsync') as mock_fsync:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, durability='batch')
+            try:
+                self.assertTrue(config_manager.storage.sync)
+                self.assertEqual(config_manager.save_window, ConfigManager.BATCH_SAVE_WINDOW)
+                self.assertIsNotNone(config_manager.flush_thread)
+
+                # Saves are coalesced into one synced write
+                for player_id in ('p1', 'p2'):
+                    with config_manager(save=True) as config:
+                        config['players'][player_id] = {'id': player_id, 'name': player_id}
+                        config_manager.changed('players', player_id)
+            finally:
+                config_manager.close()
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertListEqual(list(json.loads(fh.read())['players']), ['p1', 'p2'])
+            self.assertEqual(mock_fsync.call_count, 2)
+
+
+    def test_durability_sync(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('os.fsync') as mock_fsync:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, durability='sync')
+            self.assertTrue(config_manager.storage.sync)
+            self.assertIsNone(config_manager.flush_thread)
+
+            # Each save is synced - the config file and its directory
+            with config_manager(save=True) as config:
+                config['players']['p1'] = {'id': 'p1', 'name': 'p1'}
+                config_manager.changed('players', 'p1')
+            self.assertEqual(mock_fsync.call_count, 2)
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertListEqual(list(json.loads(fh.read())['players']), ['p1'])
+
+
+    def test_durability_invalid(self):
+        with self.assertRaises(ValueError) as cm_exc:
+            ConfigManager('mobstiq.json', durability='unknown')
+        self.assertEqual(str(cm_exc.exception), 'Invalid durability level "unknown"')
+
+
+    def test_durability_save_window(self):
+        for durability in ('none', 'sync'):
+            with self.assertRaises(ValueError) as cm_exc:
+                ConfigManager('mobstiq.json', durability=durability, save_window=1)
+            self.assertEqual(str(cm_exc.exception), f'The "{durability}" durability level does not support a save window')
+
+
+    def test_snapshot(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'}
+                },
+                'game': {
+                    'name': 'Tic Tac Toe',
+                    'players': ['p1']
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'))
+            snapshot = app.config.snapshot
+            self.assertDictEqual(snapshot['game'], {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 1})
+
+            # Writes publish a new snapshot - the previous snapshot is unchanged
+            status, _, _ = app.request('POST', '/gameAddPlayer', wsgi_input=b'{"id": "p2"}')
+            self.assertEqual(status, '200 OK')
+            self.assertIsNot(app.config.snapshot, snapshot)
+            self.assertDictEqual(snapshot['game'], {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 1})
+            self.assertDictEqual(app.config.snapshot['game'], {'name': 'Tic Tac Toe', 'players': ['p1', 'p2'], 'version': 2})
+
+            # Snapshot reads don't wait on the config lock
+            responses = []
+            def read_snapshot():
+                responses.append(app.request('GET', '/gameState'))
+                responses.append(app.request('POST', '/playerValidate', wsgi_input=b'{"id": "p2"}'))
+            with app.config(save=True):
+                read_thread = threading.Thread(target=read_snapshot)
+                read_thread.start()
+                read_thread.join(5)
+                self.assertFalse(read_thread.is_alive())
+            self.assertListEqual([status for status, _, _ in responses], ['200 OK', '200 OK'])
+            self.assertDictEqual(json.loads(responses[0][2]), {'game': {'name': 'Tic Tac Toe', 'players': ['p1', 'p2'], 'version': 2}})
+            self.assertDictEqual(json.loads(responses[1][2]), {'id': 'p2', 'name': 'Player 2'})
+
+
+    def test_find_player_name(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_manager = ConfigManager(os.path.join(temp_dir, 'mobstiq.json'))
+            self.assertDictEqual(config_manager.player_names, {'Player 1': 'p1'})
+            with config_manager(save=True):
+                self.assertDictEqual(config_manager.find_player_name('Player 1'), {'id': 'p1', 'name': 'Player 1'})
+                self.assertIsNone(config_manager.find_player_name('player 1'))
+                self.assertIsNone(config_manager.find_player_name('Player 2'))
+
+            # Added players are indexed
+            with config_manager(save=True) as config:
+                config['players']['p2'] = {'id': 'p2', 'name': 'Player 2'}
+                config_manager.changed('players', 'p2')
+                self.assertDictEqual(config_manager.find_player_name('Player 2'), {'id': 'p2', 'name': 'Player 2'})
+
+            # Removed players are not found
+            with config_manager(save=True) as config:
+                del config['players']['p1']
+                config_manager.changed('players', 'p1')
+                self.assertIsNone(config_manager.find_player_name('Player 1'))
+
+
+    def test_find_player_name_ignore_case(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_manager = ConfigManager(os.path.join(temp_dir, 'mobstiq.json'), ignore_case=True)
+            self.assertDictEqual(config_manager.player_names, {'player 1': 'p1'})
+            with config_manager(save=True):
+                self.assertDictEqual(config_manager.find_player_name('PLAYER 1'), {'id': 'p1', 'name': 'Player 1'})
+                self.assertIsNone(config_manager.find_player_name('Player 2'))
+
+
+    def test_evict_players(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'},
+                    'p3': {'id': 'p3', 'name': 'Player 3'},
+                    'p4': {'id': 'p4', 'name': 'Player 4'},
+                    'p5': {'id': 'p5', 'name': 'Player 5'}
+                },
+                'game': {'name': 'Tic Tac Toe', 'players': ['p2']}
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir, \
+             unittest.mock.patch.object(ConfigManager, 'PLAYER_REAP_BATCH_SIZE', 2):
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, player_ttl=3600)
+            try:
+                self.assertListEqual(list(config_manager.player_seen), ['p1', 'p2', 'p3', 'p4', 'p5'])
+
+                # No inactive players
+                self.assertEqual(config_manager.evict_players(), 0)
+
+                # Players p1, p2, p3, and p5 are inactive - p2 is in the current game
+                inactive_time = time.monotonic() - 7200
+                for player_id in ('p1', 'p2', 'p3', 'p5'):
+                    config_manager.player_seen[player_id] = inactive_time
+                self.assertEqual(config_manager.evict_players(), 3)
+                self.assertListEqual(list(config_manager.player_seen), ['p2', 'p4'])
+                self.assertDictEqual(config_manager.player_names, {'Player 2': 'p2', 'Player 4': 'p4'})
+                self.assertIsNone(config_manager.find_player_name('Player 1'))
+                with config_manager() as config:
+                    self.assertListEqual(list(config['players']), ['p2', 'p4'])
+                self.assertListEqual(list(config_manager.snapshot['players']), ['p2', 'p4'])
+            finally:
+                config_manager.close()
+
+            # The evictions are saved
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertListEqual(list(json.loads(fh.read())['players']), ['p2', 'p4'])
+
+
+    def test_evict_players_last_seen(self):
+        today = ConfigManager.seen_day()
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1', 'lastSeen': today - 10},
+                    'p2': {'id': 'p2', 'name': 'Player 2', 'lastSeen': today},
+                    'p3': {'id': 'p3', 'name': 'Player 3'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path, player_ttl=7 * 86400)
+            try:
+                # Saved last-seen days span restarts - players without a last-seen day are last seen now
+                self.assertEqual(config_manager.evict_players(), 1)
+                self.assertListEqual(list(config_manager.player_seen), ['p2', 'p3'])
+
+                # Last-seen days are saved only when changed
+                config_manager.seen('p2')
+                self.assertDictEqual(config_manager.seen_pending, {'p3': today})
+            finally:
+                config_manager.close()
+
+            # The changed last-seen days are saved on close
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertDictEqual(json.loads(fh.read()), {
+                    'players': {
+                        'p2': {'id': 'p2', 'name': 'Player 2', 'lastSeen': today},
+                        'p3': {'id': 'p3', 'name': 'Player 3', 'lastSeen': today}
+                    }
+                })
+
+            # Without eviction, last-seen days are not saved
+            config_manager = ConfigManager(config_path)
+            try:
+                config_manager.seen('p1')
+                self.assertDictEqual(config_manager.seen_pending, {})
+            finally:
+                config_manager.close()
+
+
+    def test_evict_players_last_seen_end_of_day(self):
+        # Half an hour into the UTC day
+        today = ConfigManager.seen_day()
+        now = today * ConfigManager.PLAYER_SEEN_DAY + 1800
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1', 'lastSeen': today - 2},
+                    'p2': {'id': 'p2', 'name': 'Player 2', 'lastSeen': today - 1},
+                    'p3': {'id': 'p3', 'name': 'Player 3', 'lastSeen': today}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            with unittest.mock.patch('time.time', return_value=now):
+                config_manager = ConfigManager(config_path, player_ttl=3600)
+            try:
+                # Players are last seen at the end of their last-seen day
+                self.assertEqual(config_manager.evict_players(), 1)
+                self.assertListEqual(list(config_manager.player_seen), ['p2', 'p3'])
+                self.assertAlmostEqual(time.monotonic() - config_manager.player_seen['p2'], 1800, delta=60)
+                self.assertAlmostEqual(time.monotonic() - config_manager.player_seen['p3'], 0, delta=60)
+            finally:
+                config_manager.close()
+
+
+    def test_evict_players_reaper(self):
+        with create_test_files([]) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'), player_ttl=0.01)
+            try:
+                status, _, response = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "Player 1"}')
+                self.assertEqual(status, '200 OK')
+                player_id = json.loads(response.decode('utf-8'))['id']
+
+                # Wait for the reaper thread to evict the player
+                for _ in range(500):
+                    if not app.config.player_seen:
+                        break
+                    time.sleep(0.01)
+                status, _, response = app.request('POST', '/playerValidate', wsgi_input=json.dumps({'id': player_id}).encode('utf-8'))
+                self.assertEqual(status, '400 Bad Request')
+                self.assertDictEqual(json.loads(response.decode('utf-8')), {'error': 'InvalidPlayer'})
+            finally:
+                app.config.close()
+            self.assertFalse(app.config.reaper_thread.is_alive())
+
+
+    def test_seen(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'))
+            app.config.player_seen['p1'] = 0
+
+            # Validating a player marks the player active
+            status, _, _ = app.request('POST', '/playerValidate', wsgi_input=b'{"id": "p1"}')
+            self.assertEqual(status, '200 OK')
+            self.assertGreater(app.config.player_seen['p1'], 0)
+
+            # Game actions mark the player active
+            app.config.player_seen['p1'] = 0
+            status, _, _ = app.request('POST', '/gameSetup', wsgi_input=b'{"id": "p1", "name": "Tic Tac Toe"}')
+            self.assertEqual(status, '200 OK')
+            self.assertGreater(app.config.player_seen['p1'], 0)
+
+
+class TestReadWriteLock(unittest.TestCase):
+
+    def test_owned(self):
+        lock = ReadWriteLock()
+        self.assertFalse(lock.owned())
+        with lock:
+            self.assertTrue(lock.owned())
+
+            # Other threads don't own the write lock
+            owned = []
+            owner_thread = threading.Thread(target=lambda: owned.append(lock.owned()))
+            owner_thread.start()
+            owner_thread.join()
+            self.assertListEqual(owned, [False])
+        self.assertFalse(lock.owned())
+
+
+    def test_readers_shared(self):
+        lock = ReadWriteLock()
+        with lock.read():
+            # Another thread may read while the lock is read-held
+            reader_done = threading.Event()
+            def reader():
+                with lock.read():
+                    reader_done.set()
+            reader_thread = threading.Thread(target=reader)
+            reader_thread.start()
+            self.assertTrue(reader_done.wait(5))
+            reader_thread.join()
+        self.assertEqual(lock.readers, 0)
+
+
+    def test_writer_exclusive(self):
+        lock = ReadWriteLock()
+        events = []
+        reader_started = threading.Event()
+        def reader():
+            reader_started.set()
+            with lock.read():
+                events.append('read')
+
+        # The reader waits for the writer
+        with lock:
+            reader_thread = threading.Thread(target=reader)
+            reader_thread.start()
+            self.assertTrue(reader_started.wait(5))
+            time.sleep(0.05)
+            events.append('write')
+        reader_thread.join()
+        self.assertListEqual(events, ['write', 'read'])
+
+
+    def test_writer_preferred(self):
+        lock = ReadWriteLock()
+        events = []
+        def writer():
+            with lock:
+                events.append('write')
+        def reader():
+            with lock.read():
+                events.append('read')
+
+        # A waiting writer takes precedence over a new reader
+        with lock.read():
+            writer_thread = threading.Thread(target=writer)
+            writer_thread.start()
+            while not lock.writers_waiting:
+                time.sleep(0.001)
+            reader_thread = threading.Thread(target=reader)
+            reader_thread.start()
+            time.sleep(0.05)
+            self.assertListEqual(events, [])
+        writer_thread.join()
+        reader_thread.join()
+        self.assertListEqual(events, ['write', 'read'])
+
+
+    def test_config_manager_read(self):
+        with create_test_files([]) as temp_dir:
+            config_manager = ConfigManager(os.path.join(temp_dir, 'mobstiq.json'))
+
+            # Read contexts share the config lock
+            with config_manager() as config:
+                self.assertEqual(config_manager.config_lock.readers, 1)
+                with config_manager() as config2:
+                    self.assertIs(config2, config)
+                    self.assertEqual(config_manager.config_lock.readers, 2)
+                self.assertFalse(config_manager.config_lock.writer)
+
+            # Save contexts are exclusive
+            with config_manager(save=True):
+                self.assertEqual(config_manager.config_lock.readers, 0)
+                self.assertTrue(config_manager.config_lock.writer)
+            self.assertFalse(config_manager.config_lock.writer)
+
+
 class TestAPI(unittest.TestCase):
 
     def test_get_service_url(self):
@@ -150,6 +1015,131 @@ class TestAPI(unittest.TestCase):
             self.assertFalse(os.path.exists(config_path))
 
 
+    def test_get_stats(self):
+        with create_test_files([]) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            app = Mobstiq(config_path)
+
+            # Cached responses are encoded once
+            for _ in range(3):
+                status, _, _ = app.request('GET', '/getGameList')
+                self.assertEqual(status, '200 OK')
+
+            status, headers, content_bytes = app.request('GET', '/getStats')
+            self.assertEqual(status, '200 OK')
+            self.assertListEqual(headers, [('Content-Type', 'application/json')])
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {
+                'responsesEncoded': 1,
+                'responsesCoalesced': 0
+            })
+
+
+    def test_batch(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            app = Mobstiq(config_path)
+
+            # The batch actions are saved once
+            with unittest.mock.patch('mobstiq.storage._write_atomic', wraps=_write_atomic) as mock_write_atomic:
+                status, headers, content_bytes = app.request('POST', '/batch', wsgi_input=json.dumps({'requests': [
+                    {'name': 'gameSetup', 'input': {'id': 'p1', 'name': 'Tic Tac Toe', 'newRoom': True}},
+                    {'name': 'playerValidate', 'input': {'id': 'p2'}},
+                    {'name': 'gameSetup', 'input': {'id': 'p2', 'name': 'Checkers'}},
+                    {'name': 'gameAddPlayer', 'input': {'id': 'p1'}},
+                    {'name': 'gameStart', 'input': {'id': 'p2'}}
+                ]}).encode('utf-8'))
+            self.assertEqual(status, '200 OK')
+            self.assertListEqual(headers, [('Content-Type', 'application/json')])
+            response = json.loads(content_bytes.decode('utf-8'))
+            room_id = response['results'][0]['output']['room']
+            self.assertDictEqual(response, {'results': [
+                {'output': {'room': room_id}},
+                {'output': {'id': 'p2', 'name': 'Player 2'}},
+                {'output': {}},
+                {'output': {}},
+                {'output': {}}
+            ]})
+            self.assertListEqual([args[0] for args, _ in mock_write_atomic.call_args_list], [config_path, f'{config_path}.sha256'])
+
+            # Verify the app config
+            expected_config = {
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'}
+                },
+                'game': {'name': 'Checkers', 'players': ['p2', 'p1'], 'current': 'p2', 'version': 4},
+                'rooms': {
+                    room_id: {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 1}
+                }
+            }
+            with app.config() as config:
+                self.assertDictEqual(config, expected_config)
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertDictEqual(json.loads(fh.read()), expected_config)
+
+            # The config snapshot is published
+            status, _, content_bytes = app.request('GET', '/gameState')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'game': expected_config['game']})
+
+
+    def test_batch_error(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            app = Mobstiq(config_path)
+
+            # The batch stops at the first action error - the preceding actions are saved
+            status, _, content_bytes = app.request('POST', '/batch', wsgi_input=json.dumps({'requests': [
+                {'name': 'gameSetup', 'input': {'id': 'p1', 'name': 'Tic Tac Toe'}},
+                {'name': 'gameStart', 'input': {'id': 'p1'}},
+                {'name': 'gameStop', 'input': {'id': 'p1'}}
+            ]}).encode('utf-8'))
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'results': [
+                {'output': {}},
+                {'error': 'TooFewPlayers'}
+            ]})
+            expected_config = {
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'}
+                },
+                'game': {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 1}
+            }
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertDictEqual(json.loads(fh.read()), expected_config)
+
+            # Invalid action input
+            status, _, content_bytes = app.request('POST', '/batch', wsgi_input=json.dumps({'requests': [
+                {'name': 'gameStop', 'input': {}}
+            ]}).encode('utf-8'))
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'results': [
+                {'error': 'InvalidInput', 'message': 'Required member "id" missing'}
+            ]})
+
+            # Unknown action
+            status, _, content_bytes = app.request('POST', '/batch', wsgi_input=json.dumps({'requests': [
+                {'name': 'gameEvents', 'input': {}}
+            ]}).encode('utf-8'))
+            self.assertEqual(status, '400 Bad Request')
+            self.assertEqual(json.loads(content_bytes.decode('utf-8'))['error'], 'InvalidInput')
+
+
     def test_player_register(self):
         with create_test_files([]) as temp_dir, \
              unittest.mock.patch('uuid.uuid4', return_value=uuid.UUID('123e4567e89b12d3a456426614174000')):
@@ -224,6 +1214,35 @@ class TestAPI(unittest.TestCase):
                 self.assertDictEqual(saved_config, expected_config)
 
 
+    def test_player_register_name_in_use_ignore_case(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    '123e4567-e89b-12d3-a456-426614174000': {
+                        'id': '123e4567-e89b-12d3-a456-426614174000',
+                        'name': 'Player 1'
+                    }
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+
+            # Player names are case-sensitive by default
+            app = Mobstiq(config_path)
+            status, _, content_bytes = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "PLAYER 1"}')
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(json.loads(content_bytes.decode('utf-8'))['name'], 'PLAYER 1')
+
+            # Case-insensitive player names
+            app = Mobstiq(config_path, ignore_case=True)
+            status, headers, content_bytes = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "player 1"}')
+            response = json.loads(content_bytes.decode('utf-8'))
+            self.assertEqual(status, '400 Bad Request')
+            self.assertListEqual(headers, [('Content-Type', 'application/json')])
+            self.assertDictEqual(response, {'error': 'NameInUse'})
+
+
     def test_player_validate(self):
         test_files = [
             ('mobstiq.json', json.dumps({
@@ -289,6 +1308,58 @@ class TestAPI(unittest.TestCase):
             self.assertFalse(os.path.exists(config_path))
 
 
+    def test_player_validate_batch(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            app = Mobstiq(config_path, player_ttl=60)
+
+            with unittest.mock.patch('time.monotonic', return_value=1000):
+                status, headers, content_bytes = app.request('POST', '/playerValidateBatch', wsgi_input=b'{"ids": ["p2", "p1"]}')
+            self.assertEqual(status, '200 OK')
+            self.assertListEqual(headers, [('Content-Type', 'application/json')])
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {
+                'players': [
+                    {'id': 'p2', 'name': 'Player 2'},
+                    {'id': 'p1', 'name': 'Player 1'}
+                ]
+            })
+
+            # The players are marked active
+            self.assertDictEqual(app.config.player_seen, {'p1': 1000, 'p2': 1000})
+
+            # No player IDs
+            status, _, content_bytes = app.request('POST', '/playerValidateBatch', wsgi_input=b'{"ids": []}')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'players': []})
+            app.config.close()
+
+
+    def test_player_validate_batch_invalid_player(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            app = Mobstiq(config_path)
+
+            status, headers, content_bytes = app.request('POST', '/playerValidateBatch', wsgi_input=b'{"ids": ["p1", "p2"]}')
+            self.assertEqual(status, '400 Bad Request')
+            self.assertListEqual(headers, [('Content-Type', 'application/json')])
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'error': 'InvalidPlayer'})
+
+
     def test_game_state(self):
         test_files = [
             ('mobstiq.json', json.dumps({
@@ -308,38 +1379,201 @@ class TestAPI(unittest.TestCase):
             config_path = os.path.join(temp_dir, 'mobstiq.json')
             app = Mobstiq(config_path)
 
-            status, headers, content_bytes = app.request('GET', '/gameState')
-            response = json.loads(content_bytes.decode('utf-8'))
+            status, headers, content_bytes = app.request('GET', '/gameState')
+            response = json.loads(content_bytes.decode('utf-8'))
+            self.assertEqual(status, '200 OK')
+            self.assertListEqual(headers, [('Content-Type', 'application/json')])
+            self.assertDictEqual(response, {
+                'game': {
+                    'name': 'Tic Tac Toe',
+                    'players': ['123e4567-e89b-12d3-a456-426614174000'],
+                    'version': 1
+                }
+            })
+
+            # Verify the app config
+            expected_config = {
+                'players': {
+                    '123e4567-e89b-12d3-a456-426614174000': {
+                        'id': '123e4567-e89b-12d3-a456-426614174000',
+                        'name': 'Player 1'
+                    }
+                },
+                'game': {
+                    'name': 'Tic Tac Toe',
+                    'players': ['123e4567-e89b-12d3-a456-426614174000'],
+                    'version': 1
+                }
+            }
+            with app.config() as config:
+                self.assertDictEqual(config, expected_config)
+
+            # Verify the config file
+            self.assertTrue(os.path.exists(config_path))
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                saved_config = json.loads(fh.read())
+                self.assertDictEqual(saved_config, expected_config)
+
+
+    def test_game_state_if_version(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'}
+                },
+                'game': {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 7}
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            app = Mobstiq(config_path)
+
+            # Unchanged game state
+            status, _, content_bytes = app.request('GET', '/gameState', query_string='ifVersion=7')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'unchanged': True})
+
+            # Changed game state
+            status, _, content_bytes = app.request('GET', '/gameState', query_string='ifVersion=6')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(
+                json.loads(content_bytes.decode('utf-8')),
+                {'game': {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 7}}
+            )
+
+            # The version counter continues from the loaded games
+            status, _, _ = app.request('POST', '/gameAddPlayer', wsgi_input=b'{"id": "p2"}')
+            self.assertEqual(status, '200 OK')
+            status, _, content_bytes = app.request('GET', '/gameState', query_string='ifVersion=7')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(
+                json.loads(content_bytes.decode('utf-8')),
+                {'game': {'name': 'Tic Tac Toe', 'players': ['p1', 'p2'], 'version': 8}}
+            )
+
+            # The version is saved
+            app2 = Mobstiq(config_path)
+            status, _, content_bytes = app2.request('GET', '/gameState', query_string='ifVersion=8')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'unchanged': True})
+
+            # No game is version zero
+            status, _, _ = app2.request('POST', '/gameStop', wsgi_input=b'{"id": "p1"}')
+            self.assertEqual(status, '200 OK')
+            status, _, content_bytes = app2.request('GET', '/gameState', query_string='ifVersion=0')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'unchanged': True})
+
+
+    def test_game_state_cache(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'}
+                },
+                'game': {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 1}
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            app = Mobstiq(config_path)
+
+            # The game state response is encoded once per game state version
+            with unittest.mock.patch('mobstiq.app.RESPONSE_ENCODER', wraps=RESPONSE_ENCODER) as mock_encoder:
+                for _ in range(3):
+                    status, headers, content_bytes = app.request('GET', '/gameState')
+                    self.assertEqual(status, '200 OK')
+                    self.assertListEqual(headers, [('Content-Type', 'application/json')])
+                    self.assertEqual(content_bytes, b'{"game":{"name":"Tic Tac Toe","players":["p1"],"version":1}}')
+                self.assertEqual(mock_encoder.encode.call_count, 1)
+
+                # A game change invalidates the cached response
+                status, _, _ = app.request('POST', '/gameAddPlayer', wsgi_input=b'{"id": "p2"}')
+                self.assertEqual(status, '200 OK')
+                self.assertNotIn(('gameState', None), app.config.responses.responses)
+                for _ in range(2):
+                    status, _, content_bytes = app.request('GET', '/gameState')
+                    self.assertEqual(status, '200 OK')
+                    self.assertEqual(content_bytes, b'{"game":{"name":"Tic Tac Toe","players":["p1","p2"],"version":2}}')
+                self.assertEqual(mock_encoder.encode.call_count, 2)
+
+                # Unknown rooms are not cached
+                status, _, content_bytes = app.request('GET', '/gameState', query_string='room=unknown')
+                self.assertEqual(status, '200 OK')
+                self.assertEqual(content_bytes, b'{}')
+                self.assertNotIn(('gameState', 'unknown'), app.config.responses.responses)
+
+                # The game list response is encoded once
+                for _ in range(2):
+                    status, _, content_bytes = app.request('GET', '/getGameList')
+                    self.assertEqual(status, '200 OK')
+                    self.assertEqual(json.loads(content_bytes.decode('utf-8')), {'games': BUILTIN_GAMES})
+                self.assertEqual(mock_encoder.encode.call_count, 4)
+
+            # Pretty output is not cached
+            app.pretty_output = True
+            status, _, content_bytes = app.request('GET', '/gameState')
+            self.assertEqual(status, '200 OK')
+            self.assertTrue(content_bytes.startswith(b'{\n  "game": {\n'))
+
+
+    def test_game_view(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'},
+                    'p3': {'id': 'p3', 'name': 'Player 3'}
+                },
+                'game': {'name': 'Tic Tac Toe', 'players': ['p2', 'p1'], 'version': 1}
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            app = Mobstiq(config_path)
+
+            status, headers, content_bytes = app.request('GET', '/gameView')
             self.assertEqual(status, '200 OK')
             self.assertListEqual(headers, [('Content-Type', 'application/json')])
-            self.assertDictEqual(response, {
-                'game': {
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {
+                'game': {'name': 'Tic Tac Toe', 'players': ['p2', 'p1'], 'version': 1},
+                'players': [
+                    {'id': 'p2', 'name': 'Player 2'},
+                    {'id': 'p1', 'name': 'Player 1'}
+                ],
+                'gameInfo': {
                     'name': 'Tic Tac Toe',
-                    'players': ['123e4567-e89b-12d3-a456-426614174000']
+                    'include': 'games/ticTacToe.bare',
+                    'function': 'ticTacToeMain',
+                    'minPlayers': 2,
+                    'maxPlayers': 2
                 }
             })
 
-            # Verify the app config
-            expected_config = {
-                'players': {
-                    '123e4567-e89b-12d3-a456-426614174000': {
-                        'id': '123e4567-e89b-12d3-a456-426614174000',
-                        'name': 'Player 1'
-                    }
-                },
-                'game': {
-                    'name': 'Tic Tac Toe',
-                    'players': ['123e4567-e89b-12d3-a456-426614174000']
-                }
-            }
-            with app.config() as config:
-                self.assertDictEqual(config, expected_config)
+            # A game change invalidates the cached game view
+            self.assertIn(('gameView', None), app.config.responses.responses)
+            status, _, _ = app.request('POST', '/gameRemovePlayer', wsgi_input=b'{"id": "p2"}')
+            self.assertEqual(status, '200 OK')
+            self.assertNotIn(('gameView', None), app.config.responses.responses)
+            status, _, content_bytes = app.request('GET', '/gameView')
+            self.assertEqual(status, '200 OK')
+            response = json.loads(content_bytes.decode('utf-8'))
+            self.assertDictEqual(response['game'], {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 2})
+            self.assertListEqual(response['players'], [{'id': 'p1', 'name': 'Player 1'}])
 
-            # Verify the config file
-            self.assertTrue(os.path.exists(config_path))
-            with open(config_path, 'r', encoding='utf-8') as fh:
-                saved_config = json.loads(fh.read())
-                self.assertDictEqual(saved_config, expected_config)
+            # Unknown room
+            status, _, content_bytes = app.request('GET', '/gameView', query_string='room=unknown')
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(content_bytes, b'{}')
+
+            # No game
+            status, _, _ = app.request('POST', '/gameStop', wsgi_input=b'{"id": "p1"}')
+            self.assertEqual(status, '200 OK')
+            status, _, content_bytes = app.request('GET', '/gameView')
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(content_bytes, b'{}')
 
 
     def test_game_state_no_game(self):
@@ -396,7 +1630,8 @@ class TestAPI(unittest.TestCase):
                 },
                 'game': {
                     'name': 'Tic Tac Toe',
-                    'players': ['123e4567-e89b-12d3-a456-426614174000']
+                    'players': ['123e4567-e89b-12d3-a456-426614174000'],
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -513,7 +1748,8 @@ class TestAPI(unittest.TestCase):
                 },
                 'game': {
                     'name': 'Chess',
-                    'players': ['123e4567-e89b-12d3-a456-426614174000']
+                    'players': ['123e4567-e89b-12d3-a456-426614174000'],
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -575,7 +1811,8 @@ class TestAPI(unittest.TestCase):
                     'players': [
                         '123e4567-e89b-12d3-a456-426614174000',
                         '223e4567-e89b-12d3-a456-426614174000'
-                    ]
+                    ],
+                    'version': 2
                 }
             }
             with app.config() as config:
@@ -636,7 +1873,8 @@ class TestAPI(unittest.TestCase):
                     'name': 'Tic Tac Toe',
                     'players': [
                         '123e4567-e89b-12d3-a456-426614174000'
-                    ]
+                    ],
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -687,7 +1925,8 @@ class TestAPI(unittest.TestCase):
                 },
                 'game': {
                     'name': 'Tic Tac Toe',
-                    'players': ['123e4567-e89b-12d3-a456-426614174000']
+                    'players': ['123e4567-e89b-12d3-a456-426614174000'],
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -799,7 +2038,8 @@ class TestAPI(unittest.TestCase):
                         '223e4567-e89b-12d3-a456-426614174000'
                     ],
                     'current': '123e4567-e89b-12d3-a456-426614174000',
-                    'state': {}
+                    'state': {},
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -872,7 +2112,8 @@ class TestAPI(unittest.TestCase):
                     'players': [
                         '123e4567-e89b-12d3-a456-426614174000',
                         '223e4567-e89b-12d3-a456-426614174000'
-                    ]
+                    ],
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -936,7 +2177,8 @@ class TestAPI(unittest.TestCase):
                     'name': 'Tic Tac Toe',
                     'players': [
                         '123e4567-e89b-12d3-a456-426614174000'
-                    ]
+                    ],
+                    'version': 2
                 }
             }
             with app.config() as config:
@@ -987,7 +2229,8 @@ class TestAPI(unittest.TestCase):
                 },
                 'game': {
                     'name': 'Tic Tac Toe',
-                    'players': ['123e4567-e89b-12d3-a456-426614174000']
+                    'players': ['123e4567-e89b-12d3-a456-426614174000'],
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -1056,7 +2299,8 @@ class TestAPI(unittest.TestCase):
                         '223e4567-e89b-12d3-a456-426614174000'
                     ],
                     'current': '123e4567-e89b-12d3-a456-426614174000',
-                    'state': {}
+                    'state': {},
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -1117,7 +2361,8 @@ class TestAPI(unittest.TestCase):
                     'name': 'Tic Tac Toe',
                     'players': [
                         '123e4567-e89b-12d3-a456-426614174000'
-                    ]
+                    ],
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -1183,7 +2428,8 @@ class TestAPI(unittest.TestCase):
                         '123e4567-e89b-12d3-a456-426614174000',
                         '223e4567-e89b-12d3-a456-426614174000'
                     ],
-                    'current': '123e4567-e89b-12d3-a456-426614174000'
+                    'current': '123e4567-e89b-12d3-a456-426614174000',
+                    'version': 2
                 }
             }
             with app.config() as config:
@@ -1293,7 +2539,8 @@ class TestAPI(unittest.TestCase):
                         '123e4567-e89b-12d3-a456-426614174000',
                         '223e4567-e89b-12d3-a456-426614174000'
                     ],
-                    'current': '123e4567-e89b-12d3-a456-426614174000'
+                    'current': '123e4567-e89b-12d3-a456-426614174000',
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -1358,7 +2605,8 @@ class TestAPI(unittest.TestCase):
                     'players': [
                         '123e4567-e89b-12d3-a456-426614174000',
                         '223e4567-e89b-12d3-a456-426614174000'
-                    ]
+                    ],
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -1409,7 +2657,8 @@ class TestAPI(unittest.TestCase):
                 },
                 'game': {
                     'name': 'Tic Tac Toe',
-                    'players': ['123e4567-e89b-12d3-a456-426614174000']
+                    'players': ['123e4567-e89b-12d3-a456-426614174000'],
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -1477,7 +2726,8 @@ class TestAPI(unittest.TestCase):
                         '223e4567-e89b-12d3-a456-426614174000'
                     ],
                     'current': '223e4567-e89b-12d3-a456-426614174000',
-                    'state': {'board': ['X', '', '', '', '', '', '', '', '']}
+                    'state': {'board': ['X', '', '', '', '', '', '', '', '']},
+                    'version': 2
                 }
             }
             with app.config() as config:
@@ -1490,6 +2740,146 @@ class TestAPI(unittest.TestCase):
                 self.assertDictEqual(saved_config, expected_config)
 
 
+    def test_game_update_patch(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'}
+                },
+                'game': {
+                    'name': 'Tic Tac Toe',
+                    'players': ['p1', 'p2'],
+                    'current': 'p1',
+                    'state': {'board': ['', '', '']},
+                    'version': 3
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            app = Mobstiq(config_path)
+
+            # Patch the game state
+            status, _, content_bytes = app.request('POST', '/gameUpdate', wsgi_input=json.dumps({
+                'id': 'p1',
+                'version': 3,
+                'patch': [{'op': 'replace', 'path': '/board/1', 'value': 'X'}]
+            }).encode('utf-8'))
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {})
+            expected_game = {
+                'name': 'Tic Tac Toe',
+                'players': ['p1', 'p2'],
+                'current': 'p2',
+                'state': {'board': ['', 'X', '']},
+                'version': 4
+            }
+            with app.config() as config:
+                self.assertDictEqual(config['game'], expected_game)
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertDictEqual(json.loads(fh.read())['game'], expected_game)
+
+            # A reader at the previous version gets the delta patch
+            status, _, content_bytes = app.request('GET', '/gameStateWait', query_string='version=3&delta=true')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {
+                'patch': [
+                    {'op': 'replace', 'path': '/state/board/1', 'value': 'X'},
+                    {'op': 'replace', 'path': '/current', 'value': 'p2'},
+                    {'op': 'replace', 'path': '/version', 'value': 4}
+                ],
+                'version': 4
+            })
+
+            # Other readers get the game
+            for query_string in ('version=2&delta=true', 'version=3', 'delta=true'):
+                status, _, content_bytes = app.request('GET', '/gameStateWait', query_string=query_string)
+                self.assertEqual(status, '200 OK')
+                self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'game': expected_game, 'version': 4})
+
+            # Stale base version
+            status, _, content_bytes = app.request('POST', '/gameUpdate', wsgi_input=json.dumps({
+                'id': 'p2',
+                'version': 3,
+                'patch': [{'op': 'replace', 'path': '/board/0', 'value': 'O'}]
+            }).encode('utf-8'))
+            self.assertEqual(status, '400 Bad Request')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'error': 'StaleVersion'})
+
+            # Failed patch
+            status, _, content_bytes = app.request('POST', '/gameUpdate', wsgi_input=json.dumps({
+                'id': 'p2',
+                'version': 4,
+                'patch': [{'op': 'test', 'path': '/board/0', 'value': 'X'}]
+            }).encode('utf-8'))
+            self.assertEqual(status, '400 Bad Request')
+            self.assertDictEqual(
+                json.loads(content_bytes.decode('utf-8')),
+                {'error': 'InvalidPatch', 'message': 'Test failed for "/board/0"'}
+            )
+
+            # Patched state not an object
+            status, _, content_bytes = app.request('POST', '/gameUpdate', wsgi_input=json.dumps({
+                'id': 'p2',
+                'version': 4,
+                'patch': [{'op': 'replace', 'path': '', 'value': []}]
+            }).encode('utf-8'))
+            self.assertEqual(status, '400 Bad Request')
+            self.assertDictEqual(
+                json.loads(content_bytes.decode('utf-8')),
+                {'error': 'InvalidPatch', 'message': 'The patched game state is not an object'}
+            )
+
+            # Patch without a base version
+            status, _, content_bytes = app.request('POST', '/gameUpdate', wsgi_input=json.dumps({
+                'id': 'p2',
+                'patch': []
+            }).encode('utf-8'))
+            self.assertEqual(status, '400 Bad Request')
+            self.assertDictEqual(
+                json.loads(content_bytes.decode('utf-8')),
+                {'error': 'InvalidPatch', 'message': 'A patch requires the base game state "version"'}
+            )
+
+            # Both state and patch
+            status, _, content_bytes = app.request('POST', '/gameUpdate', wsgi_input=json.dumps({
+                'id': 'p2',
+                'version': 4,
+                'state': {},
+                'patch': []
+            }).encode('utf-8'))
+            self.assertEqual(status, '400 Bad Request')
+            self.assertDictEqual(
+                json.loads(content_bytes.decode('utf-8')),
+                {'error': 'InvalidPatch', 'message': 'Exactly one of "state" and "patch" is required'}
+            )
+
+            # A full state update's delta replaces the state
+            status, _, _ = app.request(
+                'POST', '/gameUpdate',
+                wsgi_input=b'{"id": "p2", "version": 4, "state": {"board": ["O", "X", ""]}}'
+            )
+            self.assertEqual(status, '200 OK')
+            status, _, content_bytes = app.request('GET', '/gameStateWait', query_string='version=4&delta=true')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {
+                'patch': [
+                    {'op': 'add', 'path': '/state', 'value': {'board': ['O', 'X', '']}},
+                    {'op': 'replace', 'path': '/current', 'value': 'p1'},
+                    {'op': 'replace', 'path': '/version', 'value': 5}
+                ],
+                'version': 5
+            })
+
+            # Other game changes have no delta
+            status, _, _ = app.request('POST', '/gameStop', wsgi_input=b'{"id": "p1"}')
+            self.assertEqual(status, '200 OK')
+            status, _, content_bytes = app.request('GET', '/gameStateWait', query_string='version=5&delta=true')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'version': 0})
+
+
     def test_game_update_round_robin(self):
         test_files = [
             ('mobstiq.json', json.dumps({
@@ -1546,7 +2936,8 @@ class TestAPI(unittest.TestCase):
                         '223e4567-e89b-12d3-a456-426614174000'
                     ],
                     'current': '123e4567-e89b-12d3-a456-426614174000',
-                    'state': {'board': ['X', 'O', '', '', '', '', '', '', '']}
+                    'state': {'board': ['X', 'O', '', '', '', '', '', '', '']},
+                    'version': 2
                 }
             }
             with app.config() as config:
@@ -1611,7 +3002,8 @@ class TestAPI(unittest.TestCase):
                     'players': [
                         '123e4567-e89b-12d3-a456-426614174000',
                         '223e4567-e89b-12d3-a456-426614174000'
-                    ]
+                    ],
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -1678,7 +3070,8 @@ class TestAPI(unittest.TestCase):
                         '123e4567-e89b-12d3-a456-426614174000',
                         '223e4567-e89b-12d3-a456-426614174000'
                     ],
-                    'current': '123e4567-e89b-12d3-a456-426614174000'
+                    'current': '123e4567-e89b-12d3-a456-426614174000',
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -1916,7 +3309,8 @@ class TestAPI(unittest.TestCase):
                         '223e4567-e89b-12d3-a456-426614174000'
                     ],
                     'current': '123e4567-e89b-12d3-a456-426614174000',
-                    'state': {'board': ['X', '', '', '', '', '', '', '', '']}
+                    'state': {'board': ['X', '', '', '', '', '', '', '', '']},
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -1960,14 +3354,14 @@ class TestAPI(unittest.TestCase):
             status, headers, content_bytes = app.request('GET', '/gameInclude')
             response = content_bytes.decode('utf-8')
             self.assertEqual(status, '200 OK')
-            self.assertListEqual(headers, [('Content-Type', 'text/plain; charset=utf-8')])
+            self.assertListEqual(headers, [
+                ('Cache-Control', 'no-cache'),
+                ('Content-Type', 'text/plain; charset=utf-8'),
+                ('ETag', strong_etag(b"mobstiqGameIncludeFunction = 'ticTacToeMain'\n"))
+            ])
             self.assertEqual(
                 response,
-                """\
-include 'games/ticTacToe.bare'
-
-mobstiqGameIncludeFunction = 'ticTacToeMain'
-"""
+                "mobstiqGameIncludeFunction = 'ticTacToeMain'\n"
             )
 
             # Verify the app config - game should be removed
@@ -1989,7 +3383,8 @@ mobstiqGameIncludeFunction = 'ticTacToeMain'
                         '223e4567-e89b-12d3-a456-426614174000'
                     ],
                     'current': '123e4567-e89b-12d3-a456-426614174000',
-                    'state': {'board': ['X', '', '', '', '', '', '', '', '']}
+                    'state': {'board': ['X', '', '', '', '', '', '', '', '']},
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -2031,14 +3426,14 @@ mobstiqGameIncludeFunction = 'ticTacToeMain'
             status, headers, content_bytes = app.request('GET', '/gameInclude')
             response = content_bytes.decode('utf-8')
             self.assertEqual(status, '200 OK')
-            self.assertListEqual(headers, [('Content-Type', 'text/plain; charset=utf-8')])
+            self.assertListEqual(headers, [
+                ('Cache-Control', 'no-cache'),
+                ('Content-Type', 'text/plain; charset=utf-8'),
+                ('ETag', strong_etag(b"mobstiqGameIncludeFunction = 'ticTacToeMain'\n"))
+            ])
             self.assertEqual(
                 response,
-                """\
-include 'games/ticTacToe.bare'
-
-mobstiqGameIncludeFunction = 'ticTacToeMain'
-"""
+                "mobstiqGameIncludeFunction = 'ticTacToeMain'\n"
             )
 
             # Verify the app config (unchanged)
@@ -2058,7 +3453,8 @@ mobstiqGameIncludeFunction = 'ticTacToeMain'
                     'players': [
                         '123e4567-e89b-12d3-a456-426614174000',
                         '223e4567-e89b-12d3-a456-426614174000'
-                    ]
+                    ],
+                    'version': 1
                 }
             }
             with app.config() as config:
@@ -2071,6 +3467,48 @@ mobstiqGameIncludeFunction = 'ticTacToeMain'
                 self.assertDictEqual(saved_config, expected_config)
 
 
+    def test_game_include_not_modified(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    '123e4567-e89b-12d3-a456-426614174000': {
+                        'id': '123e4567-e89b-12d3-a456-426614174000',
+                        'name': 'Player 1'
+                    },
+                    '223e4567-e89b-12d3-a456-426614174000': {
+                        'id': '223e4567-e89b-12d3-a456-426614174000',
+                        'name': 'Player 2'
+                    }
+                },
+                'game': {
+                    'name': 'Tic Tac Toe',
+                    'players': [
+                        '123e4567-e89b-12d3-a456-426614174000',
+                        '223e4567-e89b-12d3-a456-426614174000'
+                    ]
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            app = Mobstiq(config_path)
+
+            # The current game's ETag is not modified
+            etag = strong_etag(b"mobstiqGameIncludeFunction = 'ticTacToeMain'\n")
+            status, headers, content_bytes = app.request('GET', '/gameInclude', environ={'HTTP_IF_NONE_MATCH': etag})
+            self.assertEqual(status, '304 Not Modified')
+            self.assertListEqual(headers, [('Cache-Control', 'no-cache'), ('ETag', etag)])
+            self.assertEqual(content_bytes, b'')
+
+            # Another game's ETag is modified
+            status, headers, content_bytes = app.request(
+                'GET', '/gameInclude', environ={'HTTP_IF_NONE_MATCH': strong_etag(b"mobstiqGameIncludeFunction = 'checkersMain'\n")}
+            )
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(dict(headers)['ETag'], etag)
+            self.assertEqual(content_bytes, b"mobstiqGameIncludeFunction = 'ticTacToeMain'\n")
+
+
     def test_game_include_no_game(self):
         test_files = [
             ('mobstiq.json', json.dumps({
@@ -2109,3 +3547,311 @@ mobstiqGameIncludeFunction = 'ticTacToeMain'
             with open(config_path, 'r', encoding='utf-8') as fh:
                 saved_config = json.loads(fh.read())
                 self.assertDictEqual(saved_config, expected_config)
+
+
+    def test_game_rooms(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'},
+                    'p3': {'id': 'p3', 'name': 'Player 3'}
+                },
+                'game': {
+                    'name': 'Checkers',
+                    'players': ['p3']
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir, \
+             unittest.mock.patch('uuid.uuid4', return_value=uuid.UUID('123e4567e89b12d3a456426614174000')):
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            app = Mobstiq(config_path)
+            room_id = '123e4567-e89b-12d3-a456-426614174000'
+
+            # Set up a game in a new room - the default room is in use
+            status, _, content_bytes = app.request('POST', '/gameSetup', wsgi_input=b'{"id": "p1", "name": "Tic Tac Toe", "newRoom": true}')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'room': room_id})
+
+            # Play the room's game
+            for url, request in (
+                ('/gameAddPlayer', {'id': 'p2', 'room': room_id}),
+                ('/gameStart', {'id': 'p1', 'room': room_id}),
+                ('/gameUpdate', {'id': 'p1', 'room': room_id, 'state': {'board': ['X']}})
+            ):
+                status, _, content_bytes = app.request('POST', url, wsgi_input=json.dumps(request).encode('utf-8'))
+                self.assertEqual(status, '200 OK')
+                self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {})
+
+            # Get the room's game state - the default room's game is unchanged
+            expected_game = {'name': 'Tic Tac Toe', 'players': ['p1', 'p2'], 'current': 'p2', 'state': {'board': ['X']}, 'version': 5}
+            status, _, content_bytes = app.request('GET', '/gameState', query_string=f'room={room_id}')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'game': expected_game})
+            status, _, content_bytes = app.request('GET', '/gameState')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'game': {'name': 'Checkers', 'players': ['p3'], 'version': 1}})
+            status, _, content_bytes = app.request('GET', '/gameInclude', query_string=f'room={room_id}')
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(content_bytes.decode('utf-8'), "mobstiqGameIncludeFunction = 'ticTacToeMain'\n")
+
+            # Verify the config file
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                saved_config = json.loads(fh.read())
+            self.assertDictEqual(saved_config['rooms'], {room_id: expected_game})
+            self.assertDictEqual(saved_config['game'], {'name': 'Checkers', 'players': ['p3'], 'version': 1})
+
+            # Stop the room's game - the room is deleted
+            status, _, _ = app.request('POST', '/gameStop', wsgi_input=json.dumps({'id': 'p2', 'room': room_id}).encode('utf-8'))
+            self.assertEqual(status, '200 OK')
+            status, _, content_bytes = app.request('GET', '/gameState', query_string=f'room={room_id}')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {})
+            with app.config() as config:
+                self.assertNotIn('rooms', config)
+            self.assertListEqual(list(app.config.room_locks), [None])
+
+
+    def test_game_rooms_invalid_room(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'))
+            for url, request in (
+                ('/gameAddPlayer', {'id': 'p1', 'room': 'r1'}),
+                ('/gameRemovePlayer', {'id': 'p1', 'room': 'r1'}),
+                ('/gameStart', {'id': 'p1', 'room': 'r1'}),
+                ('/gameUpdate', {'id': 'p1', 'room': 'r1', 'state': {}}),
+                ('/gameStop', {'id': 'p1', 'room': 'r1'})
+            ):
+                status, _, content_bytes = app.request('POST', url, wsgi_input=json.dumps(request).encode('utf-8'))
+                self.assertEqual(status, '400 Bad Request')
+                self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'error': 'InvalidRoom'})
+            self.assertListEqual(list(app.config.room_locks), [None])
+
+            status, _, content_bytes = app.request('GET', '/gameInclude', query_string='room=r1')
+            self.assertEqual(status, '400 Bad Request')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'error': 'NotInPlay'})
+
+
+    def test_game_state_wait(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'))
+
+            # No version returns immediately
+            status, _, content_bytes = app.request('GET', '/gameStateWait')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'version': 0})
+
+            # Unchanged game state times out
+            status, _, content_bytes = app.request('GET', '/gameStateWait', query_string='version=0&timeout=10')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'version': 0})
+
+            # Wait for the game state change on another thread
+            wait_responses = []
+            def wait_thread_fn():
+                _, _, wait_content_bytes = app.request('GET', '/gameStateWait', query_string='version=0&timeout=5000')
+                wait_responses.append(json.loads(wait_content_bytes.decode('utf-8')))
+            wait_thread = threading.Thread(target=wait_thread_fn)
+            wait_thread.start()
+            status, _, _ = app.request('POST', '/gameSetup', wsgi_input=b'{"id": "p1", "name": "Tic Tac Toe"}')
+            self.assertEqual(status, '200 OK')
+            wait_thread.join()
+            self.assertListEqual(wait_responses, [{'game': {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 1}, 'version': 1}])
+
+            # Changed game state returns immediately
+            status, _, content_bytes = app.request('GET', '/gameStateWait', query_string='version=0')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(
+                json.loads(content_bytes.decode('utf-8')),
+                {'game': {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 1}, 'version': 1}
+            )
+
+
+    def test_game_state_wait_busy(self):
+        with create_test_files([]) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'), max_waiters=1)
+
+            # Waiters beyond the limit return immediately
+            app.config.waiter_count = 1
+            start = time.monotonic()
+            status, _, content_bytes = app.request('GET', '/gameStateWait', query_string='version=0&timeout=5000')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'busy': True, 'version': 0})
+            self.assertLess(time.monotonic() - start, 1)
+
+            # Requests that don't wait are not limited
+            status, _, content_bytes = app.request('GET', '/gameStateWait')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'version': 0})
+
+            # Waiters wait when under the limit
+            app.config.waiter_count = 0
+            status, _, content_bytes = app.request('GET', '/gameStateWait', query_string='version=0&timeout=10')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'version': 0})
+            self.assertEqual(app.config.waiter_count, 0)
+
+
+    def test_game_state_wait_rooms(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'}
+                },
+                'game': {'name': 'Checkers', 'players': ['p1']}
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir, \
+             unittest.mock.patch('uuid.uuid4', return_value=uuid.UUID('123e4567e89b12d3a456426614174000')):
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'))
+            room_id = '123e4567-e89b-12d3-a456-426614174000'
+
+            # Another room's change does not change the default room's game state version
+            status, _, _ = app.request('POST', '/gameSetup', wsgi_input=b'{"id": "p1", "name": "Tic Tac Toe", "newRoom": true}')
+            self.assertEqual(status, '200 OK')
+            status, _, content_bytes = app.request('GET', '/gameStateWait', query_string='version=1&timeout=10')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(
+                json.loads(content_bytes.decode('utf-8')),
+                {'game': {'name': 'Checkers', 'players': ['p1'], 'version': 1}, 'version': 1}
+            )
+            status, _, content_bytes = app.request('GET', '/gameStateWait', query_string=f'room={room_id}&version=0')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(
+                json.loads(content_bytes.decode('utf-8')),
+                {'game': {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 2}, 'version': 2}
+            )
+
+            # A deleted room's game state version is zero
+            status, _, _ = app.request('POST', '/gameStop', wsgi_input=json.dumps({'id': 'p1', 'room': room_id}).encode('utf-8'))
+            self.assertEqual(status, '200 OK')
+            status, _, content_bytes = app.request('GET', '/gameStateWait', query_string=f'room={room_id}&version=2')
+            self.assertEqual(status, '200 OK')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'version': 0})
+
+
+    def test_game_events(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'))
+
+            start_response_calls = []
+            def start_response(status, response_headers):
+                start_response_calls.append((status, response_headers))
+            response = app(chisel.Context.create_environ('GET', '/gameEvents'), start_response)
+            self.assertListEqual(start_response_calls, [
+                ('200 OK', [('Cache-Control', 'no-cache'), ('Content-Type', 'text/event-stream')])
+            ])
+            self.assertTrue(app.config.events.has_subscribers(None))
+
+            # The first event is the current game state
+            self.assertEqual(next(response), b'id: 0\ndata: {"version":0}\n\n')
+
+            # Each game change is an event
+            status, _, _ = app.request('POST', '/gameSetup', wsgi_input=b'{"id": "p1", "name": "Tic Tac Toe"}')
+            self.assertEqual(status, '200 OK')
+            status, _, _ = app.request('POST', '/gameAddPlayer', wsgi_input=b'{"id": "p2"}')
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(next(response), b'id: 1\ndata: {"game":{"name":"Tic Tac Toe","players":["p1"],"version":1},"version":1}\n\n')
+            self.assertEqual(
+                next(response),
+                b'id: 2\ndata: {"game":{"name":"Tic Tac Toe","players":["p1","p2"],"version":2},"version":2}\n\n'
+            )
+
+            # Player changes are not events
+            status, _, _ = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "Player 3"}')
+            self.assertEqual(status, '200 OK')
+            self.assertListEqual(list(response.events), [])
+
+            # Closing the response unsubscribes
+            response.close()
+            self.assertFalse(app.config.events.has_subscribers(None))
+
+            # Closing the config ends the event streams
+            response = app(chisel.Context.create_environ('GET', '/gameEvents'), start_response)
+            app.config.close()
+            self.assertListEqual(list(response), [
+                b'id: 2\ndata: {"game":{"name":"Tic Tac Toe","players":["p1","p2"],"version":2},"version":2}\n\n'
+            ])
+
+
+    def test_game_events_max_subscribers(self):
+        with create_test_files([]) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'), max_subscribers=1)
+            start_response_calls = []
+            def start_response(status, response_headers):
+                start_response_calls.append((status, response_headers))
+            response = app(chisel.Context.create_environ('GET', '/gameEvents'), start_response)
+
+            # Event streams beyond the limit are unavailable
+            status, _, content_bytes = app.request('GET', '/gameEvents')
+            self.assertEqual(status, '503 Service Unavailable')
+            self.assertDictEqual(json.loads(content_bytes.decode('utf-8')), {'error': 'TooManyStreams'})
+
+            # Closed event streams make room for new event streams
+            response.close()
+            response = app(chisel.Context.create_environ('GET', '/gameEvents'), start_response)
+            self.assertEqual(start_response_calls[-1][0], '200 OK')
+            response.close()
+
+
+    def test_game_events_room_deleted(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    'p1': {'id': 'p1', 'name': 'Player 1'},
+                    'p2': {'id': 'p2', 'name': 'Player 2'}
+                }
+            }))
+        ]
+        with create_test_files(test_files) as temp_dir, \
+             unittest.mock.patch('uuid.uuid4', return_value=uuid.UUID('123e4567e89b12d3a456426614174000')):
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'))
+            room_id = '123e4567-e89b-12d3-a456-426614174000'
+            for url, request in (
+                ('/gameSetup', {'id': 'p1', 'name': 'Tic Tac Toe', 'newRoom': True}),
+                ('/gameAddPlayer', {'id': 'p2', 'room': room_id}),
+                ('/gameStart', {'id': 'p1', 'room': room_id})
+            ):
+                status, _, _ = app.request('POST', url, wsgi_input=json.dumps(request).encode('utf-8'))
+                self.assertEqual(status, '200 OK')
+
+            # Stream the room's events
+            response = app(chisel.Context.create_environ('GET', '/gameEvents', query_string=f'room={room_id}'), lambda *_: None)
+            self.assertTrue(next(response).startswith(b'id: 3\n'))
+
+            # Deleting the room ends its event streams
+            status, _, _ = app.request('POST', '/gameStop', wsgi_input=json.dumps({'id': 'p1', 'room': room_id}).encode('utf-8'))
+            self.assertEqual(status, '200 OK')
+            self.assertListEqual(list(response), [b'id: 0\ndata: {"version":0}\n\n'])
+            self.assertFalse(app.config.events.has_subscribers(room_id))
+            response.close()
+            self.assertEqual(app.config.events.subscriber_count, 0)
+
+            # Unknown room event streams end after the current game state
+            response = app(chisel.Context.create_environ('GET', '/gameEvents', query_string=f'room={room_id}'), lambda *_: None)
+            self.assertListEqual(list(response), [b'id: 0\ndata: {"version":0}\n\n'])
+            response.close()
+            self.assertEqual(app.config.events.subscriber_count, 0)
@@ -0,0 +1,123 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+import gzip
+import unittest
+import unittest.mock
+
+import chisel
+
+from mobstiq.assets import CompressedStaticRequest, etag_matches, parse_accept_encoding
+
+
+class TestAssets(unittest.TestCase):
+
+    CONTENT = b'Hello, World!\n' * 100
+
+
+    def test_variants(self):
+        app = chisel.Application()
+        request = CompressedStaticRequest('hello.txt', self.CONTENT)
+        app.add_request(request)
+        gzip_content = gzip.compress(self.CONTENT, compresslevel=9, mtime=0)
+        gzip_etag = request.variants[0][2]
+        identity_etag = request.variants[1][2]
+        self.assertEqual(request.etag, identity_etag)
+        self.assertRegex(gzip_etag, r'^"[0-9a-f]{32}-gzip"$')
+        self.assertRegex(identity_etag, r'^"[0-9a-f]{32}"$')
+
+        # Gzip-encoded response
+        status, headers, content = app.request('GET', '/hello.txt', environ={'HTTP_ACCEPT_ENCODING': 'gzip, deflate'})
+        self.assertEqual(status, '200 OK')
+        self.assertListEqual(headers, [
+            ('Cache-Control', 'no-cache'),
+            ('Content-Encoding', 'gzip'),
+            ('Content-Length', str(len(gzip_content))),
+            ('Content-Type', 'text/plain; charset=utf-8'),
+            ('ETag', gzip_etag),
+            ('Vary', 'Accept-Encoding')
+        ])
+        self.assertEqual(content, gzip_content)
+        self.assertLess(len(content), len(self.CONTENT))
+
+        # Unencoded response
+        for accept_encoding in (None, 'identity', 'gzip;q=0', 'br'):
+            environ = {'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding is not None else {}
+            status, headers, content = app.request('GET', '/hello.txt', environ=environ)
+            self.assertEqual(status, '200 OK')
+            self.assertListEqual(headers, [
+                ('Cache-Control', 'no-cache'),
+                ('Content-Length', str(len(self.CONTENT))),
+                ('Content-Type', 'text/plain; charset=utf-8'),
+                ('ETag', identity_etag),
+                ('Vary', 'Accept-Encoding')
+            ])
+            self.assertEqual(content, self.CONTENT)
+
+
+    def test_not_modified(self):
+        app = chisel.Application()
+        request = CompressedStaticRequest('hello.txt', self.CONTENT, cache_control='public, max-age=60')
+        app.add_request(request)
+        gzip_etag = request.variants[0][2]
+
+        status, headers, content = app.request(
+            'GET', '/hello.txt',
+            environ={'HTTP_ACCEPT_ENCODING': 'gzip', 'HTTP_IF_NONE_MATCH': f'"other", W/{gzip_etag}'}
+        )
+        self.assertEqual(status, '304 Not Modified')
+        self.assertListEqual(headers, [('Cache-Control', 'public, max-age=60'), ('ETag', gzip_etag), ('Vary', 'Accept-Encoding')])
+        self.assertEqual(content, b'')
+
+        # The versioned URL is cached indefinitely
+        self.assertEqual(request.version, request.etag.strip('"'))
+        status, headers, content = app.request(
+            'GET', '/hello.txt', query_string=f'v={request.version}',
+            environ={'HTTP_ACCEPT_ENCODING': 'gzip', 'HTTP_IF_NONE_MATCH': gzip_etag}
+        )
+        self.assertEqual(status, '304 Not Modified')
+        self.assertListEqual(
+            headers, [('Cache-Control', 'public, max-age=31536000, immutable'), ('ETag', gzip_etag), ('Vary', 'Accept-Encoding')]
+        )
+        self.assertEqual(content, b'')
+
+        # The ETag of another variant doesn't match
+        status, _, content = app.request('GET', '/hello.txt', environ={'HTTP_IF_NONE_MATCH': gzip_etag})
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(content, self.CONTENT)
+
+
+    def test_brotli(self):
+        mock_brotli = unittest.mock.Mock()
+        mock_brotli.compress.return_value = b'brotli'
+        with unittest.mock.patch('mobstiq.assets.brotli', mock_brotli):
+            request = CompressedStaticRequest('hello.txt', self.CONTENT)
+        mock_brotli.compress.assert_called_once_with(self.CONTENT)
+        self.assertListEqual([encoding for encoding, _, _ in request.variants], ['br', 'gzip', None])
+
+        app = chisel.Application()
+        app.add_request(request)
+        status, headers, content = app.request('GET', '/hello.txt', environ={'HTTP_ACCEPT_ENCODING': 'gzip, br'})
+        self.assertEqual(status, '200 OK')
+        self.assertIn(('Content-Encoding', 'br'), headers)
+        self.assertEqual(content, b'brotli')
+
+
+    def test_incompressible(self):
+        request = CompressedStaticRequest('hello.txt', b'Hi')
+        self.assertListEqual([encoding for encoding, _, _ in request.variants], [None])
+
+
+    def test_parse_accept_encoding(self):
+        self.assertDictEqual(parse_accept_encoding(''), {})
+        self.assertDictEqual(parse_accept_encoding('gzip, deflate, br'), {'gzip': 1.0, 'deflate': 1.0, 'br': 1.0})
+        self.assertDictEqual(parse_accept_encoding('GZIP;q=0.5, br; q=0'), {'gzip': 0.5, 'br': 0.0})
+        self.assertDictEqual(parse_accept_encoding('gzip;q=bad, ,'), {'gzip': 0.0})
+        self.assertDictEqual(parse_accept_encoding('*;q=0.1, gzip;q=0'), {'gzip': 0.0, 'br': 0.1})
+
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('*', '"a"'))
+        self.assertTrue(etag_matches('"a"', '"a"'))
+        self.assertTrue(etag_matches('"b", W/"a"', '"a"'))
+        self.assertFalse(etag_matches('"b"', '"a"'))
@@ -0,0 +1,123 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+import threading
+import unittest
+import unittest.mock
+
+from mobstiq.events import EventHub, format_event
+
+
+class TestEvents(unittest.TestCase):
+
+    def test_format_event(self):
+        self.assertEqual(format_event(1, '{"version":1}'), b'id: 1\ndata: {"version":1}\n\n')
+
+
+    def test_publish(self):
+        hub = EventHub()
+        subscriber1 = hub.subscribe('r1')
+        subscriber2 = hub.subscribe('r1')
+        subscriber3 = hub.subscribe('r2')
+        self.assertTrue(hub.has_subscribers('r1'))
+        self.assertFalse(hub.has_subscribers('r3'))
+
+        # Published events are shared by the topic's subscribers
+        event = format_event(1, '{}')
+        hub.publish('r1', event)
+        self.assertIs(next(subscriber1), event)
+        self.assertIs(next(subscriber2), event)
+        self.assertListEqual(list(subscriber3.events), [])
+
+        # Closed subscribers are removed
+        subscriber1.close()
+        subscriber2.close()
+        self.assertFalse(hub.has_subscribers('r1'))
+        hub.publish('r1', event)
+        self.assertListEqual(list(subscriber1.events), [])
+
+        # Closing the hub ends the event streams
+        hub.close()
+        self.assertListEqual(list(subscriber3), [])
+        subscriber3.close()
+        self.assertDictEqual(hub.subscribers, {})
+
+
+    def test_max_subscribers(self):
+        hub = EventHub(max_subscribers=2)
+        subscriber1 = hub.subscribe('r1')
+        subscriber2 = hub.subscribe('r2')
+        self.assertIsNone(hub.subscribe('r3'))
+        self.assertEqual(hub.subscriber_count, 2)
+
+        # Closed subscribers make room for new subscribers
+        subscriber1.close()
+        subscriber1.close()
+        self.assertEqual(hub.subscriber_count, 1)
+        subscriber3 = hub.subscribe('r2')
+        self.assertIsNotNone(subscriber3)
+        self.assertEqual(hub.subscriber_count, 2)
+
+        # Ending a topic removes its subscribers and ends their streams
+        hub.end_topic('r2')
+        self.assertEqual(hub.subscriber_count, 0)
+        self.assertFalse(hub.has_subscribers('r2'))
+        self.assertListEqual(list(subscriber2), [])
+        self.assertListEqual(list(subscriber3), [])
+        subscriber2.close()
+        self.assertEqual(hub.subscriber_count, 0)
+
+
+    def test_on_subscribe(self):
+        hub = EventHub(max_subscribers=1)
+        publish_thread = threading.Thread(target=hub.publish, args=(None, format_event(2, '{}')))
+        def on_subscribe(subscriber):
+            # A concurrent publish waits for the subscription
+            publish_thread.start()
+            publish_thread.join(0.05)
+            self.assertTrue(publish_thread.is_alive())
+            subscriber.put(format_event(1, '{}'))
+        subscriber = hub.subscribe(None, on_subscribe)
+        publish_thread.join()
+
+        # The initial event is queued first
+        self.assertEqual(next(subscriber), format_event(1, '{}'))
+        self.assertEqual(next(subscriber), format_event(2, '{}'))
+
+        # The subscribe callback isn't called if the subscriber limit is reached
+        on_subscribe_limit = unittest.mock.Mock()
+        self.assertIsNone(hub.subscribe(None, on_subscribe_limit))
+        on_subscribe_limit.assert_not_called()
+
+
+    def test_slow_subscriber(self):
+        hub = EventHub(queue_size=2)
+        subscriber = hub.subscribe(None)
+
+        # A full queue drops the oldest events
+        for event_id in range(1, 5):
+            hub.publish(None, format_event(event_id, '{}'))
+        self.assertEqual(subscriber.dropped, 2)
+        self.assertEqual(next(subscriber), format_event(3, '{}'))
+        self.assertEqual(next(subscriber), format_event(4, '{}'))
+
+
+    def test_keepalive(self):
+        hub = EventHub(keepalive=0.01)
+        subscriber = hub.subscribe(None)
+        self.assertEqual(next(subscriber), b': keepalive\n\n')
+
+
+    def test_wait(self):
+        hub = EventHub()
+        subscriber = hub.subscribe(None)
+
+        # Wait for an event on another thread
+        events = []
+        def subscriber_thread_fn():
+            events.append(next(subscriber))
+        subscriber_thread = threading.Thread(target=subscriber_thread_fn)
+        subscriber_thread.start()
+        hub.publish(None, format_event(1, '{}'))
+        subscriber_thread.join()
+        self.assertListEqual(events, [format_event(1, '{}')])
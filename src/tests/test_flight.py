@@ -0,0 +1,82 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+import threading
+import unittest
+
+from mobstiq.flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_do(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('a', lambda: 1), 1)
+        self.assertEqual(flight.do('a', lambda: 2), 2)
+        self.assertDictEqual(flight.calls, {})
+        self.assertEqual(flight.executed, 2)
+        self.assertEqual(flight.coalesced, 0)
+
+
+    def test_coalesced(self):
+        flight = SingleFlight()
+        call_started = threading.Event()
+        call_finish = threading.Event()
+        def slow_fn():
+            call_started.set()
+            call_finish.wait(5)
+            return 'result'
+
+        # Start the in-flight call
+        results = []
+        def caller(fn):
+            results.append(flight.do('a', fn))
+        threads = [threading.Thread(target=caller, args=(slow_fn,))]
+        threads[0].start()
+        self.assertTrue(call_started.wait(5))
+
+        # Concurrent calls share the in-flight call's result
+        threads.extend(threading.Thread(target=caller, args=(lambda: 'other',)) for _ in range(3))
+        for thread in threads[1:]:
+            thread.start()
+        while flight.coalesced < 3:
+            threading.Event().wait(0.01)
+        call_finish.set()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual(results, ['result'] * 4)
+        self.assertEqual(flight.executed, 1)
+        self.assertEqual(flight.coalesced, 3)
+
+        # Calls with different keys are not coalesced
+        self.assertEqual(flight.do('b', lambda: 'b'), 'b')
+        self.assertEqual(flight.executed, 2)
+
+
+    def test_error(self):
+        flight = SingleFlight()
+        call_started = threading.Event()
+        call_finish = threading.Event()
+        def error_fn():
+            call_started.set()
+            call_finish.wait(5)
+            raise ValueError('BOOM')
+
+        # The in-flight call's exception is raised to all callers
+        errors = []
+        def caller():
+            try:
+                flight.do('a', error_fn)
+            except ValueError as exc:
+                errors.append(str(exc))
+        threads = [threading.Thread(target=caller) for _ in range(2)]
+        threads[0].start()
+        self.assertTrue(call_started.wait(5))
+        threads[1].start()
+        while flight.coalesced < 1:
+            threading.Event().wait(0.01)
+        call_finish.set()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual(errors, ['BOOM', 'BOOM'])
+        self.assertDictEqual(flight.calls, {})
@@ -0,0 +1,256 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+import importlib.metadata
+import json
+import os
+import unittest
+import unittest.mock
+
+import schema_markdown
+
+from mobstiq.app import BUILTIN_GAMES, MOBSTIQ_TYPES, Mobstiq, create_game_registry
+from mobstiq.games import ENTRY_POINT_GROUP, GameRegistry
+
+from .util import create_test_files
+
+
+# The test game plugin entry point object
+def reversi_game():
+    return {
+        'function': 'reversiMain',
+        'minPlayers': 2,
+        'maxPlayers': 2,
+        'script': 'function reversiMain(gameObj):\n    markdownPrint("# Reversi")\nendfunction\n'
+    }
+
+
+# The test game plugin entry point
+REVERSI_ENTRY_POINT = importlib.metadata.EntryPoint(name='Reversi', value='tests.test_games:reversi_game', group=ENTRY_POINT_GROUP)
+
+
+class TestGameRegistry(unittest.TestCase):
+
+    def test_lazy(self):
+        games = GameRegistry(MOBSTIQ_TYPES)
+        game_info = {'name': 'Solo', 'include': 'solo.bare', 'function': 'soloMain', 'minPlayers': 1, 'maxPlayers': 1}
+        loader = unittest.mock.Mock(return_value=(game_info, b'script'))
+        games.add_game('Solo', loader)
+
+        # Games aren't loaded until used
+        self.assertIn('Solo', games)
+        self.assertNotIn('Unknown', games)
+        self.assertListEqual(games.names(), ['Solo'])
+        loader.assert_not_called()
+
+        # Games are loaded once
+        self.assertDictEqual(games.get('Solo'), game_info)
+        self.assertEqual(games.get_script('Solo'), b'script')
+        self.assertListEqual(games.get_all(), [game_info])
+        loader.assert_called_once_with()
+
+        # Unknown game
+        self.assertIsNone(games.get('Unknown'))
+        self.assertIsNone(games.get_script('Unknown'))
+
+
+    def test_duplicate(self):
+        games = GameRegistry(MOBSTIQ_TYPES)
+        games.add_game('Solo', unittest.mock.Mock())
+        with self.assertRaises(ValueError) as cm_exc:
+            games.add_game('Solo', unittest.mock.Mock())
+        self.assertEqual(str(cm_exc.exception), 'Duplicate game "Solo"')
+
+
+    def test_invalid(self):
+        games = GameRegistry(MOBSTIQ_TYPES)
+        games.add_game('Solo', lambda: ({'name': 'Solo', 'include': 'solo.bare', 'function': 'soloMain', 'minPlayers': 0}, b''))
+        with self.assertLogs('mobstiq.games', level='ERROR') as cm_logs:
+            self.assertIsNone(games.get('Solo'))
+        self.assertEqual(cm_logs.records[0].getMessage(), 'Failed to load game "Solo"')
+        self.assertIsInstance(cm_logs.records[0].exc_info[1], schema_markdown.ValidationError)
+        self.assertDictEqual(games.games, {})
+        self.assertSetEqual(games.failed, {'Solo'})
+
+
+    def test_failed(self):
+        games = GameRegistry(MOBSTIQ_TYPES)
+        for game_info in BUILTIN_GAMES:
+            games.add_package_game(game_info)
+        loader = unittest.mock.Mock(side_effect=ImportError('No module named "solo"'))
+        games.add_game('Solo', loader)
+
+        # Failed games are logged and unavailable
+        with self.assertLogs('mobstiq.games', level='ERROR') as cm_logs:
+            self.assertListEqual(games.get_all(), BUILTIN_GAMES)
+        self.assertListEqual([record.getMessage() for record in cm_logs.records], ['Failed to load game "Solo"'])
+        self.assertIn('Solo', games)
+        self.assertIsNone(games.get('Solo'))
+        self.assertIsNone(games.get_script('Solo'))
+
+        # Failed games are loaded once
+        loader.assert_called_once_with()
+
+
+    def test_package_game(self):
+        games = GameRegistry(MOBSTIQ_TYPES)
+        for game_info in BUILTIN_GAMES:
+            games.add_package_game(game_info)
+        self.assertListEqual(games.get_all(), BUILTIN_GAMES)
+        self.assertIn(b'function ticTacToeMain(gameObj):', games.get_script('Tic Tac Toe'))
+
+
+    def test_entry_points(self):
+        checkers_entry_point = importlib.metadata.EntryPoint(name='Checkers', value='unknown:unknown', group=ENTRY_POINT_GROUP)
+        with unittest.mock.patch('importlib.metadata.entry_points', return_value=[checkers_entry_point, REVERSI_ENTRY_POINT]) \
+             as mock_entry_points:
+            games = create_game_registry()
+        mock_entry_points.assert_called_once_with(group=ENTRY_POINT_GROUP)
+
+        # Plugins with the name of an existing game are ignored
+        self.assertListEqual(games.names(), ['Checkers', 'Tic Tac Toe', 'Reversi'])
+        self.assertDictEqual(games.get('Checkers'), BUILTIN_GAMES[0])
+
+        # Plugins are included by the script bundle
+        self.assertDictEqual(games.get('Reversi'), {
+            'name': 'Reversi',
+            'include': 'mobstiq.bundle.bare',
+            'function': 'reversiMain',
+            'minPlayers': 2,
+            'maxPlayers': 2
+        })
+        self.assertEqual(games.get_script('Reversi'), reversi_game()['script'].encode('utf-8'))
+
+
+    def test_app(self):
+        with unittest.mock.patch('importlib.metadata.entry_points', return_value=[REVERSI_ENTRY_POINT]):
+            games = create_game_registry()
+        with create_test_files([]) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'), games=games)
+
+            # No game is loaded at startup
+            self.assertDictEqual(games.games, {})
+
+            # The plugin game is listed
+            status, _, content_bytes = app.request('GET', '/getGameList')
+            self.assertEqual(status, '200 OK')
+            self.assertListEqual(
+                [game_info['name'] for game_info in json.loads(content_bytes)['games']],
+                ['Checkers', 'Tic Tac Toe', 'Reversi']
+            )
+
+            # The plugin game's script is bundled
+            status, _, content_bytes = app.request('GET', '/mobstiq.bundle.bare')
+            self.assertEqual(status, '200 OK')
+            self.assertIn(b'# Bundled game "Reversi"\n\nfunction reversiMain(gameObj):', content_bytes)
+
+            # The plugin game is played like any other
+            status, _, content_bytes = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "Player 1"}')
+            self.assertEqual(status, '200 OK')
+            player_id = json.loads(content_bytes)['id']
+            status, _, content_bytes = app.request(
+                'POST', '/gameSetup', wsgi_input=json.dumps({'id': player_id, 'name': 'Reversi'}).encode('utf-8')
+            )
+            self.assertEqual(status, '200 OK')
+            status, _, content_bytes = app.request('GET', '/gameInclude')
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(content_bytes, b"mobstiqGameIncludeFunction = 'reversiMain'\n")
+            app.config.close()
+
+
+    def test_app_failed(self):
+        failed_entry_point = importlib.metadata.EntryPoint(name='Othello', value='unknown:unknown', group=ENTRY_POINT_GROUP)
+        with unittest.mock.patch('importlib.metadata.entry_points', return_value=[failed_entry_point, REVERSI_ENTRY_POINT]):
+            games = create_game_registry()
+        with create_test_files([]) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'), games=games)
+
+            # The failed plugin game is not listed
+            with self.assertLogs('mobstiq.games', level='ERROR'):
+                status, _, content_bytes = app.request('GET', '/getGameList')
+            self.assertEqual(status, '200 OK')
+            self.assertListEqual(
+                [game_info['name'] for game_info in json.loads(content_bytes)['games']],
+                ['Checkers', 'Tic Tac Toe', 'Reversi']
+            )
+
+            # The failed plugin game is not bundled
+            status, _, content_bytes = app.request('GET', '/mobstiq.bundle.bare')
+            self.assertEqual(status, '200 OK')
+            self.assertIn(b'# Bundled game "Reversi"', content_bytes)
+            self.assertNotIn(b'# Bundled game "Othello"', content_bytes)
+
+            # The failed plugin game can't be setup
+            status, _, content_bytes = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "Player 1"}')
+            self.assertEqual(status, '200 OK')
+            player_id = json.loads(content_bytes)['id']
+            status, _, content_bytes = app.request(
+                'POST', '/gameSetup', wsgi_input=json.dumps({'id': player_id, 'name': 'Othello'}).encode('utf-8')
+            )
+            self.assertEqual(status, '400 Bad Request')
+            self.assertDictEqual(json.loads(content_bytes), {'error': 'InvalidName'})
+            app.config.close()
+
+
+    def test_app_unavailable(self):
+        # A saved game whose plugin is no longer installed
+        test_files = [
+            ('mobstiq.json', json.dumps({
+                'players': {
+                    '123e4567-e89b-12d3-a456-426614174000': {
+                        'id': '123e4567-e89b-12d3-a456-426614174000',
+                        'name': 'Player 1'
+                    },
+                    '223e4567-e89b-12d3-a456-426614174000': {
+                        'id': '223e4567-e89b-12d3-a456-426614174000',
+                        'name': 'Player 2'
+                    }
+                },
+                'game': {
+                    'name': 'Reversi',
+                    'players': ['123e4567-e89b-12d3-a456-426614174000']
+                }
+            }))
+        ]
+        with unittest.mock.patch('importlib.metadata.entry_points', return_value=[]):
+            games = create_game_registry()
+        with create_test_files(test_files) as temp_dir:
+            app = Mobstiq(os.path.join(temp_dir, 'mobstiq.json'), games=games)
+
+            # The game view has no game info
+            status, _, content_bytes = app.request('GET', '/gameView')
+            self.assertEqual(status, '200 OK')
+            response = json.loads(content_bytes)
+            self.assertEqual(response['game']['name'], 'Reversi')
+            self.assertNotIn('gameInfo', response)
+
+            # Players can't be added
+            status, _, content_bytes = app.request(
+                'POST', '/gameAddPlayer', wsgi_input=b'{"id": "223e4567-e89b-12d3-a456-426614174000"}'
+            )
+            self.assertEqual(status, '400 Bad Request')
+            self.assertDictEqual(json.loads(content_bytes), {'error': 'InvalidName'})
+
+            # The game can't be started
+            status, _, content_bytes = app.request(
+                'POST', '/gameStart', wsgi_input=b'{"id": "123e4567-e89b-12d3-a456-426614174000"}'
+            )
+            self.assertEqual(status, '400 Bad Request')
+            self.assertDictEqual(json.loads(content_bytes), {'error': 'InvalidName'})
+
+            # The game has no include
+            app.config.set_game(None, {
+                'name': 'Reversi',
+                'players': ['123e4567-e89b-12d3-a456-426614174000', '223e4567-e89b-12d3-a456-426614174000'],
+                'current': '123e4567-e89b-12d3-a456-426614174000'
+            })
+            status, _, content_bytes = app.request('GET', '/gameInclude')
+            self.assertEqual(status, '400 Bad Request')
+            self.assertDictEqual(json.loads(content_bytes), {'error': 'NotInPlay'})
+
+            # The game can be stopped
+            status, _, content_bytes = app.request(
+                'POST', '/gameStop', wsgi_input=b'{"id": "123e4567-e89b-12d3-a456-426614174000"}'
+            )
+            self.assertEqual(status, '200 OK')
+            app.config.close()
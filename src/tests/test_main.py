@@ -4,10 +4,12 @@
 from io import StringIO
 import json
 import os
+import signal
 import unittest
 import unittest.mock
 
 import chisel
+from mobstiq.app import Mobstiq
 from mobstiq.__main__ import main as main_main
 from mobstiq.main import main
 
@@ -63,7 +65,7 @@ class TestMain(unittest.TestCase):
             serve_args, serve_kwargs = mock_serve.call_args
             application_wrap = serve_args[0]
             self.assertTrue(callable(application_wrap))
-            self.assertDictEqual(serve_kwargs, {'port': 8080})
+            self.assertDictEqual(serve_kwargs, {'port': 8080, 'threads': 32})
 
             start_response_calls = []
             def start_response(status, response_headers):
@@ -115,7 +117,7 @@ mobstiq: Serving at http://127.0.0.1:8080/ ...
             serve_args, serve_kwargs = mock_serve.call_args
             application_wrap = serve_args[0]
             self.assertTrue(callable(application_wrap))
-            self.assertDictEqual(serve_kwargs, {'port': 8080})
+            self.assertDictEqual(serve_kwargs, {'port': 8080, 'threads': 32})
 
             start_response_calls = []
             def start_response(status, response_headers):
@@ -162,7 +164,7 @@ mobstiq: Serving at http://127.0.0.1:8080/ ...
             serve_args, serve_kwargs = mock_serve.call_args
             application_wrap = serve_args[0]
             self.assertTrue(callable(application_wrap))
-            self.assertDictEqual(serve_kwargs, {'port': 8080})
+            self.assertDictEqual(serve_kwargs, {'port': 8080, 'threads': 32})
 
             start_response_calls = []
             def start_response(status, response_headers):
@@ -212,7 +214,7 @@ mobstiq: Serving at http://127.0.0.1:8080/ ...
             serve_args, serve_kwargs = mock_serve.call_args
             application_wrap = serve_args[0]
             self.assertTrue(callable(application_wrap))
-            self.assertDictEqual(serve_kwargs, {'port': 8080})
+            self.assertDictEqual(serve_kwargs, {'port': 8080, 'threads': 32})
 
             start_response_calls = []
             def start_response(status, response_headers):
@@ -262,7 +264,7 @@ mobstiq: Serving at http://127.0.0.1:8080/ ...
             serve_args, serve_kwargs = mock_serve.call_args
             application_wrap = serve_args[0]
             self.assertTrue(callable(application_wrap))
-            self.assertDictEqual(serve_kwargs, {'port': 8080})
+            self.assertDictEqual(serve_kwargs, {'port': 8080, 'threads': 32})
 
             start_response_calls = []
             def start_response(status, response_headers):
@@ -309,7 +311,7 @@ mobstiq: Serving at http://127.0.0.1:8080/ ...
             serve_args, serve_kwargs = mock_serve.call_args
             application_wrap = serve_args[0]
             self.assertTrue(callable(application_wrap))
-            self.assertDictEqual(serve_kwargs, {'port': 8080})
+            self.assertDictEqual(serve_kwargs, {'port': 8080, 'threads': 32})
 
             start_response_calls = []
             def start_response(status, response_headers):
@@ -366,7 +368,7 @@ mobstiq: 200 GET /getServiceURL\x20
             mock_serve.assert_called_once()
             serve_args, serve_kwargs = mock_serve.call_args
             self.assertTrue(callable(serve_args[0]))
-            self.assertDictEqual(serve_kwargs, {'port': 8080})
+            self.assertDictEqual(serve_kwargs, {'port': 8080, 'threads': 32})
 
             self.assertEqual(stdout.getvalue(), 'mobstiq: Serving at http://127.0.0.1:8080/ ...\n')
             self.assertEqual(stderr.getvalue(), '')
@@ -387,3 +389,260 @@ mobstiq: 200 GET /getServiceURL\x20
 
             self.assertEqual(stdout.getvalue(), '')
             self.assertEqual(stderr.getvalue(), '')
+
+
+    def test_main_journal(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('waitress.serve') as mock_serve, \
+             unittest.mock.patch('sys.stdout', StringIO()) as stdout, \
+             unittest.mock.patch('sys.stderr', StringIO()) as stderr:
+
+            main(['-n', '-j', '-c', temp_dir])
+
+            mock_serve.assert_called_once()
+            serve_args, _ = mock_serve.call_args
+            application_wrap = serve_args[0]
+
+            start_response_calls = []
+            def start_response(status, response_headers):
+                start_response_calls.append((status, response_headers))
+            environ = chisel.Context.create_environ('POST', '/playerRegister', wsgi_input=b'{"name": "Player 1"}')
+            response = json.loads(application_wrap(environ, start_response)[0].decode('utf-8'))
+
+            self.assertListEqual(start_response_calls, [('200 OK', [('Content-Type', 'application/json')])])
+            self.assertEqual(response['name'], 'Player 1')
+            self.assertFalse(os.path.exists(os.path.join(temp_dir, 'mobstiq.json')))
+            self.assertTrue(os.path.exists(os.path.join(temp_dir, 'mobstiq.json.journal')))
+
+            self.assertEqual(stdout.getvalue(), 'mobstiq: Serving at http://127.0.0.1:8080/ ...\n')
+            self.assertEqual(stderr.getvalue(), '')
+
+
+    def test_main_save_window(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('waitress.serve') as mock_serve, \
+             unittest.mock.patch('sys.stdout', StringIO()) as stdout, \
+             unittest.mock.patch('sys.stderr', StringIO()) as stderr:
+
+            # Register a player while serving
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            start_response_calls = []
+            def start_response(status, response_headers):
+                start_response_calls.append((status, response_headers))
+            def serve(application_wrap, **unused_kwargs):
+                environ = chisel.Context.create_environ('POST', '/playerRegister', wsgi_input=b'{"name": "Player 1"}')
+                application_wrap(environ, start_response)
+                self.assertFalse(os.path.exists(config_path))
+            mock_serve.side_effect = serve
+
+            main(['-n', '-w', '60000', '-c', temp_dir])
+
+            # The config is saved on shutdown
+            mock_serve.assert_called_once()
+            self.assertListEqual(start_response_calls, [('200 OK', [('Content-Type', 'application/json')])])
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                saved_config = json.loads(fh.read())
+            self.assertListEqual([player['name'] for player in saved_config['players'].values()], ['Player 1'])
+
+            self.assertEqual(stdout.getvalue(), 'mobstiq: Serving at http://127.0.0.1:8080/ ...\n')
+            self.assertEqual(stderr.getvalue(), '')
+
+
+    def test_main_sigterm(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('waitress.serve') as mock_serve, \
+             unittest.mock.patch('sys.stdout', StringIO()) as stdout, \
+             unittest.mock.patch('sys.stderr', StringIO()) as stderr:
+
+            # Register a player while serving, then stop the service
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            def serve(application_wrap, **unused_kwargs):
+                environ = chisel.Context.create_environ('POST', '/playerRegister', wsgi_input=b'{"name": "Player 1"}')
+                application_wrap(environ, lambda status, response_headers: None)
+                os.kill(os.getpid(), signal.SIGTERM)
+                self.fail('SIGTERM not handled') # pragma: no cover
+            mock_serve.side_effect = serve
+
+            sigterm_handler = signal.getsignal(signal.SIGTERM)
+            with self.assertRaises(SystemExit) as cm_exc:
+                main(['-n', '-w', '60000', '-c', temp_dir])
+            self.assertEqual(cm_exc.exception.code, 0)
+            self.assertIs(signal.getsignal(signal.SIGTERM), sigterm_handler)
+
+            # The config is saved on shutdown
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                saved_config = json.loads(fh.read())
+            self.assertListEqual([player['name'] for player in saved_config['players'].values()], ['Player 1'])
+
+            self.assertEqual(stdout.getvalue(), 'mobstiq: Serving at http://127.0.0.1:8080/ ...\n')
+            self.assertEqual(stderr.getvalue(), '')
+
+
+    def test_main_sqlite(self):
+        test_files = [
+            ('mobstiq.json', '{"players": {"p1": {"id": "p1", "name": "Player 1"}}}')
+        ]
+        with create_test_files(test_files) as temp_dir, \
+             unittest.mock.patch('waitress.serve') as mock_serve, \
+             unittest.mock.patch('sys.stdout', StringIO()) as stdout, \
+             unittest.mock.patch('sys.stderr', StringIO()) as stderr:
+
+            # Validate the migrated player while serving
+            start_response_calls = []
+            def start_response(status, response_headers):
+                start_response_calls.append((status, response_headers))
+            responses = []
+            def serve(application_wrap, **unused_kwargs):
+                environ = chisel.Context.create_environ('POST', '/playerValidate', wsgi_input=b'{"id": "p1"}')
+                responses.append(json.loads(application_wrap(environ, start_response)[0].decode('utf-8')))
+            mock_serve.side_effect = serve
+
+            main(['-n', '-c', os.path.join(temp_dir, 'mobstiq.sqlite')])
+
+            mock_serve.assert_called_once()
+            self.assertListEqual(start_response_calls, [('200 OK', [('Content-Type', 'application/json')])])
+            self.assertListEqual(responses, [{'id': 'p1', 'name': 'Player 1'}])
+            self.assertTrue(os.path.exists(os.path.join(temp_dir, 'mobstiq.sqlite')))
+
+            self.assertEqual(stdout.getvalue(), 'mobstiq: Serving at http://127.0.0.1:8080/ ...\n')
+            self.assertEqual(stderr.getvalue(), '')
+
+
+    def test_main_ignore_case(self):
+        test_files = [
+            ('mobstiq.json', '{"players": {"p1": {"id": "p1", "name": "Player 1"}}}')
+        ]
+        with create_test_files(test_files) as temp_dir, \
+             unittest.mock.patch('waitress.serve') as mock_serve, \
+             unittest.mock.patch('sys.stdout', StringIO()) as stdout, \
+             unittest.mock.patch('sys.stderr', StringIO()) as stderr:
+
+            main(['-n', '-i', '-c', temp_dir])
+
+            mock_serve.assert_called_once()
+            serve_args, _ = mock_serve.call_args
+            application_wrap = serve_args[0]
+
+            start_response_calls = []
+            def start_response(status, response_headers):
+                start_response_calls.append((status, response_headers))
+            environ = chisel.Context.create_environ('POST', '/playerRegister', wsgi_input=b'{"name": "PLAYER 1"}')
+            response = json.loads(application_wrap(environ, start_response)[0].decode('utf-8'))
+
+            self.assertListEqual(start_response_calls, [('400 Bad Request', [('Content-Type', 'application/json')])])
+            self.assertDictEqual(response, {'error': 'NameInUse'})
+
+            self.assertEqual(stdout.getvalue(), 'mobstiq: Serving at http://127.0.0.1:8080/ ...\nmobstiq: 400 POST /playerRegister \n')
+            self.assertEqual(stderr.getvalue(), '')
+
+
+    def test_main_player_ttl(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('waitress.serve') as mock_serve, \
+             unittest.mock.patch('mobstiq.main.Mobstiq', wraps=Mobstiq) as mock_mobstiq, \
+             unittest.mock.patch('sys.stdout', StringIO()) as stdout, \
+             unittest.mock.patch('sys.stderr', StringIO()) as stderr:
+
+            main(['-n', '-e', '0.5', '-c', temp_dir])
+
+            mock_serve.assert_called_once()
+            mock_mobstiq.assert_called_once_with(
+                os.path.join(temp_dir, 'mobstiq.json'), journal=False, split=False, durability='write', save_window=None,
+                ignore_case=False, player_ttl=1800, max_waiters=15, max_subscribers=7, local_markdown_up=False
+            )
+
+            self.assertEqual(stdout.getvalue(), 'mobstiq: Serving at http://127.0.0.1:8080/ ...\n')
+            self.assertEqual(stderr.getvalue(), '')
+
+
+    def test_main_split(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('waitress.serve') as mock_serve, \
+             unittest.mock.patch('mobstiq.main.Mobstiq', wraps=Mobstiq) as mock_mobstiq, \
+             unittest.mock.patch('sys.stdout', StringIO()) as stdout, \
+             unittest.mock.patch('sys.stderr', StringIO()) as stderr:
+
+            main(['-n', '-s', '-c', temp_dir])
+
+            mock_serve.assert_called_once()
+            mock_mobstiq.assert_called_once_with(
+                os.path.join(temp_dir, 'mobstiq.json'), journal=False, split=True, durability='write', save_window=None,
+                ignore_case=False, player_ttl=None, max_waiters=15, max_subscribers=7, local_markdown_up=False
+            )
+
+            self.assertEqual(stdout.getvalue(), 'mobstiq: Serving at http://127.0.0.1:8080/ ...\n')
+            self.assertEqual(stderr.getvalue(), '')
+
+
+    def test_main_durability_save_window(self):
+        with unittest.mock.patch('waitress.serve') as mock_serve, \
+             unittest.mock.patch('sys.stdout', StringIO()) as stdout, \
+             unittest.mock.patch('sys.stderr', StringIO()) as stderr:
+
+            with self.assertRaises(SystemExit) as cm_exc:
+                main(['-n', '-d', 'sync', '-w', '100'])
+
+            self.assertEqual(cm_exc.exception.code, 2)
+            mock_serve.assert_not_called()
+            self.assertEqual(stdout.getvalue(), '')
+            self.assertTrue(stderr.getvalue().endswith('error: argument -w: not allowed with durability level "sync"\n'))
+
+
+    def test_main_durability(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('waitress.serve') as mock_serve, \
+             unittest.mock.patch('mobstiq.main.Mobstiq', wraps=Mobstiq) as mock_mobstiq, \
+             unittest.mock.patch('sys.stdout', StringIO()) as stdout, \
+             unittest.mock.patch('sys.stderr', StringIO()) as stderr:
+
+            main(['-n', '-d', 'sync', '-c', temp_dir])
+
+            mock_serve.assert_called_once()
+            mock_mobstiq.assert_called_once_with(
+                os.path.join(temp_dir, 'mobstiq.json'), journal=False, split=False, durability='sync', save_window=None,
+                ignore_case=False, player_ttl=None, max_waiters=15, max_subscribers=7, local_markdown_up=False
+            )
+
+            self.assertEqual(stdout.getvalue(), 'mobstiq: Serving at http://127.0.0.1:8080/ ...\n')
+            self.assertEqual(stderr.getvalue(), '')
+
+
+    def test_main_local_markdown_up(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('waitress.serve') as mock_serve, \
+             unittest.mock.patch('mobstiq.main.Mobstiq', wraps=Mobstiq) as mock_mobstiq, \
+             unittest.mock.patch('sys.stdout', StringIO()) as stdout, \
+             unittest.mock.patch('sys.stderr', StringIO()) as stderr:
+
+            main(['-n', '-l', '-c', temp_dir])
+
+            mock_serve.assert_called_once()
+            mock_mobstiq.assert_called_once_with(
+                os.path.join(temp_dir, 'mobstiq.json'), journal=False, split=False, durability='write', save_window=None,
+                ignore_case=False, player_ttl=None, max_waiters=15, max_subscribers=7, local_markdown_up=True
+            )
+
+            self.assertEqual(stdout.getvalue(), 'mobstiq: Serving at http://127.0.0.1:8080/ ...\n')
+            self.assertEqual(stderr.getvalue(), '')
+
+
+    def test_main_threads(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('waitress.serve') as mock_serve, \
+             unittest.mock.patch('sys.stdout', StringIO()) as stdout, \
+             unittest.mock.patch('sys.stderr', StringIO()) as stderr:
+
+            with unittest.mock.patch('mobstiq.main.Mobstiq', wraps=Mobstiq) as mock_mobstiq:
+                main(['-n', '-t', '8', '-c', temp_dir])
+
+            # Fewer than half of the request threads wait for game state changes
+            _, mobstiq_kwargs = mock_mobstiq.call_args
+            self.assertEqual(mobstiq_kwargs['max_waiters'], 3)
+            self.assertEqual(mobstiq_kwargs['max_subscribers'], 1)
+
+            mock_serve.assert_called_once()
+            _, serve_kwargs = mock_serve.call_args
+            self.assertDictEqual(serve_kwargs, {'port': 8080, 'threads': 8})
+
+            self.assertEqual(stdout.getvalue(), 'mobstiq: Serving at http://127.0.0.1:8080/ ...\n')
+            self.assertEqual(stderr.getvalue(), '')
@@ -0,0 +1,76 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+import unittest
+
+from mobstiq.patch import PatchError, apply_patch
+
+
+class TestPatch(unittest.TestCase):
+
+    def test_operations(self):
+        document = {'board': [1, 2, 3], 'score': {'p1': 0, 'p2': 0}, 'turn': 1}
+        patched = apply_patch(document, [
+            {'op': 'test', 'path': '/turn', 'value': 1},
+            {'op': 'replace', 'path': '/board/1', 'value': None},
+            {'op': 'add', 'path': '/board/-', 'value': 4},
+            {'op': 'add', 'path': '/board/0', 'value': 0},
+            {'op': 'remove', 'path': '/score/p2'},
+            {'op': 'copy', 'from': '/score', 'path': '/last~1score'},
+            {'op': 'move', 'from': '/turn', 'path': '/score/turn~0'}
+        ])
+        self.assertDictEqual(patched, {
+            'board': [0, 1, None, 3, 4],
+            'score': {'p1': 0, 'turn~': 1},
+            'last/score': {'p1': 0}
+        })
+
+        # The original document is not modified
+        self.assertDictEqual(document, {'board': [1, 2, 3], 'score': {'p1': 0, 'p2': 0}, 'turn': 1})
+
+
+    def test_unpatched_values_shared(self):
+        document = {'board': [[1, 2], [3, 4]], 'score': {'p1': 0}}
+        patched = apply_patch(document, [
+            {'op': 'replace', 'path': '/board/1/0', 'value': 5},
+            {'op': 'replace', 'path': '/board/1/1', 'value': 6}
+        ])
+        self.assertDictEqual(patched, {'board': [[1, 2], [5, 6]], 'score': {'p1': 0}})
+        self.assertIs(patched['board'][0], document['board'][0])
+        self.assertIs(patched['score'], document['score'])
+        self.assertListEqual(document['board'][1], [3, 4])
+
+
+    def test_copy_not_shared(self):
+        patched = apply_patch({'a': {'b': 1}}, [
+            {'op': 'add', 'path': '/a/c', 'value': 2},
+            {'op': 'copy', 'from': '/a', 'path': '/d'},
+            {'op': 'replace', 'path': '/d/b', 'value': 3}
+        ])
+        self.assertDictEqual(patched, {'a': {'b': 1, 'c': 2}, 'd': {'b': 3, 'c': 2}})
+
+
+    def test_root(self):
+        self.assertListEqual(apply_patch({'a': 1}, [{'op': 'replace', 'path': '', 'value': [1]}]), [1])
+        self.assertDictEqual(apply_patch({'a': 1}, []), {'a': 1})
+
+
+    def test_errors(self):
+        for patch, message in (
+            ([{'op': 'test', 'path': '/a', 'value': True}], 'Test failed for "/a"'),
+            ([{'op': 'test', 'path': '/b', 'value': [2, 1]}], 'Test failed for "/b"'),
+            ([{'op': 'remove', 'path': '/c'}], 'Path token "c" not found'),
+            ([{'op': 'replace', 'path': '/b/2', 'value': 3}], 'Path token "2" not found'),
+            ([{'op': 'add', 'path': '/b/3', 'value': 3}], 'Path token "3" not found'),
+            ([{'op': 'add', 'path': '/b/01', 'value': 3}], 'Invalid path token "01"'),
+            ([{'op': 'add', 'path': '/a/b', 'value': 3}], 'Invalid path token "b"'),
+            ([{'op': 'add', 'path': 'a', 'value': 3}], 'Invalid JSON Pointer "a"'),
+            ([{'op': 'add', 'path': '/a'}], 'Missing value for "add" operation'),
+            ([{'op': 'copy', 'path': '/a'}], 'Missing from for "copy" operation'),
+            ([{'op': 'move', 'from': '/b', 'path': '/b/0'}], 'Cannot move "/b" into itself'),
+            ([{'op': 'remove', 'path': ''}], 'Cannot remove the document root')
+        ):
+            with self.subTest(patch=patch):
+                with self.assertRaises(PatchError) as cm_exc:
+                    apply_patch({'a': 1, 'b': [1, 2]}, patch)
+                self.assertEqual(str(cm_exc.exception), message)
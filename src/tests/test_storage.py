@@ -0,0 +1,429 @@
+# Licensed under the MIT License
+# https://github.com/craigahobbs/mobstiq/blob/main/LICENSE
+
+import json
+import os
+import sqlite3
+import unittest
+import unittest.mock
+import uuid
+
+import schema_markdown
+
+from mobstiq.app import ConfigManager, Mobstiq
+from mobstiq.storage import JournalStorage, JSONStorage, SplitStorage, SQLiteStorage, _write_atomic, create_storage
+
+from .util import create_test_files
+
+
+class TestStorage(unittest.TestCase):
+
+    def test_create_storage(self):
+        self.assertIsInstance(create_storage('mobstiq.json'), JSONStorage)
+        self.assertNotIsInstance(create_storage('mobstiq.json'), JournalStorage)
+        self.assertIsInstance(create_storage('mobstiq.json', journal=True), JournalStorage)
+        self.assertIsInstance(create_storage('mobstiq.json', split=True), SplitStorage)
+        self.assertIsInstance(create_storage('mobstiq.json', journal=True, split=True), JournalStorage)
+        self.assertIsInstance(create_storage('mobstiq.sqlite', split=True), SQLiteStorage)
+        self.assertIsInstance(create_storage('mobstiq.sqlite'), SQLiteStorage)
+        self.assertIsInstance(create_storage('mobstiq.sqlite', journal=True), SQLiteStorage)
+
+
+    def test_sqlite(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('uuid.uuid4', return_value=uuid.UUID('123e4567e89b12d3a456426614174000')):
+            database_path = os.path.join(temp_dir, 'mobstiq.sqlite')
+            app = Mobstiq(database_path)
+            try:
+                self.assertIsInstance(app.config.storage, SQLiteStorage)
+
+                status, _, _ = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "Player 1"}')
+                self.assertEqual(status, '200 OK')
+                status, _, _ = app.request(
+                    'POST', '/gameSetup',
+                    wsgi_input=b'{"id": "123e4567-e89b-12d3-a456-426614174000", "name": "Tic Tac Toe"}'
+                )
+                self.assertEqual(status, '200 OK')
+            finally:
+                app.config.close()
+
+            # Verify the database
+            with sqlite3.connect(database_path) as connection:
+                self.assertEqual(connection.execute('PRAGMA journal_mode').fetchone(), ('wal',))
+                self.assertListEqual(connection.execute('SELECT id, name, player FROM players').fetchall(), [
+                    (
+                        '123e4567-e89b-12d3-a456-426614174000',
+                        'Player 1',
+                        '{"id":"123e4567-e89b-12d3-a456-426614174000","name":"Player 1"}'
+                    )
+                ])
+                self.assertListEqual(connection.execute('SELECT id, game FROM games').fetchall(), [
+                    ('', '{"name":"Tic Tac Toe","players":["123e4567-e89b-12d3-a456-426614174000"],"version":1}')
+                ])
+            connection.close()
+
+            # Verify the config is loaded from the database
+            expected_config = {
+                'players': {
+                    '123e4567-e89b-12d3-a456-426614174000': {
+                        'id': '123e4567-e89b-12d3-a456-426614174000',
+                        'name': 'Player 1'
+                    }
+                },
+                'game': {
+                    'name': 'Tic Tac Toe',
+                    'players': ['123e4567-e89b-12d3-a456-426614174000'],
+                    'version': 1
+                }
+            }
+            app2 = Mobstiq(database_path)
+            try:
+                with app2.config() as config:
+                    self.assertDictEqual(config, expected_config)
+
+                # Stop the game - the game row is deleted
+                status, _, _ = app2.request('POST', '/gameStop', wsgi_input=b'{"id": "123e4567-e89b-12d3-a456-426614174000"}')
+                self.assertEqual(status, '200 OK')
+                self.assertListEqual(app2.config.storage.connection.execute('SELECT id FROM games').fetchall(), [])
+            finally:
+                app2.config.close()
+            self.assertIsNone(app2.config.storage.connection)
+            self.assertFalse(os.path.exists(os.path.join(temp_dir, 'mobstiq.json')))
+
+
+    def test_sqlite_migrate(self):
+        json_config = {
+            'players': {
+                'p1': {'id': 'p1', 'name': 'Player 1'},
+                'p2': {'id': 'p2', 'name': 'Player 2'}
+            },
+            'game': {
+                'name': 'Tic Tac Toe',
+                'players': ['p1']
+            }
+        }
+        expected_config = {**json_config, 'game': {**json_config['game'], 'version': 1}}
+        test_files = [
+            ('mobstiq.json', json.dumps(json_config))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            database_path = os.path.join(temp_dir, 'mobstiq.sqlite')
+            config_manager = ConfigManager(database_path)
+            try:
+                with config_manager() as config:
+                    self.assertDictEqual(config, expected_config)
+            finally:
+                config_manager.close()
+
+            # The migrated config is loaded from the database - the JSON config file is unchanged
+            with open(os.path.join(temp_dir, 'mobstiq.json'), 'w', encoding='utf-8') as fh:
+                fh.write(json.dumps({'players': {}}))
+            config_manager = ConfigManager(database_path)
+            try:
+                with config_manager() as config:
+                    self.assertDictEqual(config, expected_config)
+                self.assertListEqual(
+                    config_manager.storage.connection.execute('SELECT id FROM players WHERE name = ?', ('Player 2',)).fetchall(),
+                    [('p2',)]
+                )
+            finally:
+                config_manager.close()
+
+
+    def test_sqlite_migrate_retry(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({'players': {'p1': {'id': 'p1'}}}))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            database_path = os.path.join(temp_dir, 'mobstiq.sqlite')
+
+            # The invalid JSON config file fails the migration
+            with self.assertRaises(schema_markdown.ValidationError):
+                ConfigManager(database_path)
+            self.assertTrue(os.path.isfile(database_path))
+
+            # The migration is retried
+            with open(os.path.join(temp_dir, 'mobstiq.json'), 'w', encoding='utf-8') as fh:
+                fh.write(json.dumps({'players': {'p1': {'id': 'p1', 'name': 'Player 1'}}}))
+            config_manager = ConfigManager(database_path)
+            try:
+                with config_manager() as config:
+                    self.assertDictEqual(config, {'players': {'p1': {'id': 'p1', 'name': 'Player 1'}}})
+                self.assertEqual(
+                    config_manager.storage.connection.execute('PRAGMA user_version').fetchone()[0], SQLiteStorage.USER_VERSION
+                )
+            finally:
+                config_manager.close()
+
+
+    def test_sqlite_migrate_unmarked(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({'players': {'p1': {'id': 'p1', 'name': 'Player 1'}}}))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            # A database with rows that predates the initialized marker
+            database_path = os.path.join(temp_dir, 'mobstiq.sqlite')
+            connection = sqlite3.connect(database_path)
+            with connection:
+                connection.execute('CREATE TABLE players (id TEXT PRIMARY KEY, name TEXT NOT NULL, player TEXT NOT NULL)')
+                connection.execute(
+                    'INSERT INTO players (id, name, player) VALUES (?, ?, ?)', ('p2', 'Player 2', '{"id":"p2","name":"Player 2"}')
+                )
+            connection.close()
+
+            # The database is not migrated, but is marked initialized
+            config_manager = ConfigManager(database_path)
+            try:
+                with config_manager() as config:
+                    self.assertDictEqual(config, {'players': {'p2': {'id': 'p2', 'name': 'Player 2'}}})
+                self.assertEqual(
+                    config_manager.storage.connection.execute('PRAGMA user_version').fetchone()[0], SQLiteStorage.USER_VERSION
+                )
+            finally:
+                config_manager.close()
+
+
+    def test_sqlite_save_window(self):
+        with create_test_files([]) as temp_dir:
+            database_path = os.path.join(temp_dir, 'mobstiq.sqlite')
+            config_manager = ConfigManager(database_path, save_window=60)
+            try:
+                for player_id in ('p1', 'p2'):
+                    with config_manager(save=True) as config:
+                        config['players'][player_id] = {'id': player_id, 'name': player_id}
+                        config_manager.changed('players', player_id)
+                self.assertListEqual(config_manager.storage.connection.execute('SELECT id FROM players').fetchall(), [])
+            finally:
+                config_manager.close()
+
+            config_manager = ConfigManager(database_path)
+            try:
+                with config_manager() as config:
+                    self.assertDictEqual(config, {
+                        'players': {
+                            'p1': {'id': 'p1', 'name': 'p1'},
+                            'p2': {'id': 'p2', 'name': 'p2'}
+                        }
+                    })
+            finally:
+                config_manager.close()
+
+
+    def test_json_checksum(self):
+        with create_test_files([]) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            config_manager = ConfigManager(config_path)
+            with config_manager(save=True) as config:
+                config['players']['p1'] = {'id': 'p1', 'name': 'Player 1'}
+                config_manager.changed('players', 'p1')
+            self.assertListEqual(sorted(os.listdir(temp_dir)), ['mobstiq.json', 'mobstiq.json.sha256'])
+
+            # The saved config is trusted - it is not validated on load
+            self.assertTrue(JSONStorage(config_path).load()[1])
+            with unittest.mock.patch('schema_markdown.validate_type') as mock_validate_type:
+                config_manager = ConfigManager(config_path)
+            mock_validate_type.assert_not_called()
+            with config_manager() as config:
+                self.assertDictEqual(config, {'players': {'p1': {'id': 'p1', 'name': 'Player 1'}}})
+
+            # A config file edited by hand is validated on load
+            with open(config_path, 'w', encoding='utf-8') as fh:
+                fh.write(json.dumps({'players': {'p1': {'id': 'p1'}}}))
+            self.assertFalse(JSONStorage(config_path).load()[1])
+            with self.assertRaises(schema_markdown.ValidationError) as cm_exc:
+                ConfigManager(config_path)
+            self.assertEqual(str(cm_exc.exception), 'Required member "players.p1.name" missing')
+
+
+    def test_json_checksum_missing(self):
+        test_files = [
+            ('mobstiq.json', json.dumps({'players': {'p1': {'id': 'p1', 'name': 'Player 1'}}}))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            self.assertTupleEqual(
+                JSONStorage(config_path).load(),
+                ({'players': {'p1': {'id': 'p1', 'name': 'Player 1'}}}, False)
+            )
+
+
+    def test_journal_checksum(self):
+        test_files = [
+            ('mobstiq.json.journal', '{"path":["players","p1"],"value":{"id":"p1","name":"Player 1"}}\n')
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+
+            # Replayed journal records are not trusted
+            storage = JournalStorage(config_path)
+            config, trusted = storage.load()
+            self.assertDictEqual(config, {'players': {'p1': {'id': 'p1', 'name': 'Player 1'}}})
+            self.assertFalse(trusted)
+
+            # The journal is compacted only after the config is validated
+            self.assertListEqual(os.listdir(temp_dir), ['mobstiq.json.journal'])
+            storage.loaded(config)
+            self.assertListEqual(sorted(os.listdir(temp_dir)), ['mobstiq.json', 'mobstiq.json.sha256'])
+
+            # The compacted config is trusted
+            config, trusted = JournalStorage(config_path).load()
+            self.assertDictEqual(config, {'players': {'p1': {'id': 'p1', 'name': 'Player 1'}}})
+            self.assertTrue(trusted)
+
+
+    def test_split(self):
+        with create_test_files([]) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+            game_path = os.path.join(temp_dir, 'mobstiq.game.json')
+            app = Mobstiq(config_path, split=True)
+            self.assertIsInstance(app.config.storage, SplitStorage)
+
+            # Player changes write only the player registry file
+            with unittest.mock.patch('mobstiq.storage._write_atomic', wraps=_write_atomic) as mock_write_atomic:
+                status, _, _ = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "Player 1"}')
+                self.assertEqual(status, '200 OK')
+                status, _, _ = app.request('POST', '/playerRegister', wsgi_input=b'{"name": "Player 2"}')
+                self.assertEqual(status, '200 OK')
+            self.assertListEqual([args[0] for args, _ in mock_write_atomic.call_args_list], [
+                config_path, f'{config_path}.sha256', config_path, f'{config_path}.sha256'
+            ])
+            self.assertListEqual(sorted(os.listdir(temp_dir)), ['mobstiq.json', 'mobstiq.json.sha256'])
+            with app.config() as config:
+                player_ids = list(config['players'])
+
+            # Game changes write only the game file
+            with unittest.mock.patch('mobstiq.storage._write_atomic', wraps=_write_atomic) as mock_write_atomic:
+                for url, request in (
+                    ('/gameSetup', {'id': player_ids[0], 'name': 'Tic Tac Toe'}),
+                    ('/gameAddPlayer', {'id': player_ids[1]}),
+                    ('/gameStart', {'id': player_ids[0]}),
+                    ('/gameUpdate', {'id': player_ids[0], 'state': {'board': [1]}})
+                ):
+                    status, _, _ = app.request('POST', url, wsgi_input=json.dumps(request).encode('utf-8'))
+                    self.assertEqual(status, '200 OK')
+            self.assertListEqual([args[0] for args, _ in mock_write_atomic.call_args_list], [game_path, f'{game_path}.sha256'] * 4)
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertListEqual(list(json.loads(fh.read())), ['players'])
+            with open(game_path, 'r', encoding='utf-8') as fh:
+                self.assertDictEqual(json.loads(fh.read()), {
+                    'name': 'Tic Tac Toe',
+                    'players': player_ids,
+                    'current': player_ids[1],
+                    'state': {'board': [1]},
+                    'version': 4
+                })
+
+            # The split config is trusted on load
+            config, trusted = SplitStorage(config_path).load()
+            self.assertTrue(trusted)
+            self.assertListEqual(list(config['players']), player_ids)
+            self.assertEqual(config['game']['current'], player_ids[1])
+
+            # Stopping the game deletes the game file
+            status, _, _ = app.request('POST', '/gameStop', wsgi_input=json.dumps({'id': player_ids[0]}).encode('utf-8'))
+            self.assertEqual(status, '200 OK')
+            self.assertListEqual(sorted(os.listdir(temp_dir)), ['mobstiq.json', 'mobstiq.json.sha256'])
+            config, trusted = SplitStorage(config_path).load()
+            self.assertNotIn('game', config)
+            self.assertTrue(trusted)
+
+
+    def test_split_load(self):
+        json_config = {
+            'players': {
+                'p1': {'id': 'p1', 'name': 'Player 1'}
+            },
+            'game': {
+                'name': 'Tic Tac Toe',
+                'players': ['p1']
+            }
+        }
+        expected_config = {**json_config, 'game': {**json_config['game'], 'version': 1}}
+        test_files = [
+            ('mobstiq.json', json.dumps(json_config))
+        ]
+        with create_test_files(test_files) as temp_dir:
+            config_path = os.path.join(temp_dir, 'mobstiq.json')
+
+            # The config file is split on load - the unversioned game is versioned
+            config_manager = ConfigManager(config_path, split=True)
+            with config_manager() as config:
+                self.assertDictEqual(config, expected_config)
+            self.assertListEqual(
+                sorted(os.listdir(temp_dir)),
+                ['mobstiq.game.json', 'mobstiq.game.json.sha256', 'mobstiq.json', 'mobstiq.json.sha256']
+            )
+            with open(config_path, 'r', encoding='utf-8') as fh:
+                self.assertDictEqual(json.loads(fh.read()), {'players': json_config['players']})
+
+            # A game file edited by hand is not trusted
+            with open(os.path.join(temp_dir, 'mobstiq.game.json'), 'w', encoding='utf-8') as fh:
+                fh.write(json.dumps({'name': 'Tic Tac Toe', 'players': []}))
+            config, trusted = SplitStorage(config_path).load()
+            self.assertDictEqual(config['game'], {'name': 'Tic Tac Toe', 'players': []})
+            self.assertFalse(trusted)
+
+
+    def test_journal_sync(self):
+        with create_test_files([]) as temp_dir, \
+             unittest.mock.patch('os.fsync') as mock_fsync:
+            config_manager = ConfigManager(os.path.join(temp_dir, 'mobstiq.json'), journal=True, durability='sync')
+            with config_manager(save=True) as config:
+                config['players']['p1'] = {'id': 'p1', 'name': 'p1'}
+                config_manager.changed('players', 'p1')
+            config_manager.close()
+            mock_fsync.assert_called_once()
+            self.assertListEqual(os.listdir(temp_dir), ['mobstiq.json.journal'])
+
+
+    def test_sqlite_sync(self):
+        with create_test_files([]) as temp_dir:
+            database_path = os.path.join(temp_dir, 'mobstiq.sqlite')
+            for durability, synchronous in (('write', 0), ('sync', 2)):
+                config_manager = ConfigManager(database_path, durability=durability)
+                try:
+                    self.assertEqual(config_manager.storage.connection.execute('PRAGMA synchronous').fetchone(), (synchronous,))
+                finally:
+                    config_manager.close()
+
+
+    def test_rooms(self):
+        expected_config = {
+            'players': {
+                'p1': {'id': 'p1', 'name': 'Player 1'}
+            },
+            'game': {'name': 'Checkers', 'players': ['p1'], 'version': 1},
+            'rooms': {
+                'r1': {'name': 'Tic Tac Toe', 'players': ['p1'], 'version': 2},
+                'r2': {'name': 'Checkers', 'players': ['p1'], 'current': 'p1', 'version': 5}
+            }
+        }
+        for config_filename, config_args in (
+            ('mobstiq.json', {'journal': True}),
+            ('mobstiq.json', {'split': True}),
+            ('mobstiq.sqlite', {})
+        ):
+            with create_test_files([]) as temp_dir:
+                config_path = os.path.join(temp_dir, config_filename)
+                config_manager = ConfigManager(config_path, **config_args)
+                try:
+                    with config_manager(save=True) as config:
+                        config['players']['p1'] = {'id': 'p1', 'name': 'Player 1'}
+                        config_manager.changed('players', 'p1')
+                        config_manager.set_game(None, {'name': 'Checkers', 'players': ['p1']})
+                        config_manager.set_game('r1', {'name': 'Tic Tac Toe', 'players': ['p1']})
+                        config_manager.set_game('r2', {'name': 'Checkers', 'players': ['p1']})
+                        config_manager.set_game('r3', {'name': 'Checkers', 'players': ['p1']})
+                    with config_manager.room('r2'):
+                        config_manager.set_game('r2', {'name': 'Checkers', 'players': ['p1'], 'current': 'p1'})
+                    with config_manager(save=True):
+                        config_manager.set_game('r3', None)
+                finally:
+                    config_manager.close()
+
+                config_manager = ConfigManager(config_path, **config_args)
+                try:
+                    with config_manager() as config:
+                        self.assertDictEqual(config, expected_config)
+                finally:
+                    config_manager.close()